@@ -0,0 +1,6 @@
+"""
+Benchmarks for the hot paths of cl-timer.
+
+Run with `python -m benchmarks run` from the root of the repository,
+and compare two runs with `python -m benchmarks compare old.json new.json`.
+"""
@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import tempfile
+
+BENCHMARKS = ['stats', 'graphics', 'scramble', 'storage', 'e2e']
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='run benchmarks')
+    run_parser.add_argument('benchmarks', nargs='*',
+                            help=f'benchmarks to run, out of {", ".join(BENCHMARKS)} (default: all)')
+    run_parser.add_argument('--sizes', nargs='+', type=int, default=[1000, 10000, 100000],
+                            help='numbers of solves in the synthetic sessions')
+    run_parser.add_argument('-o', '--output', help='write results as JSON to this file')
+
+    compare_parser = subparsers.add_parser('compare', help='compare two result files')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='fraction by which a benchmark can get slower (default: 0.1)')
+
+    args = parser.parse_args()
+
+    for name in getattr(args, 'benchmarks', []):
+        if name not in BENCHMARKS:
+            parser.error(f'unknown benchmark: {name}')
+
+    if args.command == 'compare':
+        from benchmarks.harness import compare
+        sys.exit(1 if compare(args.old, args.new, args.threshold) else 0)
+
+    with tempfile.TemporaryDirectory() as home:
+        # keep the benchmarks away from real sessions
+        os.environ['HOME'] = home
+        os.mkdir(f'{home}/.cl-timer')
+
+        from benchmarks import bench_e2e, bench_graphics, bench_scramble, bench_stats, bench_storage
+        from benchmarks.harness import Results
+
+        modules = {
+            'stats': bench_stats,
+            'graphics': bench_graphics,
+            'scramble': bench_scramble,
+            'storage': bench_storage,
+            'e2e': bench_e2e
+        }
+        results = Results()
+        for name in (args.benchmarks or BENCHMARKS):
+            modules[name].run(results, args.sizes)
+
+        if args.output:
+            results.dump(args.output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+from os.path import dirname
+import random
+import sys
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer import headless
+
+SOLVES = 200
+
+
+def run(results, sizes):
+    rng = random.Random(0)
+    script = headless.open_session('e2e')
+    for i in range(SOLVES):
+        script += headless.solve(round(rng.gauss(15, 2.5), 2))
+        if i % 10 == 9:
+            script += headless.command('p')
+    script += headless.command('rm 1')
+
+    screen = headless.run(script)
+
+    # the key that stops a solve is followed by add_time, stats and the file append
+    results.record('keypress to frame', {'key': 'space', 'solves': SOLVES},
+                   [latency for key, latency in screen.latencies if key == 32])
+    results.record('keypress to frame', {'key': 'command', 'solves': SOLVES},
+                   [latency for key, latency in screen.latencies if key not in [32, 10]])
+    results.record('keypress to frame', {'key': 'enter', 'solves': SOLVES},
+                   [latency for key, latency in screen.latencies if key == 10])
+    # only the panels that changed are written
+    print(f'  {screen.bytes_written / screen.frame_count:.0f} bytes written to the terminal per frame')
@@ -0,0 +1,99 @@
+from os.path import dirname
+import sys
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from benchmarks.harness import FRAME_BUDGET
+from benchmarks.synthetic import generate_scrambles, generate_session
+from cl_timer.art import TIMER_BACKGROUND
+from cl_timer.graphics import Canvas, Char, CoverUpImage, Image, Layout, NumberDisplay, Scramble
+from cl_timer.timer import STATS_WIDTH, STATS_X
+from cl_timer.plot import load_series, Plot, SERIES
+
+TERMINAL_SIZES = [(24, 80), (50, 160), (100, 300)]
+
+char = lambda string: Char.fromstring(string)
+
+
+class Screen:
+    """
+    The widgets of the timer laid out like mainloops does,
+    on a canvas of `lines` by `cols` with no terminal behind it.
+    """
+
+    def __init__(self, lines, cols, scramble):
+        self.canvas = Canvas(lines - 1, cols - 1)
+        self.layout = Layout(self.canvas)
+        fixed = lambda x, y: lambda width, height: (x, y)
+        self.session_name_image = self.layout.add(Image(self.canvas, 0, 0, char('benchmark')), fixed(0, 0))
+        self.scramble_image = self.layout.add(Scramble(self.canvas, 0, 0, char(scramble)), fixed(0, 2))
+        self.scramble_image.render()
+        self.number_display = self.layout.add(NumberDisplay(self.canvas, 0, 0), fixed(15, 7))
+        self.timer_background = self.layout.add(Image(self.canvas, 0, 0, char(TIMER_BACKGROUND)), fixed(0, 5))
+        self.sidebar = [self.layout.add(CoverUpImage(self.canvas, 0, 0, char(f'Stat {i}: 12.34')), self.stats_place(i))
+                        for i in range(8)]
+        for image in self.sidebar:
+            image.render()
+
+    @staticmethod
+    def stats_place(i):
+        def place(width, height):
+            if width >= STATS_X + STATS_WIDTH:
+                return STATS_X, 6 + i
+            return 0, 14 + i
+        return place
+
+    def frame(self):
+        """
+        Everything a frame of the running timer does except for curses calls.
+        Returns the string that would be drawn.
+        """
+        self.number_display.time += 0.01
+        self.number_display.update()
+        self.session_name_image.render()
+        self.timer_background.render()
+        self.number_display.render()
+        return self.canvas.display
+
+
+def run(results, sizes):
+    scramble = generate_scrambles(1, puzzle=7, length=100)[0]
+    for lines, cols in TERMINAL_SIZES:
+        screen = Screen(lines, cols, scramble)
+        params = {'size': f'{lines}x{cols}'}
+        results.add('Canvas.display', params, lambda: screen.canvas.display)
+        result = results.add('frame', params, screen.frame)
+        if result['median'] > FRAME_BUDGET:
+            print(f'  frame at {lines}x{cols} is over the {FRAME_BUDGET * 1000:.0f}ms budget')
+        results.add('Scramble.render', params, screen.scramble_image.render)
+
+        # a window manager dragging the edge of the terminal back and forth
+        widths = [cols - 1, cols - 11]
+        resizes = iter(range(10 ** 9))
+
+        def resize():
+            screen.layout.resize(lines - 1, widths[next(resizes) % 2])
+
+        results.add('Layout.resize', params, resize)
+
+    display = NumberDisplay(Canvas(24, 80), 15, 7)
+
+    def update():
+        display.time += 0.01
+        display.update()
+
+    results.add('NumberDisplay.update', {}, update)
+
+    for n in sizes:
+        times, ao5s, ao12s, _ = generate_session(n)
+        series = load_series(times, ao5s, ao12s)
+        chart = Plot(Canvas(49, 159), 0, 1, 159, 47, series, SERIES)
+
+        def redraw():
+            chart.update()
+            chart.render()
+
+        # drawing all solves is the most work a key press in :plot can cause
+        results.add('Plot.update', {'n': n, 'size': '50x160'}, redraw, repeat=3)
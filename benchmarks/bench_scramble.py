@@ -0,0 +1,30 @@
+from os.path import dirname
+import sys
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer.cube import Cube, is_valid_scramble
+from cl_timer.scramble import expand, generate_scramble, scramble_token, stream_scramble
+
+# (puzzle, scramble length) of the WCA events
+PUZZLES = [(2, 9), (3, 20), (4, 40), (5, 60), (6, 80), (7, 100)]
+
+
+def run(results, sizes):
+    for puzzle, length in PUZZLES:
+        results.add('generate_scramble', {'puzzle': puzzle, 'length': length},
+                    lambda: generate_scramble(puzzle, length))
+        # a stored scramble is made again from its token when it is shown
+        results.add('stream_scramble', {'puzzle': puzzle, 'length': length},
+                    lambda: stream_scramble('bench', puzzle, length, 1000))
+        token = scramble_token('bench', puzzle, length, 1000)
+        results.add('expand (cached)', {'puzzle': puzzle, 'length': length},
+                    lambda: expand(token))
+        scramble = generate_scramble(puzzle, length)
+        # applying a new scramble has to fit in a frame
+        results.add('Cube.apply', {'puzzle': puzzle, 'length': length},
+                    lambda: Cube(puzzle).apply(scramble))
+        results.add('is_valid_scramble', {'puzzle': puzzle, 'length': length},
+                    lambda: is_valid_scramble(scramble, puzzle))
@@ -0,0 +1,123 @@
+from bisect import bisect_left, bisect_right
+from os.path import dirname
+import sys
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from benchmarks.synthetic import generate_session, generate_times
+from cl_timer.distribution import Distribution
+from cl_timer.ranges import RangeIndex
+from cl_timer.stats import (
+    count_successes, get_best_average, get_best_time,
+    get_session_mean, get_worst_time, RollingAverage, solve_average, time_value
+)
+
+# the sketch is checked against sorting on a session this big whatever the sizes are
+ACCURACY_SOLVES = 1000000
+
+QUANTILES = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+
+
+def update_stats(times, ao5s, ao12s, index=None):
+    """
+    What update_stats in timer.py calculates after every solve. The bests
+    come from the personal bests of `index` if it is given, like they do
+    now, and from going through the session if it isn't, like they used to.
+    """
+    if index is None:
+        get_best_average(ao5s)
+        get_best_average(ao12s)
+        get_best_time(times)
+    else:
+        for kind in ['single', 'ao5', 'ao12']:
+            index.records.best(kind)
+    get_worst_time(times)
+    count_successes(times)
+    get_session_mean(times)
+
+
+def scan_range(times, ao5s, ao12s, first, last):
+    """
+    Stats of solves `first` to `last` the way they were worked out
+    before the range index: slicing the range out and going through it
+    """
+    window = times[first - 1:last]
+    get_session_mean(window)
+    get_best_time(window)
+    get_worst_time(window)
+    count_successes(window)
+    get_best_average(ao5s[first - 1:last])
+    get_best_average(ao12s[first - 1:last])
+
+
+def rank_error(values, estimate, q):
+    """
+    How far (as a fraction of all values) the rank of `estimate`
+    in sorted `values` is from `q`
+    """
+    rank = (bisect_left(values, estimate) + bisect_right(values, estimate)) / 2
+    return abs(rank / len(values) - q)
+
+
+def distribution_accuracy(results, n):
+    times = generate_times(n)
+    distribution = Distribution()
+    for t in times:
+        distribution.add(t)
+    values = sorted(v for v in map(time_value, times) if v is not None)
+    errors = [rank_error(values, estimate, q)
+              for q, estimate in zip(QUANTILES, distribution.sketch.quantiles(QUANTILES))]
+    print(f"  sketch of {n} solves keeps {distribution.sketch.size} values, "
+          f"rank error max {max(errors) * 100:.2f}% mean {sum(errors) / len(errors) * 100:.2f}%")
+
+    # what the sketch saves: sorting every time to get the same percentiles
+    results.add('percentiles', {'n': n, 'method': 'sketch'},
+                lambda: distribution.sketch.quantiles(QUANTILES), repeat=3)
+    results.add('percentiles', {'n': n, 'method': 'sort'},
+                lambda: sorted(v for v in map(time_value, times) if v is not None), repeat=3)
+
+
+def run(results, sizes):
+    for n in sizes:
+        times, ao5s, ao12s, _ = generate_session(n)
+
+        results.add('calculate_average', {'n': n, 'length': 5},
+                    lambda: solve_average(times, n, 5))
+        results.add('calculate_average', {'n': n, 'length': 12},
+                    lambda: solve_average(times, n, 12))
+        results.add('update_stats', {'n': n, 'bests': 'scan'},
+                    lambda: update_stats(times, ao5s, ao12s), repeat=3)
+        index = RangeIndex(times, ao5s, ao12s)
+        results.add('update_stats', {'n': n, 'bests': 'records'},
+                    lambda: update_stats(times, ao5s, ao12s, index), repeat=3)
+
+        def rolling():
+            ao5 = RollingAverage(5)
+            ao12 = RollingAverage(12)
+            for t in times:
+                ao5.add(t)
+                ao12.add(t)
+
+        results.add('rolling_averages', {'n': n}, rolling, repeat=3, min_time=0)
+
+        # stats of the middle half of the session
+        first, last = n // 4 + 1, n - n // 4
+        results.add('range stats', {'n': n, 'method': 'scan'},
+                    lambda: scan_range(times, ao5s, ao12s, first, last), repeat=3)
+        results.add('range stats', {'n': n, 'method': 'index'}, lambda: index.query(first, last))
+        results.add('RangeIndex build', {'n': n}, lambda: RangeIndex(times, ao5s, ao12s), repeat=3, min_time=0)
+        # what add_time and set_penalty cost it
+        results.add('RangeIndex.append', {'n': n}, lambda: index.append('12.34', '12.50', '12.61'), min_time=0.05)
+        results.add('RangeIndex.set', {'n': n}, lambda: index.set(first, 'DNF(12.34)', '', ''), min_time=0.05)
+
+        distribution = Distribution()
+        for t in times:
+            distribution.add(t)
+        new_times = iter(generate_times(10 ** 6, seed=1))
+        # what update_stats adds to the sketch after a solve
+        results.add('Distribution.add', {'n': n}, lambda: distribution.add(next(new_times)), min_time=0.05)
+
+    for n in sorted(set(sizes) | {ACCURACY_SOLVES}):
+        distribution_accuracy(results, n)
@@ -0,0 +1,68 @@
+from itertools import cycle
+from os.path import dirname, getsize
+from pathlib import Path
+import sys
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from benchmarks.synthetic import generate_session, write_session
+from cl_timer import archive, storage
+from cl_timer.graphics import Canvas, Char, Image, Scramble
+from cl_timer.interpreter import command_line
+from cl_timer.journal import Journal
+from cl_timer.ranges import RangeIndex
+from cl_timer.stats import solve_average
+from cl_timer.utils import MutableString
+
+char = lambda string: Char.fromstring(string)
+
+
+def run(results, sizes):
+    # HOME is pointed at a temporary directory by __main__
+    home = str(Path.home())
+    canvas = Canvas(23, 79)
+    settings = {'puzzle': '3', 'scramble-length': '20'}
+
+    for n in sizes:
+        times, ao5s, ao12s, scrambles = generate_session(n)
+        session = MutableString('benchmark')
+        session_file = MutableString(f'{home}/.cl-timer/benchmark')
+        settings_file = MutableString(f'{home}/.cl-timer/benchmark-settings.json')
+        write_session(session_file.string, times, ao5s, ao12s, scrambles)
+        range_index = RangeIndex(times, ao5s, ao12s)
+        journal = Journal()
+
+        def run_command(command):
+            command_line(canvas, None, settings, Scramble(canvas, 0, 2, char('R')), settings_file,
+                         session_file, times, ao5s, ao12s, scrambles, session,
+                         Image(canvas, 0, 0, char('benchmark')), lambda: None, None,
+                         lambda solve, length: solve_average(times, solve, length),
+                         lambda: None, lambda: None, range_index, journal, {}, True, command)
+
+        def add_solve():
+            times.append('12.34')
+            ao5s.append('')
+            ao12s.append('')
+            scrambles.append("R U R' U'")
+            range_index.append('12.34', '', '')
+            storage.append(session_file.string, [['12.34', '', '', "R U R' U'"]])
+
+        results.add('rm', {'n': n}, lambda: run_command(f'rm {len(times)}'), add_solve, repeat=3)
+        results.add('penalty', {'n': n}, lambda: run_command('p'), repeat=3)
+        results.add('load session', {'n': n}, lambda: run_command('c benchmark'), repeat=3)
+
+        for puzzle, length in [(3, 20), (7, 100)]:
+            lines = list(zip(*generate_session(n, puzzle, length)))
+            path = f'{home}/.cl-timer/benchmark-{puzzle}'
+            write_session(path, *zip(*lines))
+            results.add('archive', {'n': n, 'puzzle': puzzle},
+                        lambda: archive.write(f'{path}{archive.SUFFIX}', lines), repeat=3)
+            print(f'  {puzzle}x{puzzle} archive of {n} solves is {getsize(path) / getsize(f"{path}{archive.SUFFIX}"):.1f}'
+                  f' times smaller than the session file')
+            session_archive = archive.Archive(f'{path}{archive.SUFFIX}')
+            # a different block each time, so it isn't the cached one
+            blocks = cycle(range(len(session_archive.blocks)))
+            results.add('archive solve', {'n': n, 'puzzle': puzzle},
+                        lambda: session_archive.solve(next(blocks) * archive.BLOCK_SOLVES + 1), repeat=3)
@@ -0,0 +1,127 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+
+# a frame of the timer's mainloop is 10ms long
+FRAME_BUDGET = 0.01
+
+
+def measure(func, setup=None, repeat=5, min_time=0.1):
+    """
+    Returns seconds per call of `func`.
+
+    `func` is called in a loop until `min_time` has passed, `repeat` times over.
+    `setup` is called before each call of `func` and isn't timed.
+    """
+    runs = []
+    for _ in range(repeat):
+        calls = 0
+        elapsed = 0
+        while calls == 0 or elapsed < min_time:
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            elapsed += time.perf_counter() - start
+            calls += 1
+        runs.append(elapsed / calls)
+    return {
+        'mean': statistics.mean(runs),
+        'median': statistics.median(runs),
+        'min': min(runs),
+        'stdev': statistics.stdev(runs) if len(runs) > 1 else 0,
+        'repeat': repeat
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+class Results:
+    """
+    Collects results of benchmarks and writes them as JSON
+    """
+
+    def __init__(self):
+        self.results = []
+
+    def add(self, name, params, func, setup=None, **kwargs):
+        result = measure(func, setup, **kwargs)
+        result['name'] = name
+        result['params'] = params
+        self.results.append(result)
+        print(f"{name:<28}{format_params(params):<26}{result['median'] * 1e6:>14.1f} us")
+        return result
+
+    def record(self, name, params, samples):
+        """
+        Adds result made of seconds in `samples` that were measured elsewhere
+        """
+        samples = sorted(samples)
+        result = {
+            'mean': statistics.mean(samples),
+            'median': statistics.median(samples),
+            'min': samples[0],
+            'p99': samples[int(len(samples) * 0.99)],
+            'stdev': statistics.stdev(samples) if len(samples) > 1 else 0,
+            'repeat': len(samples),
+            'name': name,
+            'params': params
+        }
+        self.results.append(result)
+        print(f"{name:<28}{format_params(params):<26}{result['median'] * 1e6:>14.1f} us"
+              f"  (p99 {result['p99'] * 1e6:.1f} us)")
+        return result
+
+    def dump(self, path):
+        with open(path, 'w') as f:
+            json.dump({
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'time': time.time(),
+                'results': self.results
+            }, f, indent=2)
+
+
+def format_params(params):
+    return ' '.join(f'{key}={value}' for key, value in sorted(params.items()))
+
+
+def key(result):
+    return result['name'], format_params(result['params'])
+
+
+def compare(old_path, new_path, threshold):
+    """
+    Prints change of every benchmark between two result files.
+    Returns number of benchmarks that got slower by more than `threshold`.
+    """
+    with open(old_path) as f:
+        old = {key(result): result for result in json.load(f)['results']}
+    with open(new_path) as f:
+        new = json.load(f)['results']
+
+    regressions = 0
+    for result in new:
+        if key(result) not in old:
+            continue
+        before = old[key(result)]['median']
+        after = result['median']
+        change = (after - before) / before
+        flag = ''
+        if change > threshold:
+            flag = '  SLOWER'
+            regressions += 1
+        elif change < -threshold:
+            flag = '  faster'
+        print(f"{result['name']:<28}{format_params(result['params']):<26}"
+              f"{before * 1e6:>12.1f} us{after * 1e6:>12.1f} us{change * 100:>+8.1f}%{flag}")
+    return regressions
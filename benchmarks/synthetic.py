@@ -0,0 +1,61 @@
+from os.path import dirname
+import random
+import sys
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer.scramble import MOVES
+from cl_timer.stats import RollingAverage
+from cl_timer.utils import add_zero
+
+
+def generate_times(n, mean=15.0, sd=2.5, dnf_rate=0.02, plus_two_rate=0.04, seed=0):
+    """
+    Returns list of `n` times written the way a session file has them,
+    with DNFs and plus-twos at realistic rates.
+    """
+    rng = random.Random(seed)
+    times = []
+    for _ in range(n):
+        t = add_zero(round(max(rng.gauss(mean, sd), 1), 2))
+        r = rng.random()
+        if r < dnf_rate:
+            t = f'DNF({t})'
+        elif r < dnf_rate + plus_two_rate:
+            t = add_zero(round(float(t) + 2, 2)) + '+'
+        times.append(t)
+    return times
+
+
+def generate_scrambles(n, puzzle=3, length=20, seed=0):
+    """
+    Returns `n` random scrambles. Unlike scramble.generate_scramble
+    they can have redundant moves, which doesn't matter for a benchmark.
+    """
+    rng = random.Random(seed)
+    moves = MOVES[puzzle - 2]
+    return [' '.join(rng.choices(moves, k=length)) for _ in range(n)]
+
+
+def generate_session(n, puzzle=3, length=20, seed=0, **kwargs):
+    """
+    Returns times, ao5s, ao12s and scrambles of a session of `n` solves
+    """
+    times = generate_times(n, seed=seed, **kwargs)
+    ao5 = RollingAverage(5)
+    ao12 = RollingAverage(12)
+    ao5s = [ao5.add(t) for t in times]
+    ao12s = [ao12.add(t) for t in times]
+    scrambles = generate_scrambles(n, puzzle, length, seed)
+    return times, ao5s, ao12s, scrambles
+
+
+def write_session(path, times, ao5s, ao12s, scrambles):
+    """
+    Writes session the way cl-timer does
+    """
+    with open(path, 'w') as f:
+        f.write('\n'.join(f'{t}\t{ao5}\t{ao12}\t{scramble}'
+                          for t, ao5, ao12, scramble in zip(times, ao5s, ao12s, scrambles)))
@@ -0,0 +1,268 @@
+from bisect import bisect_right
+import json
+from os import remove, replace, stat
+from os.path import basename, dirname, getsize, isfile
+from pathlib import Path
+import struct
+import sys
+import zlib
+
+try:
+    import lzma
+except ImportError:  # python was built without it
+    lzma = None
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer import storage
+from cl_timer.scramble import MOVES
+from cl_timer.stats import time_value
+
+HOME = str(Path.home())
+
+SUFFIX = '-archive'
+
+MAGIC = b'CLTA'
+VERSION = 1
+
+# solves in each compressed block. Reading one solve decompresses its
+# whole block, which takes about 5ms for 3x3 solves at this size. Blocks
+# 4 times as big only make the archive 3% smaller.
+BLOCK_SOLVES = 1024
+
+# ends the file: where the index starts, how long it is, and MAGIC
+FOOTER = struct.Struct('<QI4s')
+
+# lengths of the text columns at the start of a block: time, ao5, ao12
+# and the scrambles that couldn't be written as moves
+COLUMNS = struct.Struct('<IIII')
+
+# every move of every puzzle, in the order of the tables in scramble.py.
+# A move's code is its index + 1 and 0 ends a scramble. RAW stands for a
+# scramble that isn't made of these moves (like imported ones), which is
+# kept as text. The table is saved in each archive, so changing MOVES
+# doesn't break old ones.
+MOVE_CODES = list(dict.fromkeys(move for moves in MOVES for move in moves))
+RAW = 255
+
+CODECS = {
+    'zlib': (lambda data: zlib.compress(data, 9), zlib.decompress)
+}
+if lzma is not None:
+    CODECS['lzma'] = (lzma.compress, lzma.decompress)
+DEFAULT_CODEC = 'lzma' if lzma is not None else 'zlib'
+
+
+def encode_scrambles(scrambles, codes):
+    """
+    Returns bytes of `scrambles` with each move as a byte,
+    and list of the ones that had to be kept as text
+    """
+    out = bytearray()
+    raw = []
+    for scramble in scrambles:
+        moves = scramble.split(' ') if scramble else []
+        if all(move in codes for move in moves):
+            out.extend(codes[move] for move in moves)
+        else:
+            out.append(RAW)
+            raw.append(scramble)
+        out.append(0)
+    return bytes(out), raw
+
+
+def decode_scrambles(data, raw, moves):
+    """
+    Returns list of the scrambles in `data` and `raw`, written by encode_scrambles
+    """
+    table = [None] + moves
+    raw = iter(raw)
+    scrambles = []
+    for codes in data.split(b'\0')[:-1]:
+        if codes == b'\xff':
+            scrambles.append(next(raw))
+        else:
+            scrambles.append(' '.join([table[code] for code in codes]))
+    return scrambles
+
+
+def encode_block(lines, codes):
+    scrambles, raw = encode_scrambles([str(line[3]) for line in lines], codes)
+    columns = ['\n'.join(str(line[i]) for line in lines).encode() for i in range(3)]
+    columns.append('\n'.join(raw).encode())
+    return COLUMNS.pack(*(len(column) for column in columns)) + b''.join(columns) + scrambles
+
+
+def decode_block(data, moves):
+    lengths = COLUMNS.unpack_from(data)
+    columns = []
+    start = COLUMNS.size
+    for length in lengths:
+        columns.append(data[start:start + length].decode().split('\n'))
+        start += length
+    scrambles = decode_scrambles(data[start:], columns.pop(), moves)
+    return [list(line) for line in zip(*columns, scrambles)]
+
+
+def write(path, lines, entry=None, codec=DEFAULT_CODEC, progress=None):
+    """
+    Writes `lines` (lists of columns) to an archive at `path`.
+
+    Lines are written in compressed blocks of BLOCK_SOLVES. The index at
+    the end of the file has where each block is and the lowest and highest
+    time in it, so a single solve or the solves in a range of times can be
+    read without decompressing the others. `entry` (the session's catalog
+    entry) is kept in the index.
+
+    `progress` is called with the fraction of lines written after each block.
+    """
+    compress = CODECS[codec][0]
+    codes = {move: i + 1 for i, move in enumerate(MOVE_CODES)}
+    lines = list(lines)
+    blocks = []
+    tmp = f'{dirname(path)}/.{basename(path)}.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC + bytes([VERSION]))
+            for first in range(0, len(lines), BLOCK_SOLVES):
+                block = lines[first:first + BLOCK_SOLVES]
+                data = compress(encode_block(block, codes))
+                values = [value for value in (time_value(line[0]) for line in block) if value is not None]
+                blocks.append([f.tell(), len(data), first, len(block),
+                               min(values) if values else None, max(values) if values else None])
+                f.write(data)
+                if progress is not None:
+                    progress((first + len(block)) / len(lines))
+
+            index = zlib.compress(json.dumps({
+                'version': VERSION,
+                'codec': codec,
+                'moves': MOVE_CODES,
+                'count': len(lines),
+                'entry': entry,
+                'blocks': blocks
+            }).encode())
+            offset = f.tell()
+            f.write(index)
+            f.write(FOOTER.pack(offset, len(index), MAGIC))
+    except BaseException:  # cancelled, or couldn't write it
+        remove(tmp)
+        raise
+    replace(tmp, path)
+
+
+class Archive:
+    """
+    Archive file written by `write`. Only its index is read when it is opened.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f'not an archive: {path}')
+            f.seek(-FOOTER.size, 2)
+            offset, length, magic = FOOTER.unpack(f.read(FOOTER.size))
+            if magic != MAGIC:
+                raise ValueError(f'archive is cut off: {path}')
+            f.seek(offset)
+            self.index = json.loads(zlib.decompress(f.read(length)))
+        self.decompress = CODECS[self.index['codec']][1]
+        self.moves = self.index['moves']
+        self.blocks = self.index['blocks']
+        self.firsts = [block[2] for block in self.blocks]
+        self.count = self.index['count']
+        self.entry = self.index['entry']
+        self._cached = (None, None)  # last block read, as (number, lines)
+
+    def block(self, i):
+        """
+        Returns lines of block `i`
+        """
+        if self._cached[0] == i:
+            return self._cached[1]
+        offset, length = self.blocks[i][:2]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            lines = decode_block(self.decompress(f.read(length)), self.moves)
+        self._cached = (i, lines)
+        return lines
+
+    def solve(self, n):
+        """
+        Returns line of solve number `n` (starting at 1)
+        """
+        if not 1 <= n <= self.count:
+            raise IndexError(f'no solve {n} in archive of {self.count} solves')
+        i = bisect_right(self.firsts, n - 1) - 1
+        return self.block(i)[n - 1 - self.firsts[i]]
+
+    def between(self, low, high):
+        """
+        Yields (number, line) of each solve with a time from `low` to `high`.
+        Blocks with no times in that range aren't read.
+        """
+        for i, (_, _, first, _, lowest, highest) in enumerate(self.blocks):
+            if lowest is None or highest < low or lowest > high:
+                continue
+            for j, line in enumerate(self.block(i)):
+                value = time_value(line[0])
+                if value is not None and low <= value <= high:
+                    yield first + j + 1, line
+
+    def lines(self, progress=None):
+        """
+        Yields line of every solve, one block at a time
+        """
+        for i in range(len(self.blocks)):
+            yield from self.block(i)
+            if progress is not None:
+                progress((i + 1) / len(self.blocks))
+
+
+def archive_file(name):
+    return f'{HOME}/.cl-timer/{name}{SUFFIX}'
+
+
+def is_archived(name):
+    return isfile(archive_file(name))
+
+
+def archive_session(name, entry=None, progress=None):
+    """
+    Packs session `name` into an archive and removes its session file.
+    Returns sizes of the session file and of the archive.
+    """
+    session_file = f'{HOME}/.cl-timer/{name}'
+    with storage.locked(session_file):
+        size = getsize(session_file)
+        write(archive_file(name), storage.load(session_file), entry, progress=progress)
+        remove(session_file)
+        if isfile(f'{session_file}-distribution.json'):
+            remove(f'{session_file}-distribution.json')
+    return size, getsize(archive_file(name))
+
+
+def restore(name, progress=None):
+    """
+    Unpacks archive of session `name` back into its session file.
+    Solves that were added to the session since it was archived
+    are put after the archived ones.
+    """
+    session_file = f'{HOME}/.cl-timer/{name}'
+    with storage.locked(session_file):
+        lines = list(Archive(archive_file(name)).lines(progress))
+        if isfile(session_file):
+            lines.extend(storage.load(session_file))
+        storage.replace_with(session_file, storage.write_tmp(session_file, lines))
+        remove(archive_file(name))
+
+
+def signature(name):
+    """
+    Size and modification time of archive, like catalog.file_signature
+    """
+    s = stat(archive_file(name))
+    return [s.st_size, s.st_mtime_ns]
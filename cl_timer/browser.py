@@ -0,0 +1,178 @@
+from os.path import dirname
+import sys
+import time
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer.scramble import expand
+from cl_timer.utils import remove_penalty
+
+
+def parse_time_range(string):
+    """
+    Takes string like "10-12.5" and returns (10.0, 12.5).
+
+    Either end can be left out, as in "-9" or "20-".
+    """
+    lower, _, upper = string.partition('-')
+    lower = float(lower) if lower.strip() else 0
+    upper = float(upper) if upper.strip() else float('inf')
+    return lower, upper
+
+
+class SessionView:
+    """
+    A window onto the solves of a session.
+
+    Only holds the position of the window,
+    rows are read from the session's lists when they are drawn.
+    """
+
+    def __init__(self, times, ao5s, ao12s, scrambles, height):
+        self.times = times
+        self.ao5s = ao5s
+        self.ao12s = ao12s
+        self.scrambles = scrambles
+        self.height = height
+        self.top = 0
+        self.selected = 0
+
+    def __len__(self):
+        return len(self.times)
+
+    def select(self, i):
+        """
+        Selects solve at index `i` and scrolls just enough to show it
+        """
+        self.selected = max(0, min(i, len(self) - 1))
+        if self.selected < self.top:
+            self.top = self.selected
+        elif self.selected >= self.top + self.height:
+            self.top = self.selected - self.height + 1
+
+    def rows(self):
+        """
+        Returns (index, time, ao5, ao12, scramble) for each visible solve
+        """
+        bottom = min(self.top + self.height, len(self))
+        return zip(range(self.top, bottom),
+                   self.times[self.top:bottom], self.ao5s[self.top:bottom],
+                   self.ao12s[self.top:bottom], self.scrambles[self.top:bottom])
+
+    def find(self, lower, upper):
+        """
+        Returns index of the next solve after the selected one
+        with a time between `lower` and `upper`, or None.
+
+        DNFs are never matched.
+        """
+        n = len(self)
+        for k in range(1, n + 1):
+            i = (self.selected + k) % n
+            t = self.times[i]
+            if str(t)[:3] == 'DNF':
+                continue
+            if lower <= float(remove_penalty(t)) <= upper:
+                return i
+        return None
+
+
+def browse(stdscr, session_name, times, ao5s, ao12s, scrambles, set_penalty, solve=1):
+    """
+    Scrollable table of all the solves in the session.
+
+    arrows/j/k - move, PgUp/PgDn - move by a page
+    g - go to solve, / - find time in range, n - find again
+    d - toggle DNF, p - toggle plus-two, q/escape - exit
+    """
+    lines, cols = stdscr.getmaxyx()
+    view = SessionView(times, ao5s, ao12s, scrambles, lines - 3)
+    view.select(solve - 1)
+
+    prompt = None  # (label, typed text) while asking for a value
+    last_range = None
+    message = ''
+    redraw = True
+
+    while True:
+        key = stdscr.getch()
+
+        if key == -1:
+            pass
+        elif key == 410:  # terminal was resized
+            lines, cols = stdscr.getmaxyx()
+            view.height = lines - 3
+            view.select(view.selected)
+        elif prompt is not None:
+            label, text = prompt
+            if key == 27:
+                prompt = None
+            elif key == 127:
+                prompt = (label, text[:-1])
+            elif key == 10:
+                prompt = None
+                try:
+                    if label == 'go to solve: ':
+                        view.select(int(text) - 1)
+                    else:
+                        last_range = parse_time_range(text)
+                        found = view.find(*last_range)
+                        if found is None:
+                            message = f'no times in range {text}'
+                        else:
+                            view.select(found)
+                except ValueError:
+                    message = f'invalid value: {text}'
+            elif 32 <= key < 127:
+                prompt = (label, text + chr(key))
+        elif key in [27, ord('q')]:
+            return
+        elif key in [259, ord('k')]:  # up arrow
+            view.select(view.selected - 1)
+        elif key in [258, ord('j')]:  # down arrow
+            view.select(view.selected + 1)
+        elif key == 339:  # page up
+            view.select(view.selected - view.height)
+        elif key == 338:  # page down
+            view.select(view.selected + view.height)
+        elif key == ord('g'):
+            prompt = ('go to solve: ', '')
+        elif key == ord('/'):
+            prompt = ('time range (min-max): ', '')
+        elif key == ord('n') and last_range is not None:
+            found = view.find(*last_range)
+            if found is not None:
+                view.select(found)
+        elif key in [ord('d'), ord('p')] and len(view) > 0:
+            t = str(times[view.selected])
+            penalty = 'DNF' if key == ord('d') else '+2'
+            if (penalty == 'DNF' and t[:3] == 'DNF') or (penalty == '+2' and t[-1] == '+'):
+                penalty = ''
+            set_penalty(view.selected + 1, penalty)
+
+        if key != -1:
+            redraw = True
+        if not redraw:
+            time.sleep(0.01)
+            continue
+        redraw = False
+
+        rows = [f'{session_name} - solve {view.selected + 1}/{len(view)}',
+                f"  {'#':<8}{'time':<13}{'ao5':<9}{'ao12':<9}scramble"]
+        for i, t, ao5, ao12, scramble in view.rows():
+            marker = '> ' if i == view.selected else '  '
+            rows.append(f'{marker}{i + 1:<8}{t:<13}{ao5:<9}{ao12:<9}{expand(scramble)}')
+        rows = [row[:cols - 1] for row in rows]
+        rows += ['' for _ in range(lines - 2 - len(rows))]
+
+        if prompt is not None:
+            rows.append(''.join(prompt)[:cols - 1])
+        else:
+            rows.append((message or 'g: go to  /: find  d: DNF  p: +2  q: exit')[:cols - 1])
+            message = ''
+
+        stdscr.clear()
+        stdscr.addstr('\n'.join(rows))
+        stdscr.refresh()
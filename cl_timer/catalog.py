@@ -0,0 +1,360 @@
+import json
+from os import listdir, replace, stat
+from os.path import dirname, isfile
+from pathlib import Path
+import sys
+import time
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer import archive, journal, storage, trainer
+from cl_timer.stats import time_value
+from cl_timer.utils import add_zero
+
+HOME = str(Path.home())
+
+CATALOG_FILE = f'{HOME}/.cl-timer/.catalog.json'
+
+# files in ~/.cl-timer that belong to a session but aren't one.
+SIDECAR_SUFFIXES = ['-settings.json', '-distribution.json', archive.SUFFIX, journal.SUFFIX, trainer.SUFFIX]
+
+_catalog = {}
+_catalog_version = None  # (inode, mtime) of the catalog file when it was read
+
+
+def is_reserved(name):
+    """
+    Whether `name` can't be used for a session
+    because cl-timer keeps other files under that name.
+    """
+    if name.startswith('.'):
+        return True
+    for suffix in SIDECAR_SUFFIXES:
+        if name.endswith(suffix):
+            return True
+    return False
+
+
+def is_session_file(filename):
+    """
+    Whether `filename` (in ~/.cl-timer) holds the solves of a session
+    """
+    return (not is_reserved(filename)) and isfile(f'{HOME}/.cl-timer/{filename}')
+
+
+def _best(values):
+    """
+    Returns the smallest non-DNF value of `values` as it was written
+    """
+    best = ''
+    best_value = None
+    for v in values:
+        value = time_value(v)
+        if value is not None and (best_value is None or value < best_value):
+            best, best_value = v, value
+    return best
+
+
+def load_catalog():
+    """
+    Returns dict of session name to session metadata.
+
+    The catalog file is only re-read if another cl-timer wrote to it
+    (which replaces it, so its inode changes even if its mtime doesn't).
+    """
+    global _catalog, _catalog_version
+    try:
+        s = stat(CATALOG_FILE)
+    except FileNotFoundError:
+        return _catalog
+    if (s.st_ino, s.st_mtime_ns) != _catalog_version:
+        try:
+            with open(CATALOG_FILE, 'r') as f:
+                _catalog = json.load(f)
+        except ValueError:
+            _catalog = {}
+        _catalog_version = (s.st_ino, s.st_mtime_ns)
+    return _catalog
+
+
+def save_catalog():
+    """
+    Writes catalog to disk, replacing the old file in one step
+    so that a reader never sees half of it.
+
+    Call this while holding the lock on CATALOG_FILE, after loading it,
+    or changes other cl-timers made in the meantime are lost.
+    """
+    global _catalog_version
+    with open(f'{CATALOG_FILE}.tmp', 'w') as f:
+        json.dump(_catalog, f)
+    replace(f'{CATALOG_FILE}.tmp', CATALOG_FILE)
+    s = stat(CATALOG_FILE)
+    _catalog_version = (s.st_ino, s.st_mtime_ns)
+
+
+def file_signature(session_file):
+    """
+    Size and modification time of session file,
+    used to tell if an entry is out of date.
+    """
+    try:
+        s = stat(session_file)
+    except FileNotFoundError:
+        return [0, 0]
+    return [s.st_size, s.st_mtime_ns]
+
+
+def update_entry(name, count, successes, puzzle, best, best_ao5, best_ao12, mean):
+    """
+    Records new metadata for session `name`
+
+    Called whenever a session is written to, with stats that were
+    already calculated for the sidebar, so nothing is re-read here.
+    """
+    with storage.locked(CATALOG_FILE):
+        catalog = load_catalog()
+        catalog[name] = {
+            'count': count,
+            'successes': successes,
+            'puzzle': puzzle,
+            'best': best,
+            'best-ao5': best_ao5,
+            'best-ao12': best_ao12,
+            'mean': mean,
+            'modified': time.time(),
+            'signature': file_signature(f'{HOME}/.cl-timer/{name}')
+        }
+        save_catalog()
+
+
+def scan_session(name):
+    """
+    Reads session file line by line and returns its catalog entry
+    """
+    session_file = f'{HOME}/.cl-timer/{name}'
+    with open(session_file, 'r') as f:
+        entry = scan_lines(line.rstrip('\n').split('\t') for line in f)
+
+    entry['puzzle'] = '3'
+    try:
+        with open(f'{session_file}-settings.json', 'r') as f:
+            entry['puzzle'] = json.load(f).get('puzzle', entry['puzzle'])
+    except (FileNotFoundError, ValueError):
+        pass
+
+    signature = file_signature(session_file)
+    entry['modified'] = signature[1] / 1e9
+    entry['signature'] = signature
+    return entry
+
+
+def scan_lines(lines):
+    """
+    Returns the stats of a catalog entry of a session with `lines` (lists of columns)
+    """
+    count = 0
+    successes = 0
+    total = 0
+    best = best_ao5 = best_ao12 = ''
+    for line in lines:
+        if len(line) < 4:
+            continue
+        count += 1
+        value = time_value(line[0])
+        if value is not None:
+            successes += 1
+            total += value
+        best = _best([best, line[0]])
+        best_ao5 = _best([best_ao5, line[1]])
+        best_ao12 = _best([best_ao12, line[2]])
+
+    return {
+        'count': count,
+        'successes': successes,
+        'best': best,
+        'best-ao5': best_ao5,
+        'best-ao12': best_ao12,
+        'mean': add_zero(round(total / successes, 2)) if successes else ''
+    }
+
+
+def archived_sessions():
+    """
+    Returns names of the sessions that are only in an archive
+    """
+    names = []
+    for filename in listdir(f'{HOME}/.cl-timer'):
+        name = filename[:-len(archive.SUFFIX)]
+        if filename.endswith(archive.SUFFIX) and not is_reserved(name) and not is_session_file(name):
+            names.append(name)
+    return names
+
+
+def archived_entry(name):
+    """
+    Returns catalog entry of archived session,
+    which was kept in the archive's index when it was archived
+    """
+    session_archive = archive.Archive(archive.archive_file(name))
+    entry = session_archive.entry
+    if entry is None:
+        entry = scan_lines(session_archive.lines())
+        entry['puzzle'] = '3'
+    entry['archived'] = True
+    entry['signature'] = signature = archive.signature(name)
+    entry.setdefault('modified', signature[1] / 1e9)
+    return entry
+
+
+def refresh():
+    """
+    Brings catalog up to date with ~/.cl-timer
+
+    Only sessions that were changed outside of cl-timer
+    (or before the catalog existed) are read. That is done without
+    the lock, which is only held to put what was read into the catalog.
+    """
+    def stale(catalog, name, archived):
+        entry = catalog.get(name)
+        signature = archive.signature(name) if archived else file_signature(f'{HOME}/.cl-timer/{name}')
+        return entry is None or entry['signature'] != signature
+
+    catalog = load_catalog()
+    found = {}  # name -> (new entry, whether it is archived)
+
+    names = [name for name in listdir(f'{HOME}/.cl-timer') if is_session_file(name)]
+    for name in names:
+        if stale(catalog, name, False):
+            found[name] = (scan_session(name), False)
+
+    archived = archived_sessions()
+    for name in archived:
+        if stale(catalog, name, True):
+            found[name] = (archived_entry(name), True)
+    names = set(names + archived)
+
+    if not found and all(name in names for name in catalog):
+        return catalog
+    with storage.locked(CATALOG_FILE):
+        catalog = load_catalog()
+        for name, (entry, is_archived) in found.items():
+            # unless another cl-timer wrote a newer one in the meantime
+            if stale(catalog, name, is_archived):
+                catalog[name] = entry
+        for name in list(catalog.keys()):
+            # (a session made since they were listed is kept)
+            if name not in names and not (is_session_file(name) or archive.is_archived(name)):
+                del catalog[name]
+        save_catalog()
+    return catalog
+
+
+def fuzzy_score(query, name):
+    """
+    Returns how well `query` matches `name`, or None if it doesn't.
+
+    Every char of the query has to appear in the name in order.
+    Chars that follow each other or start a word score higher.
+    """
+    if not query:
+        return 0
+    query = query.lower()
+    name = name.lower()
+    score = 0
+    previous = -2
+    i = 0
+    for c in query:
+        i = name.find(c, i)
+        if i == -1:
+            return None
+        if i == previous + 1:
+            score += 3
+        if i == 0 or name[i - 1] in ' -_.':
+            score += 2
+        score += 1
+        previous = i
+        i += 1
+    # shorter names are closer matches
+    return score - len(name) / 100
+
+
+def search(query):
+    """
+    Returns list of (name, entry) for sessions matching `query`,
+    best matches first and most recently used first among equals.
+    """
+    matches = []
+    for name, entry in load_catalog().items():
+        score = fuzzy_score(query, name)
+        if score is not None:
+            matches.append((score, entry['modified'], name, entry))
+    matches.sort(reverse=True)
+    return [(name, entry) for _, _, name, entry in matches]
+
+
+def format_entry(name, entry):
+    """
+    One line of the session picker
+    """
+    modified = time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['modified']))
+    puzzle = f"{entry['puzzle']}x{entry['puzzle']}"
+    solves = f"{entry['successes']}/{entry['count']}"
+    return (f"{name[:24]:<25}{puzzle:<8}{solves:<13}{entry['best']:<9}"
+            f"{entry['best-ao5']:<9}{entry['best-ao12']:<9}{modified}"
+            f"{'  archived' if entry.get('archived') else ''}")
+
+
+def pick_session(stdscr, query=''):
+    """
+    Lets user choose a session by typing part of it's name.
+
+    Up and down arrows move the selection, enter picks it,
+    escape cancels. Returns the name of the session or None.
+    """
+    refresh()
+    selected = 0
+    matches = search(query)
+
+    while True:
+        key = stdscr.getch()
+
+        if key == 27:  # escape
+            return None
+        elif key == 10:  # enter
+            if matches:
+                return matches[min(selected, len(matches) - 1)][0]
+        elif key == 127:  # backspace
+            query = query[:-1]
+            matches = search(query)
+            selected = 0
+        elif key == 259:  # up arrow
+            selected = max(selected - 1, 0)
+        elif key == 258:  # down arrow
+            selected = min(selected + 1, max(len(matches) - 1, 0))
+        elif 32 <= key < 127:
+            query += chr(key)
+            matches = search(query)
+            selected = 0
+
+        lines, cols = stdscr.getmaxyx()
+        rows = [f"  {'session':<25}{'puzzle':<8}{'solves':<13}{'best':<9}"
+                f"{'ao5':<9}{'ao12':<9}last used"]
+
+        # only show the part of the list around the selection
+        top = max(0, selected - (lines - 4))
+        for i, (name, entry) in enumerate(matches[top:top + lines - 3]):
+            marker = '> ' if i + top == selected else '  '
+            rows.append(marker + format_entry(name, entry))
+
+        rows = [row[:cols - 1] for row in rows]
+        rows += ['' for _ in range(lines - 2 - len(rows))]
+        rows.append(f'session: {query}'[:cols - 1])
+
+        stdscr.clear()
+        stdscr.addstr('\n'.join(rows))
+        stdscr.refresh()
+
+        time.sleep(0.01)
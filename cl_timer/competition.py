@@ -0,0 +1,394 @@
+import asyncio
+from bisect import bisect_left, insort
+from collections import deque
+import json
+from os.path import dirname
+import queue
+import socket
+import struct
+import sys
+import threading
+import time
+import zlib
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer.stats import average, time_value
+from cl_timer.sync import recv_message, send_message
+from cl_timer.utils import add_zero
+
+DEFAULT_PORT = 7419
+
+# how often displays are sent the leaderboard while solves are coming in.
+# Solves that come in between are sent together.
+REFRESH = 0.05
+
+# how many competitors each ranking on a display shows
+TOP = 20
+
+RANKINGS = ['single', 'ao5', 'mo3']
+
+TIMEOUT = 10
+RETRY_DELAY = 5
+
+
+# Protocol
+#
+# Messages are framed like sync's: zlib compressed JSON prefixed with
+# its length. A station sends
+#
+#     {"type": "solve", "competitor": name, "event": puzzle, "solve": n, "time": t}
+#
+# for each solve and gets no answer. `n` is the number of the solve in
+# the station's session, and the station sends it again with the new time
+# when the solve is given a penalty. A display sends
+#
+#     {"type": "watch", "event": puzzle}
+#
+# and is then sent {"type": "leaderboard", "event": puzzle, "solves": n,
+# "rankings": {"single": [[name, value], ...], "ao5": ..., "mo3": ...}}
+# right away and again at most every REFRESH seconds while it changes.
+
+
+def parse_address(address):
+    """
+    Takes "host:port" (or just "host") and returns (host, port)
+    """
+    host, _, port = address.rpartition(':')
+    if not host:
+        return port, DEFAULT_PORT
+    return host, int(port)
+
+
+class Ranking:
+    """
+    Competitors in order of their best result, kept sorted as results
+    come in. A better result moves a competitor with a bisect to find
+    the old entry and another to insert the new one, so nothing is
+    re-sorted however many competitors there are.
+    """
+
+    def __init__(self):
+        self.entries = []  # (value, name), best first
+        self.best = {}  # name -> value
+
+    def submit(self, name, value):
+        """
+        Records `value` for competitor `name`.
+        Returns whether it was their best so far.
+        """
+        old = self.best.get(name)
+        if value is None or (old is not None and value >= old):
+            return False
+        if old is not None:
+            del self.entries[bisect_left(self.entries, (old, name))]
+        insort(self.entries, (value, name))
+        self.best[name] = value
+        return True
+
+    def replace(self, name, value):
+        """
+        Makes `value` the best result of competitor `name`, even if it is
+        worse than the one they had (None for no result)
+        """
+        old = self.best.pop(name, None)
+        if old is not None:
+            del self.entries[bisect_left(self.entries, (old, name))]
+        if value is not None:
+            insort(self.entries, (value, name))
+            self.best[name] = value
+
+    def rank(self, name):
+        """
+        Place of competitor `name` (starting at 1), or None if they have no result
+        """
+        if name not in self.best:
+            return None
+        return bisect_left(self.entries, (self.best[name], name)) + 1
+
+    def top(self, n):
+        return [[name, add_zero(value)] for value, name in self.entries[:n]]
+
+
+def results(last_5):
+    """
+    Returns values of the single, ao5 and mo3 that end with the last of
+    times `last_5` (None for DNFs and ones there aren't enough solves for)
+    """
+    ao5 = mo3 = None
+    if len(last_5) == 5:
+        ao5 = time_value(average(list(last_5)))
+    if len(last_5) >= 3:
+        values = [time_value(solve) for solve in last_5[-3:]]
+        if None not in values:
+            mo3 = round(sum(values) / 3, 2)
+    return {'single': time_value(last_5[-1]), 'ao5': ao5, 'mo3': mo3}
+
+
+class Competitor:
+    """
+    Solves of a competitor in one event, in the order of their numbers
+    """
+
+    def __init__(self):
+        self.numbers = []
+        self.times = []
+
+    def is_next(self, solve):
+        return not self.numbers or solve > self.numbers[-1]
+
+    def add(self, solve, t):
+        """
+        Adds solve `solve`, which has to come after the others.
+        Returns values of the single, ao5 and mo3 that end with it.
+        """
+        self.numbers.append(solve)
+        self.times.append(t)
+        return results(self.times[-5:])
+
+    def set(self, solve, t):
+        """
+        Adds solve `solve` or changes its time (after a penalty).
+        Returns the best single, ao5 and mo3 of all the solves, since
+        the ones it was part of may have been the best.
+        """
+        i = bisect_left(self.numbers, solve)
+        if i < len(self.numbers) and self.numbers[i] == solve:
+            self.times[i] = t
+        else:
+            self.numbers.insert(i, solve)
+            self.times.insert(i, t)
+        best = dict.fromkeys(RANKINGS)
+        for end in range(1, len(self.times) + 1):
+            for ranking, value in results(self.times[max(end - 5, 0):end]).items():
+                if value is not None and (best[ranking] is None or value < best[ranking]):
+                    best[ranking] = value
+        return best
+
+
+class Event:
+    """
+    Rankings of the competitors of one event (a puzzle)
+    """
+
+    def __init__(self):
+        self.rankings = {name: Ranking() for name in RANKINGS}
+        self.competitors = {}
+        self.solves = 0
+
+    def submit(self, name, solve, t):
+        """
+        Records solve number `solve` of competitor `name` (the one after
+        their last if it is None), or its new time if it was sent before
+        """
+        competitor = self.competitors.setdefault(name, Competitor())
+        if solve is None:
+            solve = competitor.numbers[-1] + 1 if competitor.numbers else 1
+        if competitor.is_next(solve):
+            # a new solve can only make the rankings better
+            self.solves += 1
+            for ranking, value in competitor.add(solve, t).items():
+                self.rankings[ranking].submit(name, value)
+            return
+        if solve not in competitor.numbers:
+            self.solves += 1
+        for ranking, value in competitor.set(solve, t).items():
+            self.rankings[ranking].replace(name, value)
+
+    def leaderboard(self, event, n=TOP):
+        return {
+            'type': 'leaderboard',
+            'event': event,
+            'solves': self.solves,
+            'competitors': len(self.competitors),
+            'rankings': {name: ranking.top(n) for name, ranking in self.rankings.items()}
+        }
+
+
+async def read_message(reader):
+    length, = struct.unpack('>I', await reader.readexactly(4))
+    return json.loads(zlib.decompress(await reader.readexactly(length)))
+
+
+def encode_message(message):
+    data = zlib.compress(json.dumps(message, separators=(',', ':')).encode())
+    return struct.pack('>I', len(data)) + data
+
+
+class CompetitionServer:
+    """
+    Collects solves from the cl-timers of a competition and streams
+    the rankings of each event to the displays watching it.
+
+    Everything runs on one asyncio loop, so there are no locks. A solve
+    only updates the rankings and marks its event as changed. Displays of
+    changed events are sent the leaderboard every REFRESH seconds, so a
+    burst of solves from every station costs one leaderboard per display.
+    """
+
+    def __init__(self):
+        self.events = {}  # puzzle -> Event
+        self.watchers = {}  # puzzle -> set of StreamWriters
+        self.changed = set()
+        self.wake = None
+
+    def event(self, puzzle):
+        if puzzle not in self.events:
+            self.events[puzzle] = Event()
+        return self.events[puzzle]
+
+    def submit(self, competitor, puzzle, solve, t):
+        self.event(puzzle).submit(competitor, solve, t)
+        if self.watchers.get(puzzle):
+            self.changed.add(puzzle)
+            self.wake.set()
+
+    async def handle(self, reader, writer):
+        watching = None
+        try:
+            while True:
+                message = await read_message(reader)
+                if message.get('type') == 'solve':
+                    solve = message.get('solve')
+                    self.submit(str(message['competitor']), str(message['event']),
+                                None if solve is None else int(solve), str(message['time']))
+                elif message.get('type') == 'watch':
+                    watching = str(message['event'])
+                    self.watchers.setdefault(watching, set()).add(writer)
+                    writer.write(encode_message(self.event(watching).leaderboard(watching)))
+                else:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, struct.error, zlib.error, ValueError, KeyError):
+            pass
+        finally:
+            if watching is not None:
+                self.watchers[watching].discard(writer)
+            writer.close()
+
+    async def broadcast(self):
+        """
+        Sends leaderboards of changed events to their displays, at most every REFRESH seconds
+        """
+        while True:
+            await self.wake.wait()
+            self.wake.clear()
+            changed, self.changed = self.changed, set()
+            for puzzle in changed:
+                data = encode_message(self.event(puzzle).leaderboard(puzzle))
+                for writer in list(self.watchers.get(puzzle, [])):
+                    writer.write(data)
+            await asyncio.sleep(REFRESH)
+
+    async def serve(self, host, port, started=None):
+        self.wake = asyncio.Event()
+        server = await asyncio.start_server(self.handle, host, port)
+        if started is not None:
+            started(server.sockets[0].getsockname()[1])
+        async with server:
+            await asyncio.gather(server.serve_forever(), self.broadcast())
+
+
+def serve(host, port, started=None):
+    """
+    Runs a competition server until it is interrupted.
+    `started` is called with the port once it is listening.
+    """
+    asyncio.run(CompetitionServer().serve(host, port, started))
+
+
+class CompetitionClient:
+    """
+    Sends the solves of this cl-timer to a competition server.
+
+    Like sync, sending runs on a thread of its own, so `submit` only puts
+    the solve on a queue. Solves that couldn't be sent are kept and sent
+    when the server can be reached again.
+    """
+
+    def __init__(self, server, competitor):
+        self.address = parse_address(server)
+        self.competitor = competitor
+        self.queue = queue.Queue()
+        self.error = None
+        self.events = {}  # solve number -> event it was sent to
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, t, puzzle, solve):
+        self.events[solve] = str(puzzle)
+        self.queue.put_nowait({'type': 'solve', 'competitor': self.competitor,
+                               'event': str(puzzle), 'solve': solve, 'time': str(t)})
+
+    def change(self, solve, t):
+        """
+        Sends the new time of solve `solve` (after a penalty), if it was sent
+        """
+        if solve in self.events:
+            self.submit(t, self.events[solve], solve)
+
+    def stop(self):
+        """
+        Gives solves that weren't sent yet a second to go
+        """
+        self.queue.put(None)
+        self.thread.join(1)
+
+    def _run(self):
+        pending = deque()
+        sock = None
+        while True:
+            message = self.queue.get()
+            if message is None:
+                break
+            pending.append(message)
+            while pending:
+                try:
+                    if sock is None:
+                        sock = socket.create_connection(self.address, TIMEOUT)
+                    send_message(sock, pending[0])
+                    pending.popleft()
+                    self.error = None
+                except OSError as e:
+                    self.error = str(e)
+                    if sock is not None:
+                        sock.close()
+                        sock = None
+                    time.sleep(RETRY_DELAY)
+        if sock is not None:
+            sock.close()
+
+
+def format_leaderboard(board, width=80):
+    """
+    Returns text of a leaderboard message, the rankings side by side
+    """
+    column = max(width // len(RANKINGS), 20)
+    lines = [f"EVENT {board['event']}x{board['event']}    "
+             f"{board['competitors']} competitors, {board['solves']} solves", '']
+    lines.append(''.join(f'{name.upper():<{column}}' for name in RANKINGS).rstrip())
+    rankings = [board['rankings'][name] for name in RANKINGS]
+    for i in range(max(len(ranking) for ranking in rankings)):
+        row = ''
+        for ranking in rankings:
+            cell = f'{i + 1:>2}. {ranking[i][0][:column - 14]:<{column - 14}} {ranking[i][1]:>7}' \
+                if i < len(ranking) else ''
+            row += f'{cell:<{column}}'
+        lines.append(row.rstrip())
+    return '\n'.join(lines)
+
+
+def watch(server, puzzle):
+    """
+    Yields leaderboards of event `puzzle` as the server sends them
+    """
+    with socket.create_connection(parse_address(server), TIMEOUT) as sock:
+        send_message(sock, {'type': 'watch', 'event': str(puzzle)})
+        sock.settimeout(None)
+        while True:
+            yield recv_message(sock)
+
+
+# client of the competition the running timer is in, or None
+client = None
@@ -0,0 +1,222 @@
+from functools import lru_cache
+from operator import itemgetter
+
+FACES = 'URFDLB'
+
+# colors of the faces in the standard color scheme, as shown in nets
+COLORS = 'WRGYOB'
+
+# for each face, (axis, sign) of the direction it faces
+# with x to the right, y up and z to the front
+NORMALS = {
+    'U': (1, 1), 'D': (1, -1),
+    'R': (0, 1), 'L': (0, -1),
+    'F': (2, 1), 'B': (2, -1)
+}
+
+# rotations turn the whole cube like the face with the same axis
+ROTATIONS = {'x': 'R', 'y': 'U', 'z': 'F'}
+
+AMOUNTS = {'': 1, "'": 3, '2': 2, "2'": 2}
+
+
+def _sticker_position(face, row, col, n):
+    """
+    Returns (position, normal) of sticker at `row`, `col` of `face`,
+    where position is the sticker's cubie in coordinates that are centered
+    on the middle of the cube and doubled, so that they are all integers.
+    """
+    top = n - 1 - row  # index of layer from the bottom
+    x, y, z = {
+        'U': (col, n - 1, row),
+        'D': (col, 0, n - 1 - row),
+        'F': (col, top, n - 1),
+        'B': (n - 1 - col, top, 0),
+        'R': (n - 1, top, n - 1 - col),
+        'L': (0, top, col)
+    }[face]
+    axis, sign = NORMALS[face]
+    normal = [0, 0, 0]
+    normal[axis] = sign
+    return (2 * x - (n - 1), 2 * y - (n - 1), 2 * z - (n - 1)), tuple(normal)
+
+
+def _rotate(v, axis):
+    """
+    Rotates vector `v` a quarter turn counterclockwise
+    (looking from the positive end of `axis`)
+    """
+    x, y, z = v
+    if axis == 0:
+        return (x, -z, y)
+    if axis == 1:
+        return (z, y, -x)
+    return (-y, x, z)
+
+
+@lru_cache(maxsize=None)
+def _stickers(n):
+    """
+    Returns list of (position, normal) of each sticker of an `n`x`n` cube
+    and dict of each (position, normal) to its index
+    """
+    stickers = [_sticker_position(face, row, col, n)
+                for face in FACES for row in range(n) for col in range(n)]
+    return stickers, {sticker: i for i, sticker in enumerate(stickers)}
+
+
+@lru_cache(maxsize=None)
+def move_permutation(n, face, depth, turns):
+    """
+    Returns a function that takes the facelets of an `n`x`n` cube
+    and returns them as they are after turning the `depth` outer layers
+    of `face` clockwise `turns` times.
+
+    Each one is only worked out once, after that a move is one C call:
+    up to 6x6 the cube fits in 256 bytes, so the permutation is a
+    translation table and `bytes.translate` does the move (the facelets
+    have to be padded to 256 bytes). Bigger cubes use an itemgetter.
+    """
+    stickers, index = _stickers(n)
+    axis, sign = NORMALS[face]
+    # clockwise when looking at the face is a quarter turn the other way
+    # around the axis when the face is on its positive end
+    quarters = (-turns * sign) % 4
+
+    source = list(range(len(stickers)))
+    for i, (position, normal) in enumerate(stickers):
+        # layer of the sticker counted from `face`, 0 is the outer layer
+        layer = (n - 1 - sign * position[axis]) // 2
+        if layer >= depth:
+            continue
+        for _ in range(quarters):
+            position = _rotate(position, axis)
+            normal = _rotate(normal, axis)
+        source[index[(position, normal)]] = i
+
+    if len(source) <= 256:
+        return bytes(source + list(range(len(source), 256))).translate
+    return itemgetter(*source)
+
+
+_moves = {}  # (n, move) -> function from move_permutation
+
+
+def _move(move, n):
+    if (n, move) not in _moves:
+        _moves[(n, move)] = move_permutation(n, *parse_move(move, n))
+    return _moves[(n, move)]
+
+
+def parse_move(move, n):
+    """
+    Returns (face, depth, turns) of a move in WCA notation, like R, Uw', 3Fw2 or x.
+    Raises ValueError if it isn't a move of an `n`x`n` cube.
+    """
+    body = move.rstrip("'2")
+    amount = move[len(body):]
+    if amount not in AMOUNTS or not body:
+        raise ValueError(f'invalid move: {move}')
+    turns = AMOUNTS[amount]
+
+    if body in ROTATIONS:
+        return ROTATIONS[body], n, turns
+
+    depth = 1
+    if body.endswith('w'):
+        body = body[:-1]
+        depth = 2
+        if len(body) > 1 and body[:-1].isdigit():
+            depth = int(body[:-1])
+            body = body[-1]
+    if len(body) != 1 or body not in FACES or not (1 <= depth < max(n, 2)):
+        raise ValueError(f'invalid move: {move}')
+    return body, depth, turns
+
+
+@lru_cache(maxsize=None)
+def valid_moves(n):
+    """
+    Set of every move of an `n`x`n` cube, as written in scrambles
+    """
+    moves = set()
+    for amount in AMOUNTS:
+        for body in list(FACES) + list(ROTATIONS):
+            moves.add(body + amount)
+        for face in FACES:
+            if n > 2:
+                moves.add(f'{face}w{amount}')
+            for depth in range(2, n):
+                moves.add(f'{depth}{face}w{amount}')
+    return moves
+
+
+def is_valid_scramble(scramble, n):
+    """
+    Whether all moves of `scramble` are moves of an `n`x`n` cube.
+    Only looks the moves up, so it is cheap enough to run on every imported solve.
+    """
+    moves = valid_moves(n)
+    return all(move in moves for move in scramble.split())
+
+
+class Cube:
+    """
+    An `n`x`n` cube, as the colors of its facelets.
+
+    `facelets` has n*n bytes per face, faces in the order of FACES,
+    and each face row by row the way it is seen in `net`.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.facelets = bytes(face for face in range(6) for _ in range(n * n))
+
+    def apply(self, scramble):
+        """
+        Does the moves of `scramble` to the cube and returns it.
+        Raises ValueError if a move isn't valid.
+        """
+        n = self.n
+        moves = [_move(move, n) for move in scramble.split()]
+        size = len(self.facelets)
+        facelets = self.facelets.ljust(256, b'\0') if size <= 256 else self.facelets
+        for move in moves:
+            facelets = move(facelets)
+        self.facelets = bytes(facelets[:size])
+        return self
+
+    def face(self, face):
+        """
+        Returns rows of colors of `face`
+        """
+        n = self.n
+        start = FACES.index(face) * n * n
+        return [''.join(COLORS[c] for c in self.facelets[start + row * n:start + (row + 1) * n])
+                for row in range(n)]
+
+    def is_solved(self):
+        n = self.n
+        return all(len(set(self.facelets[i * n * n:(i + 1) * n * n])) == 1 for i in range(6))
+
+    def net(self):
+        """
+        Returns the cube unfolded as a string, with U above and D below
+        L F R B, and each facelet as the letter of its color.
+        """
+        n = self.n
+        faces = {face: [' '.join(row) for row in self.face(face)] for face in FACES}
+        indent = ' ' * (2 * n + 1)
+        lines = [indent + row for row in faces['U']]
+        lines.append('')
+        lines += ['  '.join(rows) for rows in zip(faces['L'], faces['F'], faces['R'], faces['B'])]
+        lines.append('')
+        lines += [indent + row for row in faces['D']]
+        return '\n'.join(lines)
+
+
+def draw_scramble(scramble, n):
+    """
+    Returns net of an `n`x`n` cube that was scrambled with `scramble`
+    """
+    return Cube(n).apply(scramble).net()
@@ -0,0 +1,366 @@
+from collections import deque
+import csv
+from itertools import chain
+import json
+from os import remove, stat
+from os.path import dirname, getsize, isfile
+from pathlib import Path
+import shutil
+import sys
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer import storage
+from cl_timer.cube import is_valid_scramble
+from cl_timer.scramble import expand
+from cl_timer.stats import RollingAverage
+from cl_timer.utils import add_zero, remove_penalty
+
+HOME = str(Path.home())
+
+FORMATS = ['cstimer', 'qqtimer', 'csv']
+
+BATCH_SIZE = 1000  # lines written to the session file at once
+CHUNK_SIZE = 1 << 16
+
+
+def parse_time(string):
+    """
+    Takes a time the way another timer writes it
+    (like "12.3", "1:02.34", "14.00+" or "DNF(9.87)")
+    and returns it the way cl-timer writes it.
+    """
+    string = string.strip()
+    if string.upper().startswith('DNF'):
+        inner = string[3:].strip('()')
+        return f'DNF({parse_time(inner) if inner else "0.00"})'
+    if string.endswith('+'):
+        return parse_time(string[:-1]) + '+'
+    minutes, _, seconds = string.rpartition(':')
+    seconds = float(seconds) + (60 * int(minutes) if minutes else 0)
+    return add_zero(round(seconds, 2))
+
+
+class JSONStream:
+    """
+    Reads a JSON document from a file one value at a time,
+    so that arrays bigger than memory can be walked through.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """
+        Reads more of the file, dropping what has been parsed already.
+
+        Reads at least as much as is buffered so that a big value
+        is only parsed again a logarithmic number of times.
+        """
+        chunk = self.f.read(max(CHUNK_SIZE, len(self.buffer) - self.pos))
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """
+        Returns next char that isn't whitespace, or '' at end of file
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\n\r':
+                self.pos += 1
+            if self.pos < len(self.buffer) or self.eof:
+                return self.buffer[self.pos:self.pos + 1]
+            self._fill()
+
+    def expect(self, c):
+        if self.peek() != c:
+            raise ValueError(f'expected "{c}" in JSON file')
+        self.pos += 1
+
+    def skip(self, c):
+        """
+        Skips next char if it is `c`
+        """
+        if self.peek() == c:
+            self.pos += 1
+
+    def value(self):
+        """
+        Parses next value (which can be an array or object)
+        """
+        while True:
+            self.peek()
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise ValueError('invalid JSON file')
+                self._fill()
+                continue
+            if end == len(self.buffer) and not self.eof:
+                # a number could carry on into the next chunk
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+
+def read_cstimer(f, session='1'):
+    """
+    Yields (time, scramble) for every solve of csTimer session number `session`
+    in a csTimer export file.
+    """
+    stream = JSONStream(f)
+    stream.expect('{')
+    while stream.peek() not in ['}', '']:
+        key = stream.value()
+        stream.expect(':')
+        if stream.peek() == '[':
+            # sessions can be huge, so go through them one solve at a time
+            stream.expect('[')
+            while stream.peek() not in [']', '']:
+                solve = stream.value()
+                if key == f'session{session}':
+                    (penalty, ms), scramble = solve[0], solve[1]
+                    t = add_zero(round(ms / 1000, 2))
+                    if penalty == -1:
+                        t = f'DNF({t})'
+                    elif penalty:
+                        t = add_zero(round((ms + penalty) / 1000, 2)) + '+'
+                    yield t, scramble
+                stream.skip(',')
+            stream.expect(']')
+        else:
+            stream.value()
+        stream.skip(',')
+
+
+def write_cstimer(f, solves, name):
+    """
+    Writes (time, scramble) pairs of `solves` as a csTimer export file
+    """
+    f.write('{"session1": [')
+    for i, (t, scramble) in enumerate(solves):
+        penalty = 0
+        if str(t)[:3] == 'DNF':
+            penalty = -1
+        elif str(t)[-1] == '+':
+            penalty = 2000
+        ms = int(round(float(remove_penalty(t)) * 1000))
+        f.write((',' if i else '') + json.dumps([[penalty, ms], scramble, '', 0]))
+    session_data = json.dumps({'1': {'name': name}})
+    f.write(f'], "properties": {json.dumps({"sessionData": session_data})}}}')
+
+
+def read_qqtimer(f):
+    """
+    Yields (time, '') for every time in a qqTimer times list,
+    which are separated by commas or newlines. qqTimer doesn't export scrambles.
+    """
+    remainder = ''
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        parts = (remainder + chunk).replace('\n', ',').split(',')
+        remainder = parts.pop() if chunk else ''
+        for part in parts:
+            if part.strip():
+                yield parse_time(part), ''
+        if not chunk:
+            break
+
+
+def write_qqtimer(f, solves):
+    """
+    Writes times of `solves` as a qqTimer times list
+    """
+    for i, (t, _) in enumerate(solves):
+        f.write((', ' if i else '') + str(t))
+
+
+def read_csv(f):
+    """
+    Yields (time, scramble) for every row of a CSV file.
+
+    Columns are found by a header with "time" and "scramble" in it
+    (csTimer's semicolon-separated export has one). Without a header
+    the first column is the time and the last is the scramble.
+    """
+    first_line = f.readline()
+    delimiter = ';' if ';' in first_line else ','
+    header = [cell.strip().lower() for cell in next(csv.reader([first_line], delimiter=delimiter), [])]
+
+    time_column, scramble_column = 0, -1
+    rows = csv.reader(f, delimiter=delimiter)
+    if 'time' in header:
+        time_column = header.index('time')
+        scramble_column = header.index('scramble') if 'scramble' in header else None
+    elif header:
+        # first line was a solve
+        rows = chain(csv.reader([first_line], delimiter=delimiter), rows)
+
+    for row in rows:
+        if not row:
+            continue
+        scramble = row[scramble_column] if (scramble_column is not None and len(row) > 1) else ''
+        yield parse_time(row[time_column]), scramble
+
+
+def write_csv(f, lines):
+    """
+    Writes session file lines (time, ao5, ao12, scramble) as a CSV file
+    """
+    writer = csv.writer(f)
+    writer.writerow(['time', 'ao5', 'ao12', 'scramble'])
+    for line in lines:
+        writer.writerow(line)
+
+
+def session_lines(session_name):
+    """
+    Yields the columns of each line in a session file
+    """
+    with open(f'{HOME}/.cl-timer/{session_name}', 'r') as f:
+        for line in f:
+            line = line.rstrip('\n').split('\t')
+            if len(line) >= 4:
+                yield line
+
+
+def import_session(fmt, path, session_name, cstimer_session='1', progress=None):
+    """
+    Adds solves in file at `path` (in format `fmt`) to the end of a session.
+
+    Averages are calculated as the solves are read, and lines are written
+    in batches, so the file never has to be held in memory. They are written
+    to a file next to the session first, which is added to the session in
+    one go at the end, so the session isn't locked while the file is read.
+
+    `progress` is called with the fraction of the file read after each batch.
+
+    Returns number of solves imported, and how many of them have scrambles
+    that aren't for the session's puzzle (they are imported anyway).
+    """
+    session_file = f'{HOME}/.cl-timer/{session_name}'
+    tmp = f'{HOME}/.cl-timer/.{session_name}.import'
+    try:
+        while True:
+            before = _signature(session_file)
+            counts = _import_session(fmt, path, session_file, tmp, session_name, cstimer_session, progress)
+            with storage.locked(session_file):
+                if _signature(session_file) == before:
+                    with open(tmp, 'r') as src, open(session_file, 'a') as dst:
+                        shutil.copyfileobj(src, dst)
+                    break
+            # solves were added while importing, which the averages
+            # of the first imported solves have to include
+    finally:
+        if isfile(tmp):
+            remove(tmp)
+    storage.notify(session_file)
+    return counts
+
+
+def _signature(session_file):
+    try:
+        s = stat(session_file)
+    except FileNotFoundError:
+        return None
+    return s.st_ino, s.st_size, s.st_mtime_ns
+
+
+def session_puzzle(session_name):
+    """
+    Returns size of the puzzle of a session, from its settings file
+    """
+    try:
+        with open(f'{HOME}/.cl-timer/{session_name}-settings.json', 'r') as f:
+            return int(json.load(f).get('puzzle', 3))
+    except (FileNotFoundError, ValueError):
+        return 3
+
+
+def _import_session(fmt, path, session_file, tmp, session_name, cstimer_session, progress):
+    puzzle = session_puzzle(session_name)
+    invalid = 0
+
+    previous = deque(maxlen=11)
+    if isfile(session_file):
+        previous.extend(line[0] for line in session_lines(session_name))
+    needs_newline = isfile(session_file) and getsize(session_file) > 0
+
+    ao5 = RollingAverage(5, previous)
+    ao12 = RollingAverage(12, previous)
+
+    size = max(getsize(path), 1)
+    count = 0
+    with open(path, 'r', newline='' if fmt == 'csv' else None) as f, open(tmp, 'w') as out:
+        if fmt == 'cstimer':
+            solves = read_cstimer(f, cstimer_session)
+        elif fmt == 'qqtimer':
+            solves = read_qqtimer(f)
+        elif fmt == 'csv':
+            solves = read_csv(f)
+        else:
+            raise ValueError(f'unknown format: {fmt}')
+
+        batch = []
+        for t, scramble in solves:
+            if not is_valid_scramble(scramble, puzzle):
+                invalid += 1
+            batch.append(f'{t}\t{ao5.add(t)}\t{ao12.add(t)}\t{scramble}')
+            count += 1
+            if len(batch) == BATCH_SIZE:
+                out.write(('\n' if needs_newline else '') + '\n'.join(batch))
+                needs_newline = True
+                batch.clear()
+                if progress is not None:
+                    progress(min(f.buffer.tell() / size, 1))
+        if batch:
+            out.write(('\n' if needs_newline else '') + '\n'.join(batch))
+
+    return count, invalid
+
+
+def export_session(fmt, session_name, path, progress=None):
+    """
+    Writes all solves of a session to file at `path` in format `fmt`.
+    Returns number of solves exported.
+
+    `progress` is called with the fraction of the session written
+    every BATCH_SIZE solves.
+    """
+    count = 0
+    size = max(getsize(f'{HOME}/.cl-timer/{session_name}'), 1)
+    read = 0
+
+    def counted(lines):
+        nonlocal count, read
+        for line in lines:
+            count += 1
+            if progress is not None:
+                # length of the line in the file
+                read += sum(len(column) for column in line) + len(line)
+                if count % BATCH_SIZE == 0:
+                    progress(min(read / size, 1))
+            yield line
+
+    lines = counted(session_lines(session_name))
+    with open(path, 'w', newline='' if fmt == 'csv' else None) as f:
+        if fmt == 'cstimer':
+            write_cstimer(f, ((line[0], expand(line[3])) for line in lines), session_name)
+        elif fmt == 'qqtimer':
+            write_qqtimer(f, ((line[0], line[3]) for line in lines))
+        elif fmt == 'csv':
+            write_csv(f, (line[:3] + [expand(line[3])] for line in lines))
+        else:
+            raise ValueError(f'unknown format: {fmt}')
+
+    return count
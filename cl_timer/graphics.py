@@ -1,3 +1,5 @@
+import curses
+
 from cl_timer.art import STARTING_TIME, DIGITS, DECIMAL_POINT
 
 
@@ -11,14 +13,38 @@ class Canvas:
     def __init__(self, height, width):
         # List of rows. Top row when displayed is at index 0
         self.grid = [[' ' for _ in range(width)] for _ in range(height)]
+        # Layout that places the images on self, if there is one
+        self.layout = None
+        # Panels that show self, if there are any
+        self.panels = None
+        # rows (from the top) with chars that changed since they were last shown
+        self.dirty = set(range(height))
+
+    def resize(self, height, width):
+        """
+        Changes the size of self.grid, keeping what is on the part
+        of the screen that is in both the old and the new size
+        """
+        old_grid = self.grid
+        self.grid = [[' ' for _ in range(width)] for _ in range(height)]
+        for y in range(min(height, len(old_grid))):
+            row = old_grid[(len(old_grid) - 1) - y][:width]
+            self.grid[(height - 1) - y][:len(row)] = row
+        self.dirty = set(range(height))
 
     def replace(self, x, y, char):
         """
         Replaces char in certain location of self.grid
         """
         row_index = (len(self.grid) - 1) - y
+        if x < 0 or row_index < 0:
+            # off the screen (negative indexes would wrap around)
+            return
         try:
-            self.grid[row_index][x] = char
+            row = self.grid[row_index]
+            if row[x] != char:
+                row[x] = char
+                self.dirty.add(y)
         except IndexError:
             pass
 
@@ -99,6 +125,12 @@ class Image:
 
             self.canvas.replace(canvas_x, canvas_y, char.char)
 
+    def fits(self, width, height):
+        """
+        Whether all of self would be shown on a canvas of `width` by `height`
+        """
+        return all(self.x + c.x < width and self.y + c.y < height for c in self.chars)
+
     def __str__(self):
         """
         Shows what image is supposed to render on the canvas like.
@@ -152,6 +184,10 @@ class InputLine(Image):
         """
         return ''.join(self.inputted_chars)
 
+    def hide(self):
+        for char in self.chars:
+            self.canvas.replace(self.x + char.x, self.y + char.y, " ")
+
     def _del_char(self):
         """
         Removes last char from input field
@@ -218,10 +254,6 @@ class CommandInput(InputLine):
     def __init__(self, canvas):
         InputLine.__init__(self, canvas, ': ')
 
-    def hide(self):
-        for char in self.chars:
-            self.canvas.replace(self.x + char.x, self.y + char.y, " ")
-
 
 class NumberDisplay(Image):
     """
@@ -325,39 +357,71 @@ def break_top_line(string, line_length):
 class Scramble(CoverUpImage):
     """
     Optimized for showing a scramble
+
+    Scrambles can be longer than the width of the screen, so they are
+    wrapped between moves. The wrapped lines are kept for each width,
+    so they are only worked out again when the scramble changes.
     """
 
     def __init__(self, canvas, x, y, chars):
         CoverUpImage.__init__(self, canvas, x, y, chars)
+        self._set_scramble(chars)
+
+    def _set_scramble(self, chars):
+        self.scramble = ''.join(c.char for c in chars)
+        self._line = chars
+        self._wrapped = {}  # width -> chars
+
+    @property
+    def chars(self):
+        return self._chars
+
+    @chars.setter
+    def chars(self, chars):
+        self.clear()
+        self._set_scramble(chars)
+        self._chars = chars
+        self.render()
 
     def clear(self):
         """
         Replaces all chars on canvas with spaces
         """
-        ys = []
-        for x, y in ([(c.x, c.y) for c in self._chars]):
-            self.canvas.replace(self.x + x, self.y + y, " ")
-            if y not in ys:
-                ys.append(y)
+        for c in self._chars:
+            self.canvas.replace(self.x + c.x, self.y + c.y, " ")
 
-    def render(self):
+    def wrap(self, width):
         """
-        This exists because scrambles can be longer than the length of the screen
+        Returns chars of the scramble broken into lines that fit in `width`
         """
-        if len(self._chars) > len(self.canvas.grid[0]):
+        if len(self.scramble) <= width:
+            return self._line
+        if width not in self._wrapped:
             lines = []
-            bottom_line = str(self)
+            bottom_line = self.scramble
             while True:
-                scramble_with_newline = break_top_line(bottom_line, len(self.canvas.grid[0]) - 1)
+                scramble_with_newline = break_top_line(bottom_line, width - 1)
                 lines.append(scramble_with_newline.split('\n')[0])
                 new_bottom_line = scramble_with_newline.split('\n')[1]
                 if new_bottom_line == bottom_line:
                     break
                 bottom_line = new_bottom_line
-            self._chars = Char.fromstring('\n'.join([l.strip() for l in lines]))
-            Image.render(self)
-        else:
-            Image.render(self)
+            self._wrapped[width] = Char.fromstring('\n'.join([l.strip() for l in lines]))
+        return self._wrapped[width]
+
+    def fits(self, width, height):
+        return (self._chars is self.wrap(len(self.canvas.grid[0]))
+                and Image.fits(self, width, height))
+
+    def render(self):
+        """
+        This exists because scrambles can be longer than the length of the screen
+        """
+        self._chars = self.wrap(len(self.canvas.grid[0]))
+        Image.render(self)
+
+    def __str__(self):
+        return self.scramble
 
 
 class Cursor(Image):
@@ -424,4 +488,158 @@ class Cursor(Image):
         """
 
         self.chars[0] = Char(0, 0, ' ')
-        self.render()
\ No newline at end of file
+        self.render()
+
+
+class Layout:
+    """
+    Where each Image goes on a canvas, as a function of the canvas' size,
+    so that images can be moved when the terminal is resized.
+    """
+
+    def __init__(self, canvas):
+        self.canvas = canvas
+        canvas.layout = self
+        # (image, function that takes width and height of canvas and returns x and y)
+        self.places = []
+
+    def add(self, image, place):
+        """
+        Moves `image` to where `place` puts it and returns it
+        """
+        image.x, image.y = place(len(self.canvas.grid[0]), len(self.canvas.grid))
+        self.places.append((image, place))
+        return image
+
+    def resize(self, height, width):
+        """
+        Resizes the canvas and moves the images to their new places.
+
+        Images that stay where they were and were shown whole before
+        and after are left alone. The rest are covered up and rendered again,
+        and are returned.
+        """
+        old_height, old_width = len(self.canvas.grid), len(self.canvas.grid[0])
+        self.canvas.resize(height, width)
+
+        changed = []
+        for image, place in self.places:
+            x, y = place(width, height)
+            if (x, y) == (image.x, image.y) and image.fits(min(width, old_width), min(height, old_height)):
+                continue
+            for c in image.chars:
+                self.canvas.replace(image.x + c.x, image.y + c.y, " ")
+            image.x, image.y = x, y
+            changed.append(image)
+
+        for image in changed:
+            image.render()
+        return changed
+
+
+class Panel:
+    """
+    A rectangle of the canvas with a curses window of its own
+    """
+
+    def __init__(self, name, place):
+        self.name = name
+        # function that takes width and height of canvas and returns x, y, width and height
+        self.place = place
+        self.window = None
+        self.x = self.y = self.width = self.height = 0
+        self.shown = []  # rows last written to the window
+
+
+class Panels:
+    """
+    Shows a canvas as panels (like the timer and the stats) that are
+    drawn separately.
+
+    Only the rows of the canvas that changed are looked at, and a panel
+    is only written to when its part of them did. Each panel that was is
+    copied to the virtual screen with noutrefresh, and one doupdate
+    sends the difference to the terminal, so a frame in which only the
+    timer ticks doesn't write the stats or scramble again.
+    """
+
+    def __init__(self, stdscr, canvas):
+        self.stdscr = stdscr
+        self.canvas = canvas
+        canvas.panels = self
+        self.panels = []
+
+    def add(self, name, place):
+        self.panels.append(Panel(name, place))
+        self.fit()
+
+    def fit(self):
+        """
+        Makes the windows of the panels again for the size of the canvas
+        """
+        height, width = len(self.canvas.grid), len(self.canvas.grid[0])
+        for panel in self.panels:
+            x, y, panel_width, panel_height = panel.place(width, height)
+            panel_width = min(panel_width, width - x)
+            panel_height = min(panel_height, height - y)
+            if panel_width <= 0 or panel_height <= 0:
+                panel.window = None
+                continue
+            panel.x, panel.y, panel.width, panel.height = x, y, panel_width, panel_height
+            panel.window = self.stdscr.derwin(panel_height, panel_width, y, x)
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Makes the next refresh write every panel, after something
+        else (like a command's output) was drawn over them
+        """
+        self.stdscr.erase()
+        self.stdscr.noutrefresh()
+        for panel in self.panels:
+            panel.shown = [None] * panel.height
+        self.canvas.dirty = set(range(len(self.canvas.grid)))
+
+    def refresh(self):
+        """
+        Writes the panels whose part of the canvas changed to the terminal
+        """
+        grid = self.canvas.grid
+        dirty, self.canvas.dirty = self.canvas.dirty, set()
+        for panel in self.panels:
+            if panel.window is None:
+                continue
+            changed = False
+            for y in range(panel.y, panel.y + panel.height):
+                if y not in dirty:
+                    continue
+                text = ''.join(grid[(len(grid) - 1) - y][panel.x:panel.x + panel.width])
+                if text == panel.shown[y - panel.y]:
+                    continue
+                try:
+                    panel.window.addstr(y - panel.y, 0, text)
+                except curses.error:
+                    pass  # the bottom right corner was written, but the cursor can't go past it
+                panel.shown[y - panel.y] = text
+                changed = True
+            if changed:
+                panel.window.noutrefresh()
+        curses.doupdate()
+
+
+def fit_to_screen(stdscr, canvas):
+    """
+    Resizes `canvas` (and moves the images of its layout) if the terminal
+    was resized. Returns whether it was.
+    """
+    lines, cols = stdscr.getmaxyx()
+    height, width = max(lines - 1, 1), max(cols - 1, 1)
+    if (height, width) == (len(canvas.grid), len(canvas.grid[0])):
+        return False
+    if canvas.layout is not None:
+        canvas.layout.resize(height, width)
+    else:
+        canvas.resize(height, width)
+    if canvas.panels is not None:
+        canvas.panels.fit()
+    return True
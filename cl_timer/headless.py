@@ -0,0 +1,254 @@
+import curses
+from os.path import dirname
+import signal
+import sys
+import time
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer import browser, catalog, timer, utils
+from cl_timer.utils import ExitException
+
+# modules whose `time` is replaced by the fake clock
+CLOCKED_MODULES = [timer, utils, catalog, browser]
+
+
+class Wait:
+    """
+    Script item that lets `seconds` pass with no key pressed
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+
+
+class Resize:
+    """
+    Script item that resizes the terminal to `lines` by `cols`,
+    which curses tells about with KEY_RESIZE
+    """
+
+    def __init__(self, lines, cols):
+        self.lines = lines
+        self.cols = cols
+
+
+class FakeClock:
+    """
+    Stands in for the time module. Time only passes when something sleeps
+    or a script waits, so a frame costs no real time.
+    """
+
+    def __init__(self, start=1e9):
+        self.now = start
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+
+    def __getattr__(self, name):
+        # strftime, localtime, etc.
+        return getattr(time, name)
+
+
+class FakeWindow:
+    """
+    A window made with FakeScreen.derwin, whose text goes on the screen's
+    """
+
+    def __init__(self, screen, y, x):
+        self.screen = screen
+        self.y = y
+        self.x = x
+        self.pending = []
+
+    def addstr(self, y, x, string):
+        self.pending.append((y, x, string))
+
+    def erase(self):
+        self.pending.clear()
+
+    def noutrefresh(self):
+        for y, x, string in self.pending:
+            self.screen.write(self.y + y, self.x + x, string)
+        self.pending.clear()
+
+
+class FakeScreen:
+    """
+    The subset of a curses window that cl-timer uses.
+
+    `script` is a list of key codes (-1 for no key), Wait and Resize objects,
+    and each call of getch takes the next one. Once the script has run out
+    ExitException is raised, just like quitting with `:q`.
+    """
+
+    def __init__(self, script, clock, lines=24, cols=80, keep_frames=False):
+        self.script = iter(script)
+        self.clock = clock
+        self.lines = lines
+        self.cols = cols
+        self.keep_frames = keep_frames
+
+        self.text = ''  # what would be on the screen
+        self.pending = []  # addstr calls since last refresh
+        self.frames = []
+        self.frame_count = 0
+        self.bytes_written = 0
+
+        # real time that passed between a key being read and the next refresh
+        self.latencies = []
+        self._last_key = None
+
+    def getch(self):
+        item = next(self.script, None)
+        if item is None:
+            raise ExitException()
+        if isinstance(item, Wait):
+            self.clock.sleep(item.seconds)
+            return -1
+        if isinstance(item, Resize):
+            self.lines, self.cols = item.lines, item.cols
+            return curses.KEY_RESIZE
+        if item != -1:
+            self._last_key = (item, time.perf_counter())
+        return item
+
+    def getmaxyx(self):
+        return self.lines, self.cols
+
+    def nodelay(self, flag):
+        pass
+
+    def keypad(self, flag):
+        pass
+
+    def timeout(self, delay):
+        pass
+
+    def move(self, y, x):
+        pass
+
+    def clear(self):
+        self.pending.clear()
+
+    erase = clear
+
+    def addstr(self, *args):
+        # addstr(string) or addstr(y, x, string)
+        self.pending.append(args[-1])
+
+    def noutrefresh(self):
+        self.text = ''.join(self.pending)
+        self.bytes_written += len(self.text)
+
+    def derwin(self, lines, cols, y, x):
+        return FakeWindow(self, y, x)
+
+    def write(self, y, x, string):
+        """
+        Puts `string` on the screen's text at row `y` and column `x`
+        """
+        rows = self.text.split('\n')
+        rows += ['' for _ in range(y + 1 - len(rows))]
+        row = rows[y].ljust(x)
+        rows[y] = row[:x] + string + row[x + len(string):]
+        self.text = '\n'.join(rows)
+        self.bytes_written += len(string)
+
+    def refresh(self):
+        self.noutrefresh()
+        self.doupdate()
+
+    def doupdate(self):
+        """
+        Takes the place of curses.doupdate while mainloops runs
+        """
+        self.frame_count += 1
+        if self.keep_frames:
+            self.frames.append((self.clock.now, self.text))
+        if self._last_key is not None:
+            key, start = self._last_key
+            self.latencies.append((key, time.perf_counter() - start))
+            self._last_key = None
+
+
+def keys(string):
+    """
+    Script items for typing `string`
+    """
+    return [ord(c) for c in string]
+
+
+def command(cmd):
+    """
+    Script items for running `cmd` in command mode and leaving it
+    """
+    return [58] + keys(cmd) + [10, -1, 27]
+
+
+def solve(seconds, hold=0.5):
+    """
+    Script items for a solve of `seconds`, started the way a person would:
+    spacebar held for `hold` seconds (as repeated key presses), then released.
+    """
+    presses = max(int(hold / 0.03), 1)
+    # mainloops starts the timer 25 frames after the spacebar was last seen
+    return [32, -1, -1] * presses + [-1 for _ in range(25)] + [Wait(seconds), 32, -1]
+
+
+def open_session(name):
+    """
+    Script items for getting past the title screen, naming the session
+    and getting past the disclaimer.
+    """
+    return [ord(' '), -1] + keys(name) + [10, -1, ord(' '), -1]
+
+
+def run(script, lines=24, cols=80, keep_frames=False, source=None):
+    """
+    Runs mainloops on a FakeScreen until `script` has run out.
+    Returns the screen. `source` is passed on to mainloops.
+
+    Sessions are still stored in ~/.cl-timer, so point HOME somewhere else
+    before importing cl_timer to keep them apart from real ones.
+    """
+    clock = FakeClock()
+    screen = FakeScreen(script, clock, lines, cols, keep_frames)
+
+    old_lines_cols = getattr(curses, 'LINES', None), getattr(curses, 'COLS', None)
+    old_curs_set = curses.curs_set
+    old_doupdate = curses.doupdate
+    old_sigint = signal.getsignal(signal.SIGINT)
+
+    curses.LINES, curses.COLS = lines, cols
+    curses.curs_set = lambda visibility: None
+    curses.doupdate = screen.doupdate
+    for module in CLOCKED_MODULES:
+        module.time = clock
+
+    try:
+        timer.mainloops(screen, source)
+    except ExitException:
+        pass
+    finally:
+        for module in CLOCKED_MODULES:
+            module.time = time
+        curses.curs_set = old_curs_set
+        curses.doupdate = old_doupdate
+        if old_lines_cols[0] is not None:
+            curses.LINES, curses.COLS = old_lines_cols
+        signal.signal(signal.SIGINT, old_sigint)
+
+    return screen
@@ -1,23 +1,36 @@
 import json
-from os.path import dirname, isfile
+from os import remove, stat
+from os.path import basename, dirname, expanduser, isfile
 from pathlib import Path
 import string
-import subprocess
 import sys
 
 OUTER_PACKAGE_DIR = dirname(dirname(__file__))
 if OUTER_PACKAGE_DIR not in sys.path:
     sys.path.append(OUTER_PACKAGE_DIR)
 
+from cl_timer import archive, catalog, competition, jobs, storage, trainer
+from cl_timer.journal import journal_file, same_time
+from cl_timer.browser import browse
+from cl_timer.cube import draw_scramble
+from cl_timer.distribution import combined_distribution, panel, session_distribution
+from cl_timer.formats import export_session, FORMATS, import_session
 from cl_timer.graphics import (
     Char, CommandInput,
     Cursor, Image, InputLine
 )
-from cl_timer.scramble import generate_scramble
+from cl_timer.plot import DEFAULT_SERIES, plot, SERIES
+from cl_timer.profiler import profiler
+from cl_timer.ranges import RangeIndex
+from cl_timer.records import history_text
+from cl_timer.jobs import Job, JobFailed
+from cl_timer.scramble import expand, new_seed
+from cl_timer.stats import solve_average, time_value
+from cl_timer.trace import tracer
 from cl_timer.utils import (
-    add_zero, ask_for_input, display_stats,
+    add_penalty, add_zero, ask_for_input, display_stats, display_text,
     CommandSyntaxError, ExitCommandLine,
-    ExitException, MutableString
+    ExitException
 )
 
 HOME = str(Path.home())
@@ -28,70 +41,333 @@ char = lambda string: Char.fromstring(string)
 def command_line(
         canvas, stdscr, settings, scramble_image, settings_file, session_file,
         times, ao5s, ao12s, scrambles, session, session_name_image, update_stats,
-        add_time, calculate_average, aliases, silent=False, command=False):
+        add_time, calculate_average, follow_session, new_scramble, range_index, journal, aliases,
+        silent=False, command=False):
     """
     Inspired by vim...
     """
 
+    def start_job(job):
+        try:
+            jobs.start(job)
+        except RuntimeError as e:
+            show_error_message(f'{e} - wait for it or press escape to cancel it')
+        if silent:
+            # commands in ~/.cl-timer_rc run before the timer, one after another
+            jobs.wait()
+            jobs.poll()
+
+    def check_no_job(command):
+        """
+        Refuses `command` while a job is running, since it changes solves
+        the job has copies of (which it would write back when it's done)
+        """
+        if jobs.current is not None:
+            show_error_message(f'can\'t {command} while {jobs.current.name} is running - '
+                               'wait for it or press escape to cancel it')
+
+    def rewrite_job(name, edit, reindex):
+        """
+        Starts job that changes copies of the session's lists with `edit`
+        and writes them to a new session file, on a worker thread.
+
+        When it's done, solves that were added in the meantime are put
+        at the end, and the session file and lists are replaced all at once.
+        `reindex` then makes the same change to the range index.
+        If the session was rewritten or cut short in the meantime, nothing is changed.
+        """
+        path = session_file.string
+        before = stat(path)
+        count = len(times)
+        last = [lst[count - 1] for lst in [times, ao5s, ao12s, scrambles]] if count else []
+        copies = [list(times), list(ao5s), list(ao12s), list(scrambles)]
+        tmp = f'{dirname(path)}/.{basename(path)}.job'
+
+        def work(job):
+            edit(*copies)
+            storage.write_tmp(path, zip(*copies), tmp, job.progress)
+            return copies
+
+        def apply(new):
+            new_times, new_ao5s, new_ao12s, new_scrambles = new
+            with storage.locked(path):
+                now = stat(path) if path == session_file.string else None
+                if now is None or now.st_ino != before.st_ino or now.st_size < before.st_size:
+                    cleanup()
+                    return f'{name}: the session was changed while it ran, so nothing was done'
+                follow_session()
+                # the solves it started from have to be the first ones still
+                if len(times) < count or (count and [lst[count - 1] for lst in [times, ao5s, ao12s, scrambles]] != last):
+                    cleanup()
+                    return f'{name}: the session was changed while it ran, so nothing was done'
+                added = []
+                for i in range(count, len(times)):
+                    new_times.append(times[i])
+                    new_scrambles.append(scrambles[i])
+                    new_ao5s.append(solve_average(new_times, len(new_times), 5))
+                    new_ao12s.append(solve_average(new_times, len(new_times), 12))
+                    added.append([times[i], new_ao5s[-1], new_ao12s[-1], scrambles[i]])
+                if added:
+                    with open(tmp, 'a') as f:
+                        f.write(('\n' if new_times[:-len(added)] else '') +
+                                '\n'.join('\t'.join(str(thing) for thing in line) for line in added))
+                storage.replace_with(path, tmp)
+                times[:] = new_times
+                ao5s[:] = new_ao5s
+                ao12s[:] = new_ao12s
+                scrambles[:] = new_scrambles
+                reindex()
+                # their averages are of the solves before them now
+                for i in range(len(times) - len(added) + 1, len(times) + 1):
+                    range_index.set(i, times[i - 1], ao5s[i - 1], ao12s[i - 1])
+            update_stats()
+
+        def cleanup():
+            if isfile(tmp):
+                remove(tmp)
+
+        start_job(Job(name, work, apply, cleanup))
+
     def delete(solve):
         """
         Removes all records of solve at index `solve`
+
+        Only the averages that included the solve are recalculated.
         """
-        # remove from lists of data
-        times.pop(solve - 1)
-        ao5s.pop(solve - 1)
-        ao12s.pop(solve - 1)
-        scrambles.pop(solve - 1)
-
-        # remove from session file
-        with open(session_file.string, 'r') as f:
-            lines = f.read().split('\n')
-        lines.pop(solve - 1)
-        with open(session_file.string, 'w') as f:
-            f.write('\n'.join(lines))
-
-    def dnf():
+        def edit(times, ao5s, ao12s, scrambles):
+            # remove from lists of data
+            times.pop(solve - 1)
+            ao5s.pop(solve - 1)
+            ao12s.pop(solve - 1)
+            scrambles.pop(solve - 1)
+
+            for i in range(solve, min(solve + 10, len(times)) + 1):
+                ao5s[i - 1] = solve_average(times, i, 5)
+                ao12s[i - 1] = solve_average(times, i, 12)
+
+        def reindex():
+            range_index.delete(solve)
+            for i in range(solve, min(solve + 10, len(times)) + 1):
+                range_index.set(i, times[i - 1], ao5s[i - 1], ao12s[i - 1])
+            journal.record({'op': 'delete', 'solve': solve, 'line': line})
+            trainer.record(session.string, line[3], time_value(line[0]), None)
+
+        with storage.locked(session_file.string):
+            follow_session()
+            line = [times[solve - 1], ao5s[solve - 1], ao12s[solve - 1], scrambles[solve - 1]]
+            rewrite_job(f'deleting solve {solve}', edit, reindex)
+
+    def delete_all():
+        def edit(*lists):
+            for lst in lists:
+                lst.clear()
+
+        def reindex():
+            range_index.reset(times, ao5s, ao12s)
+            journal.clear()
+            trainer.forget(session.string)
+
+        rewrite_job('deleting all solves', edit, reindex)
+
+    def remove_solve(solve):
         """
-        Flags latest solve as DNF
+        Deletes solve at index `solve` right away, for undoing and redoing.
+        Only the end of the session file is searched if it was the last solve.
         """
-        # update `times`
-        solve_time = times[-1]
-        times[-1] = f'DNF({solve_time})'
-        ao5s[-1] = calculate_average(len(ao5s), 5)
-        ao12s[-1] = calculate_average(len(ao12s), 12)
-
-        # update session file
-        with open(session_file.string, 'r') as f:
-            lines = [line.split('\t') for line in f.read().split('\n')]
-        if [''] in lines:
-            lines.remove([''])
-        lines[-1][0] = f'DNF({solve_time})'
-        with open(session_file.string, 'w') as f:
-            f.write('\n'.join(['\t'.join(line) for line in lines]))
-
-    def plus_two():
+        with storage.locked(session_file.string):
+            follow_session()
+            trainer.record(session.string, scrambles[solve - 1], time_value(times[solve - 1]), None)
+            for lst in [times, ao5s, ao12s, scrambles]:
+                lst.pop(solve - 1)
+            range_index.delete(solve)
+            update_averages(solve, solve + 10)
+            if solve == len(times) + 1:
+                storage.remove_last(session_file.string)
+            else:
+                save()
+        update_stats()
+
+    def insert_solve(solve, line):
         """
-        Adds two to the value of the latest solves,
-        while also marking it as a plus two
+        Puts `line` (time, ao5, ao12, scramble) back in as solve at index `solve`.
+        Only the end of the session file is changed if it is the last solve.
         """
-        # udpate `times`
-        solve_time = times[-1]
-        times[-1] = add_zero(round(float(solve_time) + 2, 2)) + '+'
-        ao5s[-1] = calculate_average(len(ao5s), 5)
-        ao12s[-1] = calculate_average(len(ao12s), 12)
-
-        # update session file
-        with open(session_file.string, 'r') as f:
-            lines = [line.split('\t') for line in f.read().split('\n')]
-        if [''] in lines:
-            lines.remove([''])
-        lines[-1][0] = add_zero(round(float(solve_time) + 2, 2)) + '+'
-        with open(session_file.string, 'w') as f:
-            f.write('\n'.join(['\t'.join(line) for line in lines]))
+        with storage.locked(session_file.string):
+            follow_session()
+            for lst, thing in zip([times, ao5s, ao12s, scrambles], line):
+                lst.insert(solve - 1, thing)
+            trainer.record(session.string, line[3], None, time_value(line[0]))
+            ao5s[solve - 1] = calculate_average(solve, 5)
+            ao12s[solve - 1] = calculate_average(solve, 12)
+            range_index.insert(solve, times[solve - 1], ao5s[solve - 1], ao12s[solve - 1])
+            update_averages(solve + 1, solve + 11)
+            if solve == len(times):
+                storage.append(session_file.string, [[times[-1], ao5s[-1], ao12s[-1], scrambles[-1]]])
+            else:
+                save()
+        update_stats()
 
-    def show_error_message(string):
+    def switch_session(name):
+        """
+        Starts job that loads session `name` and makes it the current one
+        """
+        new_session_file = f"{HOME}/.cl-timer/{name}"
+        new_settings_file = f"{HOME}/.cl-timer/{name}-settings.json"
+
+        def work(job):
+            if archive.is_archived(name):
+                archive.restore(name, job.progress)
+            lines = storage.load(new_session_file, job.progress)
+            new_settings = None
+            if isfile(new_settings_file):
+                with open(new_settings_file, 'r') as f:
+                    new_settings = json.load(f)
+                if new_settings.get('trainer') in trainer.TRAINERS:
+                    # so that new_scramble doesn't have to find its cases
+                    trainer.case_table(new_settings['trainer'], job.progress)
+            if lines:
+                # so that update_stats doesn't have to work it out
+                session_distribution(name)
+            columns = [[line[i] for line in lines] for i in range(4)]
+            return columns, RangeIndex(*columns[:3]), new_settings
+
+        def apply(result):
+            columns, new_index, new_settings = result
+            session.string = name
+            session_file.string = new_session_file
+            settings_file.string = new_settings_file
+            session_name_image.displayed_chars = char(name)
+            session_name_image.render()
+
+            times[:], ao5s[:], ao12s[:], scrambles[:] = columns
+            range_index.replace(new_index)
+            journal.open(journal_file(name))
+
+            settings.pop('trainer', None)
+            if new_settings is not None:
+                for key, value in new_settings.items():
+                    settings[key] = value
+            else:
+                settings['puzzle'] = '3'
+                settings['scramble-length'] = '20'
+            if new_settings is None or 'scramble-seed' not in new_settings:
+                settings['scramble-seed'] = new_seed()
+                with open(settings_file.string, 'w+') as f:
+                    json.dump(settings, f)
+
+            new_scramble()
+            update_stats()
+            return f'switched to {name}'
+
+        start_job(Job(f'loading {name}', work, apply))
+
+    def save():
+        """
+        Rewrites session file from the lists of data
+        """
+        storage.rewrite(session_file.string, zip(times, ao5s, ao12s, scrambles))
+
+    def set_penalty(solve, penalty):
+        """
+        Gives solve at index `solve` a penalty of `penalty`
+        ('DNF', '+2' or '' to remove it)
+
+        Only the averages that include the solve are recalculated.
+        """
+        with storage.locked(session_file.string):
+            follow_session()
+            old = times[solve - 1]
+            set_time(solve, add_penalty(old, penalty))
+            journal.record({'op': 'time', 'solve': solve, 'old': old, 'new': times[solve - 1]})
+
+    def set_time(solve, t):
+        """
+        Changes time of solve at index `solve` to `t`
+        """
+        with storage.locked(session_file.string):
+            follow_session()
+            trainer.record(session.string, scrambles[solve - 1], time_value(times[solve - 1]), time_value(t))
+            times[solve - 1] = t
+            if competition.client is not None:
+                competition.client.change(solve, t)
+            update_averages(solve, solve + 11)
+            save()
+        update_stats()
+
+    def update_averages(first, last):
+        """
+        Recalculates averages of solves at indices `first` to `last`
+        (as far as there are solves) after the ones before them changed
+        """
+        for i in range(first, min(last, len(times)) + 1):
+            ao5s[i - 1] = calculate_average(i, 5)
+            ao12s[i - 1] = calculate_average(i, 12)
+            range_index.set(i, times[i - 1], ao5s[i - 1], ao12s[i - 1])
+
+    def set_setting(key, value):
+        """
+        Changes setting `key` (like 'puzzle') to `value` and gives a new scramble for it.
+        The puzzle can be a trainer (like 'oll'), which drills cases of its puzzle.
+        """
+        if key == 'puzzle' and value in trainer.TRAINERS:
+            settings['trainer'] = value
+            value = str(trainer.TRAINERS[value].size)
+        elif key == 'puzzle':
+            settings.pop('trainer', None)
+        settings[key] = value
+        new_scramble()
+
+        with open(settings_file.string, 'w') as f:
+            json.dump(settings, f)
+
+        update_stats()
+
+    def undo_or_redo(undoing):
+        """
+        Undoes the latest change, or makes the latest undone one again
+        """
+        op = journal.undo() if undoing else journal.redo()
+        if op is None:
+            show_error_message(f'nothing to {"undo" if undoing else "redo"}')
+
+        if op['op'] == 'settings':
+            set_setting(op['key'], op['old'] if undoing else op['new'])
+            return
+
+        # other cl-timers can only have added solves after these, but check
+        # that it's still the same solve before changing it
+        solve = op['solve']
+        if op['op'] == 'time':
+            expected = op['new'] if undoing else op['old']
+        elif (op['op'] == 'add') == undoing:  # solve has to be taken out
+            expected = op['line'][0]
+        else:
+            expected = None
+        with storage.locked(session_file.string):
+            follow_session()
+            if expected is not None and not (solve <= len(times) and same_time(times[solve - 1], expected)):
+                journal.clear()
+                show_error_message(f'solve {solve} was changed by another cl-timer, so it can\'t be {"undone" if undoing else "redone"}')
+            if solve > len(times) + 1:
+                journal.clear()
+                show_error_message(f'solve {solve} is gone, so it can\'t be {"undone" if undoing else "redone"}')
+
+            if op['op'] == 'time':
+                set_time(solve, op['old'] if undoing else op['new'])
+            elif (op['op'] == 'add') == undoing:
+                remove_solve(solve)
+            else:
+                insert_solve(solve, op['line'])
+
+    def show_message(string):
+        """
+        Shows `string` on the bottom line, and the command goes on
+        """
         if not silent:
             Image(canvas, 0, len(canvas.grid) - 1, char(string)).render()
+
+    def show_error_message(string):
+        show_message(string)
         raise CommandSyntaxError
 
     def interpret(command):
@@ -144,7 +420,7 @@ def command_line(
             if len(words) != 3:
                 show_error_message(f'`alias` takes exactly 2 arguments - {len(words) - 1} were given')
             
-            if words[1] in ['s', 'i', 'c', 'rm', 'd', 'p', 'q', 'a', 'alias']:
+            if words[1] in ['s', 'i', 'c', 'ls', 'import', 'export', 'archive', 'plot', 'dist', 'draw', 'profile', 'trace', 'range', 'pb', 'cases', 'undo', 'redo', 'rm', 'd', 'p', 'q', 'a', 'alias']:
                 show_error_message(f'{words[1]} is a command. Choose a different name.')
             
             aliases[words[1]] = words[2].strip()
@@ -155,40 +431,50 @@ def command_line(
                 if len(words) == 1:
                     show_error_message('`s` takes exactly 2 arguments - 0 were given')
                 else:
-                    if words[1] in ['p', 'sl']:
+                    if words[1] in ['p', 'sl', 'seed']:
                         show_error_message(f'`s {words[1]}` takes 1 argument - {len(words) - 2} were given')
             
-            if words[1] in ['p', 'sl']:
-                if words[1] == 'p':
+            if words[1] in ['p', 'sl', 'seed']:
+                if words[1] == 'p' and words[2] not in trainer.TRAINERS:
                     try:
                         if not (int(words[2]) in [i for i in range(2, 8)]):
-                            show_error_message('`s p` takes an integer between 2 and 7 (inclusive) as an argument')
+                            show_error_message('`s p` takes an integer between 2 and 7 (inclusive) or a trainer '
+                                               f'({", ".join(trainer.TRAINERS)}) as an argument')
                     except ValueError:
-                        show_error_message('`s p` takes an integer between 2 and 7 (inclusive) as an argument')
+                        show_error_message('`s p` takes an integer between 2 and 7 (inclusive) or a trainer '
+                                           f'({", ".join(trainer.TRAINERS)}) as an argument')
                 if words[1] == 'sl':
                     try:
-                        int(words[2])
+                        if int(words[2]) < 0:
+                            show_error_message('`s sl` takes an integer that is 0 or more as an argument')
                     except ValueError:
                         show_error_message(f'invalid integer value: {words[2]}')
+                if words[1] == 'seed':
+                    if not words[2] or '\t' in words[2]:
+                        show_error_message(f'invalid seed: "{words[2]}"')
             else:
                 show_error_message(f'`s` - invalid argument: "{words[1]}"')
 
-            if words[1] == 'sl':
-                settings['scramble-length'] = words[2]
-            elif words[1] == 'p':
-                settings['puzzle'] = words[2]
+            key = {'sl': 'scramble-length', 'p': 'puzzle', 'seed': 'scramble-seed'}[words[1]]
+            old = settings.get('trainer', settings[key]) if key == 'puzzle' else settings[key]
+            value = words[2]
 
-            new_scramble = generate_scramble(int(settings['puzzle']),
-                                            int(settings['scramble-length']))
-            scramble_image.clear()
-            scramble_image.chars = char(new_scramble)
+            def change(result=None):
+                set_setting(key, value)
+                journal.record({'op': 'settings', 'key': key, 'old': old, 'new': value})
+                if result is not None:
+                    return f'drilling {value} cases'
 
-            with open(settings_file.string, 'w') as f:
-                json.dump(settings, f)
+            if key == 'puzzle' and value in trainer.TRAINERS and not trainer.ready(value):
+                # the cases of a trainer are found the first time it is used, which takes a while
+                start_job(Job(f'finding {value} cases', lambda job: trainer.case_table(value, job.progress), change))
+            else:
+                change()
                 
         elif words[0] == 'i':
             if len(words) == 1:
-                subprocess.call(['vim', session_file.string])
+                browse(stdscr, session.string, times, ao5s, ao12s, scrambles, set_penalty,
+                       len(times))
             elif len(words) == 2:
                 try:
                     if not (int(words[1]) in range(1, len(times) + 1)):
@@ -207,47 +493,222 @@ def command_line(
             for c in words[1]:
                 if c not in string.printable[:-5]:
                     show_error_message(f'invalid file name: {words[1]}')
-            new_file = False
-            session.string = words[1]
-            session_file.string = f"{HOME}/.cl-timer/{words[1]}"
-            settings_file.string = f"{HOME}/.cl-timer/{words[1]}-settings.json"
-            session_name_image.displayed_chars = char(words[1])
-            session_name_image.render()
-            
-            s = len(times)
+            if catalog.is_reserved(words[1]):
+                show_error_message(f'invalid file name: {words[1]}')
+            switch_session(words[1])
 
-            for lst in [times, ao5s, ao12s, scrambles]:
-                for _ in range(s):
-                    lst.pop(0)
+        elif words[0] == 'ls':
+
+            if len(words) > 2:
+                show_error_message(f'`ls` takes either 0 or 1 argument(s) - {len(words) - 1} were given')
+
+            name = catalog.pick_session(stdscr, words[1] if len(words) == 2 else '')
+            if name is not None:
+                interpret(f'c "{name}"')
+
+        elif words[0] == 'import':
+
+            if len(words) not in [3, 4]:
+                show_error_message(f'`import` takes 2 or 3 arguments - {len(words) - 1} were given')
+            if words[1] not in FORMATS:
+                show_error_message(f'`import` - invalid format: "{words[1]}" (use {", ".join(FORMATS)})')
 
-            if not isfile(session_file.string):
-                with open(session_file.string, 'w+') as f:
+            fmt, path, name = words[1], expanduser(words[2]), session.string
+            if not isfile(path):
+                show_error_message(f'no such file: {words[2]}')
+
+            def work(job):
+                try:
+                    return import_session(fmt, path, name, *words[3:], progress=job.progress)
+                except (ValueError, LookupError, TypeError):
+                    raise JobFailed(f'invalid {fmt} file: {words[2]}')
+
+            def apply(result):
+                count, invalid = result
+                if name == session.string:
+                    # load what was added to the session file
+                    follow_session()
+                message = f'imported {count} solves'
+                if invalid:
+                    puzzle = settings['puzzle']
+                    message += f' - scrambles of {invalid} of them are not for a {puzzle}x{puzzle}'
+                return message
+
+            start_job(Job('importing', work, apply))
+
+        elif words[0] == 'export':
+
+            if len(words) != 3:
+                show_error_message(f'`export` takes exactly 2 arguments - {len(words) - 1} were given')
+            if words[1] not in FORMATS:
+                show_error_message(f'`export` - invalid format: "{words[1]}" (use {", ".join(FORMATS)})')
+
+            fmt, path, name = words[1], expanduser(words[2]), session.string
+
+            def work(job):
+                try:
+                    return export_session(fmt, name, path, job.progress)
+                except OSError:
+                    raise JobFailed(f'could not write to {words[2]}')
+
+            def cleanup():
+                try:
+                    remove(path)
+                except OSError:
                     pass
+
+            start_job(Job('exporting', work, lambda count: f'exported {count} solves to {words[2]}', cleanup))
+
+        elif words[0] == 'archive':
+
+            if len(words) == 1:
+                show_error_message('`archive` takes at least 1 argument - 0 were given')
+            names = words[1:]
+            for name in names:
+                if name == session.string:
+                    show_error_message(f'{name} is open - switch to another session to archive it')
+                if not catalog.is_session_file(name):
+                    show_error_message(f'no such session: {name}')
+
+            def work(job):
+                before = after = 0
+                for i, name in enumerate(names):
+                    # the index keeps the session's line of `ls`
+                    size, archive_size = archive.archive_session(
+                        name, catalog.scan_session(name), lambda fraction: job.progress((i + fraction) / len(names)))
+                    before += size
+                    after += archive_size
+                return before, after
+
+            def apply(sizes):
+                before, after = sizes
+                return f'archived {len(names)} session(s): {before / 1e3:.0f} KB -> {after / 1e3:.0f} KB'
+
+            start_job(Job('archiving', work, apply))
+
+        elif words[0] == 'plot':
+
+            for name in words[1:]:
+                if name not in SERIES:
+                    show_error_message(f'`plot` - invalid series: "{name}" (use {", ".join(SERIES)})')
+
+            plot(stdscr, session.string, times, ao5s, ao12s, words[1:] or DEFAULT_SERIES)
+
+        elif words[0] == 'dist':
+
+            if words[1:] == ['all']:
+                names = list(catalog.refresh().keys())
+                title = 'DISTRIBUTION OF ALL SESSIONS'
             else:
-                with open(session_file.string, 'r') as f:
-                    lines = f.read().split('\n')
-                if '' in lines:
-                    lines.remove('')
-                time_lines = [line.split('\t') for line in lines]
-
-                for line in time_lines:
-                    times.append(line[0])
-                    ao5s.append(line[1])
-                    ao12s.append(line[2])
-                    scrambles.append(line[3])
-        
-            if isfile(settings_file.string):
-                with open(settings_file.string, 'r') as f:
-                    for key, value in json.load(f).items():
-                        settings[key] = value
+                names = words[1:] or [session.string]
+                for name in names:
+                    if name != session.string and not (catalog.is_session_file(name) or archive.is_archived(name)):
+                        show_error_message(f'no such session: {name}')
+                title = f'DISTRIBUTION OF {", ".join(names)}'
+
+            lines, cols = stdscr.getmaxyx()
+            text = panel(combined_distribution(names), title, cols - 1, lines - 10)
+            display_text(stdscr, f'{text}\n\n\nPress any key to exit')
+
+        elif words[0] == 'draw':
+
+            if len(words) > 2:
+                show_error_message(f'`draw` takes either 0 or 1 argument(s) - {len(words) - 1} were given')
+
+            if len(words) == 1:
+                scramble = scramble_image.scramble
+                title = 'CURRENT SCRAMBLE'
             else:
-                settings['puzzle'] = '3'
-                settings['scramble-length'] = '20'
-                with open(settings_file.string, 'w+') as f:
-                    json.dump(settings, f)
+                try:
+                    if not (int(words[1]) in range(1, len(times) + 1)):
+                        show_error_message(f'invalid integer value: `{int(words[1])}`')
+                except ValueError:
+                    show_error_message('`draw` takes an integer as an argument')
+                scramble = expand(scrambles[int(words[1]) - 1])
+                title = f'SCRAMBLE OF SOLVE {words[1]}'
+
+            try:
+                net = draw_scramble(scramble, int(settings['puzzle']))
+            except ValueError:
+                show_error_message(f'scramble is not for a {settings["puzzle"]}x{settings["puzzle"]}')
+            display_text(stdscr, f'{title}\n\n{scramble}\n\n{net}\n\n\nPress any key to exit')
+
+        elif words[0] == 'profile':
+
+            if len(words) != 2:
+                show_error_message(f'`profile` takes exactly 1 argument - {len(words) - 1} were given')
+
+            if words[1] == 'start':
+                profiler.start()
+                show_message('profiling - `profile dump` to see where the time went')
+            elif words[1] == 'stop':
+                profiler.stop()
+            elif words[1] == 'dump':
+                path = profiler.dump()
+                if path is None:
+                    show_error_message('nothing was profiled - use `profile start` first')
+                display_text(stdscr, f'PROFILE\n\n{profiler.summary()}\n\nWritten to {path}\n\n\nPress any key to exit')
+            else:
+                show_error_message(f'`profile` - invalid argument: "{words[1]}" (use start, stop or dump)')
+
+        elif words[0] == 'trace':
+
+            if len(words) > 2:
+                show_error_message(f'`trace` takes either 0 or 1 argument(s) - {len(words) - 1} were given')
+
+            if len(words) == 2:
+                try:
+                    tracer.export(expanduser(words[1]))
+                except OSError:
+                    show_error_message(f'could not write to {words[1]}')
+            else:
+                display_text(stdscr, f'SOLVE LATENCY\n\n{tracer.summary()}\n\n\nPress any key to exit')
+
+        elif words[0] == 'range':
+
+            if len(words) != 3:
+                show_error_message(f'`range` takes exactly 2 arguments - {len(words) - 1} were given')
+
+            try:
+                first, last = int(words[1]), int(words[2])
+            except ValueError:
+                show_error_message('`range` takes two integers as arguments')
+            if not 1 <= first <= last <= len(times):
+                show_error_message(f'invalid range: {first} to {last} (there are {len(times)} solves)')
+
+            stats = range_index.query(first, last)
+            found = lambda column, solve: f'{add_zero(column[solve - 1])} (solve {solve})' if solve is not None else ''
+            display_text(stdscr, '\n'.join([
+                f'SOLVES {first} TO {last}', '',
+                f'Number of Times: {stats.count - stats.dnfs}/{stats.count}',
+                f'Mean: {add_zero(round(stats.mean, 2)) if stats.mean is not None else ""}',
+                f'Best time: {found(times, stats.best)}',
+                f'Worst time: {found(times, stats.worst)}',
+                f'Best AO5: {found(ao5s, stats.best_ao5)}',
+                f'Best AO12: {found(ao12s, stats.best_ao12)}',
+                '', '', 'Press any key to exit'
+            ]))
+
+        elif words[0] == 'pb':
+
+            if len(words) != 1:
+                show_error_message(f'`pb` takes exactly 0 arguments - {len(words) - 1} were given')
+
+            lines, cols = stdscr.getmaxyx()
+            text = history_text(range_index.records, cols - 1, lines - 8)
+            display_text(stdscr, f'{text}\n\n\nPress any key to exit')
+
+        elif words[0] == 'cases':
+
+            if len(words) != 1:
+                show_error_message(f'`cases` takes exactly 0 arguments - {len(words) - 1} were given')
+            if not settings.get('trainer'):
+                show_error_message('not drilling cases - use `s p` with a trainer first')
+
+            lines, cols = stdscr.getmaxyx()
+            text = trainer.cases_text(trainer.get(settings['trainer'], session.string), cols - 1, lines - 8)
+            display_text(stdscr, f'{text}\n\n\nPress any key to exit')
 
-            update_stats()
-        
         elif words[0] == 'rm':
 
             if len(words) != 2:
@@ -262,50 +723,39 @@ def command_line(
                     answer = ask_for_input(
                         stdscr, canvas, ip, Cursor(canvas), True)
                     if answer == 'y':
-                        for _ in range(1, len(times[:]) + 1):
-                            delete(1)
-                        update_stats()
-                        return
-                    else:
-                        return
+                        delete_all()
+                    return
                 else:
                     show_error_message(f'invalid integer value: {words[1]}')
 
             delete(int(words[1]))
-
-            for i in range(len(ao5s)):
-                ao5s[i] = calculate_average(i + 1, 5)
-            for i in range(len(ao12s)):
-                ao12s[i] = calculate_average(i + 1, 12)
-
-            with open(session_file.string, 'w') as f:
-                f.write(
-                    '\n'.join(
-                        ['\t'.join([str(thing) for thing in 
-                            [time, ao5, ao12, scramble]])
-                            for time, ao5, ao12, scramble in
-                            zip(times, ao5s, ao12s, scrambles)]
-                        )
-                    )
-
-            update_stats()
             
         elif words[0] == 'd':
 
             if len(words) != 1:
                 show_error_message(f'`d` takes exactly 0 arguements - {len(words) - 1} were given')
 
-            dnf()
-            update_stats()        
+            check_no_job('change a penalty')
+            if times:
+                set_penalty(len(times), 'DNF')
 
         elif words[0] == 'p':
 
             if len(words) != 1:
                 show_error_message(f'`p` takes exactly 0 arguements - {len(words) - 1} were given')
 
-            plus_two()
-            update_stats()
+            check_no_job('change a penalty')
+            if times:
+                set_penalty(len(times), '+2')
             
+        elif words[0] in ['undo', 'redo']:
+
+            if len(words) != 1:
+                show_error_message(f'`{words[0]}` takes exactly 0 arguments - {len(words) - 1} were given')
+
+            check_no_job(words[0])
+            undo_or_redo(words[0] == 'undo')
+
         elif words[0] == 'q':
 
             if len(words) != 1:
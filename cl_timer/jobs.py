@@ -0,0 +1,129 @@
+import threading
+
+
+class Cancelled(Exception):
+    """
+    Raised in a job's thread when it reports progress after being cancelled
+    """
+
+
+class JobFailed(Exception):
+    """
+    Raised by a job's work with a message to show instead of the result
+    """
+
+
+class Job:
+    """
+    A long command that runs on a worker thread, so that the timer
+    keeps going while it does.
+
+    `work` is called on the worker thread with the job, and should call
+    job.progress every now and then, which is where it is stopped if the
+    job was cancelled. It must not touch the session's lists: it returns
+    a result, and `apply` is called with it on the main thread, between
+    two frames, to change them all at once. `apply` returns a message for
+    the status line, or None. `cleanup` is called if the job is cancelled
+    or fails, to remove what it left behind.
+    """
+
+    def __init__(self, name, work, apply=None, cleanup=None):
+        self.name = name
+        self.work = work
+        self.apply = apply
+        self.cleanup = cleanup
+        self.fraction = 0
+        self.result = None
+        self.error = None
+        self.cancelled = threading.Event()
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, name=f'job: {name}', daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def _run(self):
+        try:
+            self.result = self.work(self)
+        except Exception as e:
+            self.error = e
+            if self.cleanup is not None:
+                self.cleanup()
+        finally:
+            self.done.set()
+
+    def progress(self, fraction):
+        """
+        Records how much of the job is done (0 to 1).
+        Raises Cancelled if the job was cancelled.
+        """
+        self.fraction = fraction
+        if self.cancelled.is_set():
+            raise Cancelled()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    @property
+    def status(self):
+        return f'{self.name}... {self.fraction * 100:.0f}%  (escape to cancel)'
+
+    def finish(self):
+        """
+        Applies result on the calling thread (the main one)
+        and returns a message saying how the job went
+        """
+        if isinstance(self.error, Cancelled):
+            return f'{self.name}: cancelled'
+        if isinstance(self.error, JobFailed):
+            return str(self.error)
+        if self.error is not None:
+            return f'{self.name} failed: {self.error}'
+        if self.apply is not None:
+            message = self.apply(self.result)
+            if message is not None:
+                return message
+        return f'{self.name}: done'
+
+
+# job that is running, only one runs at a time
+current = None
+
+
+def start(job):
+    """
+    Starts `job`. Raises RuntimeError if another job is running.
+    """
+    global current
+    if current is not None:
+        raise RuntimeError(f'{current.name} is still running')
+    current = job
+    job.start()
+
+
+def poll():
+    """
+    Called every frame by the main thread. Returns (status, finished), the
+    text for the status line (None if there is no job) and whether a job
+    just finished, in which case its result was applied.
+    """
+    global current
+    if current is None:
+        return None, False
+    if not current.done.is_set():
+        return current.status, False
+    job, current = current, None
+    return job.finish(), True
+
+
+def cancel():
+    if current is not None:
+        current.cancel()
+
+
+def wait(timeout=None):
+    """
+    Waits for the running job to stop, for at most `timeout` seconds
+    """
+    if current is not None:
+        current.done.wait(timeout)
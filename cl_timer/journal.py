@@ -0,0 +1,154 @@
+from collections import deque
+import json
+from os import replace
+from os.path import basename, dirname, isfile
+from pathlib import Path
+import sys
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer.stats import time_value
+
+HOME = str(Path.home())
+
+SUFFIX = '-journal'
+
+# changes that can be undone, older ones are forgotten
+HISTORY = 1000
+
+# once the journal file has this many records it is written again
+# with only what is still on the stacks
+MAX_RECORDS = 5 * HISTORY
+
+
+# Operations
+#
+# Each change to a session is a dict with what is needed to make it and
+# to undo it:
+#
+#     {"op": "add", "solve": n, "line": [time, ao5, ao12, scramble]}
+#     {"op": "delete", "solve": n, "line": [time, ao5, ao12, scramble]}
+#     {"op": "time", "solve": n, "old": time, "new": time}  (a penalty)
+#     {"op": "settings", "key": key, "old": value, "new": value}
+#
+# The journal file has a JSON line for each thing that happened:
+# {"do": operation}, {"undo": 1}, {"redo": 1} or {"clear": 1}. Going
+# through them again gives back the stacks.
+
+
+def journal_file(name):
+    return f'{HOME}/.cl-timer/{name}{SUFFIX}'
+
+
+def same_time(a, b):
+    """
+    Whether times `a` and `b` are the same, however they were written
+    """
+    a, b = str(a), str(b)
+    return (time_value(a) == time_value(b) and a.startswith('DNF') == b.startswith('DNF')
+            and a.endswith('+') == b.endswith('+'))
+
+
+class Journal:
+    """
+    Changes made to the open session, so they can be undone and redone.
+
+    Undoing takes the latest change off one stack and puts it on the other,
+    and each do, undo or redo is one line appended to the journal file,
+    which is read when the session is opened again.
+    """
+
+    def __init__(self, path=None):
+        self.open(path)
+
+    def open(self, path):
+        """
+        Switches to journal file at `path` (None for none)
+        """
+        self.path = path
+        self.undo_stack = deque(maxlen=HISTORY)
+        self.redo_stack = deque(maxlen=HISTORY)
+        self.records = 0
+        if path is None or not isfile(path):
+            return
+        with open(path, 'r') as f:
+            for line in f:
+                try:
+                    self._replay(json.loads(line))
+                except (ValueError, KeyError, IndexError):
+                    pass  # cut off while it was written
+                self.records += 1
+        if self.records > MAX_RECORDS:
+            self._compact()
+
+    def _replay(self, record):
+        if 'do' in record:
+            self.undo_stack.append(record['do'])
+            self.redo_stack.clear()
+        elif 'undo' in record:
+            self.redo_stack.append(self.undo_stack.pop())
+        elif 'redo' in record:
+            self.undo_stack.append(self.redo_stack.pop())
+        elif 'clear' in record:
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+
+    def _write(self, record):
+        if self.path is None:
+            return
+        if self.records >= MAX_RECORDS:
+            self._compact()
+        with open(self.path, 'a') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + '\n')
+        self.records += 1
+
+    def _compact(self):
+        records = [{'do': op} for op in self.undo_stack]
+        records += [{'do': op} for op in reversed(self.redo_stack)]
+        records += [{'undo': 1} for _ in self.redo_stack]
+        tmp = f'{dirname(self.path)}/.{basename(self.path)}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(''.join(json.dumps(record, separators=(',', ':')) + '\n' for record in records))
+        replace(tmp, self.path)
+        self.records = len(records)
+
+    def record(self, op):
+        """
+        Adds change `op`, which was just made. Changes that were undone can't be redone after it.
+        """
+        self.undo_stack.append(op)
+        self.redo_stack.clear()
+        self._write({'do': op})
+
+    def undo(self):
+        """
+        Returns latest change to undo and moves it to the redo stack, or None
+        """
+        if not self.undo_stack:
+            return None
+        op = self.undo_stack.pop()
+        self.redo_stack.append(op)
+        self._write({'undo': 1})
+        return op
+
+    def redo(self):
+        """
+        Returns latest undone change to make again and moves it back, or None
+        """
+        if not self.redo_stack:
+            return None
+        op = self.redo_stack.pop()
+        self.undo_stack.append(op)
+        self._write({'redo': 1})
+        return op
+
+    def clear(self):
+        """
+        Forgets every change, when the session was changed in a way they can't be undone over
+        """
+        if self.undo_stack or self.redo_stack:
+            self.undo_stack.clear()
+            self.redo_stack.clear()
+            self._write({'clear': 1})
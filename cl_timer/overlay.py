@@ -0,0 +1,209 @@
+import asyncio
+import json
+import threading
+
+DEFAULT_PORT = 7420
+
+# events an overlay can fall behind by before it is dropped
+CLIENT_QUEUE_SIZE = 32
+
+# how long a client has to send its request
+TIMEOUT = 10
+
+
+# Protocol
+#
+# GET /snapshot.json answers with the latest of each event:
+#
+#     {"solve": {"solve": n, "time": t, "ao5": ao5, "ao12": ao12},
+#      "stats": {"session": name, "puzzle": puzzle, "solves": n, "ao5": ao5,
+#                "ao12": ao12, "best": t, "best_ao5": ao5, "best_ao12": ao12,
+#                "mean": mean}}
+#
+# GET /events is a Server-Sent Events stream of them ("event: solve" and
+# "event: stats"), starting with the ones in the snapshot. GET / is a page
+# that shows them, for an OBS browser source.
+
+PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<style>
+body { margin: 0; font: bold 36px monospace; color: white; text-shadow: 2px 2px 4px black; }
+#time { font-size: 72px; }
+</style>
+</head>
+<body>
+<div id="time">-</div>
+<div>ao5 <span id="ao5">-</span></div>
+<div>ao12 <span id="ao12">-</span></div>
+<script>
+const events = new EventSource('/events');
+const show = (id, value) => document.getElementById(id).textContent = value || '-';
+events.addEventListener('solve', e => show('time', JSON.parse(e.data).time));
+events.addEventListener('stats', e => {
+    const stats = JSON.parse(e.data);
+    show('ao5', stats.ao5);
+    show('ao12', stats.ao12);
+});
+</script>
+</body>
+</html>
+"""
+
+
+def response(status, content_type, body):
+    return (f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\nContent-Length: {len(body)}\r\n'
+            f'Access-Control-Allow-Origin: *\r\nCache-Control: no-cache\r\nConnection: close\r\n\r\n').encode() + body
+
+
+def sse_message(event, data):
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'.encode()
+
+
+class Client:
+    """
+    An overlay reading the event stream, with the events it hasn't been sent yet
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.queue = asyncio.Queue(CLIENT_QUEUE_SIZE)
+
+    def drop(self):
+        """
+        Ends the stream, whether it is waiting for an event or for the client to read
+        """
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+        self.writer.transport.abort()
+
+
+class OverlayServer:
+    """
+    Local HTTP server of the timer's latest solve and stats, for
+    stream overlays.
+
+    It runs an asyncio loop on a thread of its own, so `publish` only
+    hands the event to the loop (call_soon_threadsafe puts it on the
+    loop's queue and never waits). Each stream has a queue of events
+    that haven't been sent yet; a client that lets it fill up is too slow
+    to keep up and is dropped, rather than the events piling up for it.
+    """
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.snapshot = {}  # event -> its latest data
+        self.clients = set()  # Clients of the streams
+        self.connections = {}  # task handling each open connection -> its writer
+        self.loop = None
+        self.server = None
+        self.error = None
+        started = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(started,), daemon=True)
+        self.thread.start()
+        started.wait()
+        if self.error is not None:
+            raise OSError(self.error)
+
+    def _run(self, started):
+        self.loop = asyncio.new_event_loop()
+        try:
+            self.server = self.loop.run_until_complete(asyncio.start_server(self.handle, self.host, self.port))
+        except OSError as e:
+            self.error = e.strerror
+            started.set()
+            self.loop.close()
+            return
+        self.port = self.server.sockets[0].getsockname()[1]
+        started.set()
+        self.loop.run_forever()
+        self.loop.close()
+
+    def publish(self, event, data):
+        """
+        Sends `data` of `event` ('solve' or 'stats') to the overlays
+        """
+        self.loop.call_soon_threadsafe(self._publish, event, data)
+
+    def _publish(self, event, data):
+        self.snapshot[event] = data
+        message = sse_message(event, data)
+        for client in list(self.clients):
+            try:
+                client.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                client.drop()
+                self.clients.discard(client)
+
+    async def handle(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections[task] = writer
+        try:
+            request = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), TIMEOUT)
+            method, path = request.split(b' ', 2)[:2]
+            path = path.decode().split('?')[0]
+            if method != b'GET':
+                writer.write(response('405 Method Not Allowed', 'text/plain', b''))
+            elif path == '/':
+                writer.write(response('200 OK', 'text/html; charset=utf-8', PAGE.encode()))
+            elif path == '/snapshot.json':
+                writer.write(response('200 OK', 'application/json', json.dumps(self.snapshot).encode()))
+            elif path == '/events':
+                await self.stream(writer)
+            else:
+                writer.write(response('404 Not Found', 'text/plain', b''))
+            await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError,
+                ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+            del self.connections[task]
+
+    async def stream(self, writer):
+        writer.write(b'HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n'
+                     b'Access-Control-Allow-Origin: *\r\nCache-Control: no-cache\r\n\r\n')
+        for event, data in self.snapshot.items():
+            writer.write(sse_message(event, data))
+        client = Client(writer)
+        self.clients.add(client)
+        try:
+            while True:
+                message = await client.queue.get()
+                if message is None:  # dropped
+                    return
+                writer.write(message)
+                await writer.drain()
+        finally:
+            self.clients.discard(client)
+
+    async def _shutdown(self):
+        """
+        Stops taking connections and ends the ones that are open: streams
+        are sent None, so they return, and the rest (still waiting for their
+        request) are cut off. Their handlers have all finished, and closed
+        their connections, by the time it returns.
+        """
+        self.server.close()
+        for client in list(self.clients):
+            client.drop()
+        for writer in self.connections.values():
+            writer.transport.abort()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        await self.server.wait_closed()
+
+    def stop(self):
+        if self.loop is not None and self.loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(1)
+            except TimeoutError:
+                pass
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(1)
+
+
+# overlay server of the running timer, or None
+server = None
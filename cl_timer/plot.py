@@ -0,0 +1,357 @@
+from array import array
+from bisect import bisect_left
+from os.path import dirname
+import sys
+import time
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer.graphics import Canvas, Char, Image
+from cl_timer.stats import time_value
+
+SERIES = ['single', 'ao5', 'ao12']
+DEFAULT_SERIES = ['single', 'ao12']
+
+# keys that show or hide each series in the plot
+SERIES_KEYS = {ord('1'): 'single', ord('5'): 'ao5', ord('2'): 'ao12'}
+
+BRAILLE = 0x2800
+# bit of each dot of a braille char, as DOTS[column][row]
+DOTS = [[0x01, 0x02, 0x04, 0x40], [0x08, 0x10, 0x20, 0x80]]
+
+AXIS_WIDTH = 8
+
+INF = float('inf')
+
+char = lambda string: Char.fromstring(string)
+
+
+def lttb(xs, ys, a, b, n):
+    """
+    Largest-Triangle-Three-Buckets: picks `n` of the points `a` to `b`
+    of `xs` and `ys` that keep the shape of the line they make.
+    Returns their positions.
+    """
+    if b - a <= n:
+        return list(range(a, b))
+    every = (b - a - 2) / (n - 2)
+    selected = [a]
+    previous = a
+    for i in range(n - 2):
+        lo = a + 1 + int(i * every)
+        hi = a + 1 + int((i + 1) * every)
+        next_hi = min(a + 1 + int((i + 2) * every), b)
+        if next_hi <= hi:
+            next_hi = hi + 1
+        # the third corner of each triangle is the average of the next bucket
+        cx = sum(xs[hi:next_hi]) / (next_hi - hi)
+        cy = sum(ys[hi:next_hi]) / (next_hi - hi)
+        ax, ay = xs[previous], ys[previous]
+        dx, dy = ax - cx, cy - ay
+        previous = max(range(lo, hi), key=lambda j: abs(dx * (ys[j] - ay) - (ax - xs[j]) * dy))
+        selected.append(previous)
+    selected.append(b - 1)
+    return selected
+
+
+class Series:
+    """
+    A column of the session (times, ao5s or ao12s) as floats.
+
+    DNFs and missing averages are +inf in `lows` and -inf in `highs`,
+    so min and max of a slice skip them without a Python loop.
+    `xs` and `ys` are the solve numbers and values of the rest.
+    """
+
+    def __init__(self, name, column):
+        self.name = name
+        self.lows = array('d')
+        self.highs = array('d')
+        self.xs = array('d')
+        self.ys = array('d')
+        for i, t in enumerate(column):
+            value = time_value(t)
+            if value is None:
+                self.lows.append(INF)
+                self.highs.append(-INF)
+            else:
+                self.lows.append(value)
+                self.highs.append(value)
+                self.xs.append(i)
+                self.ys.append(value)
+
+    def __len__(self):
+        return len(self.lows)
+
+    def buckets(self, start, end, n):
+        """
+        Splits solves `start` to `end` into `n` buckets and returns
+        (bucket, low, high) for each one that has a value in it.
+
+        When there are fewer solves than buckets, some buckets are empty
+        and the solves are spread out over the width.
+        """
+        size = (end - start) / n
+        result = []
+        for i in range(n):
+            a = start + int(i * size)
+            b = min(start + int((i + 1) * size), end)
+            if a >= b:
+                continue
+            low = min(self.lows[a:b])
+            if low != INF:
+                result.append((i, low, max(self.highs[a:b])))
+        return result
+
+    def sample(self, start, end, n):
+        """
+        Returns (solve index, value) of at most `n` of solves `start` to `end`
+
+        When there are many more solves than that, the lowest and highest
+        of each of 2n buckets are picked first (which costs no Python loop
+        over the solves), and lttb only chooses between those.
+        """
+        a = bisect_left(self.xs, start)
+        b = bisect_left(self.xs, end)
+        xs, ys = self.xs, self.ys
+        if b - a > 8 * n:
+            picked = []
+            size = (b - a) / (2 * n)
+            for k in range(2 * n):
+                lo = a + int(k * size)
+                bucket = ys[lo:a + int((k + 1) * size)]
+                lowest = lo + bucket.index(min(bucket))
+                highest = lo + bucket.index(max(bucket))
+                picked.extend(sorted({lowest, highest}))
+            xs = array('d', (xs[j] for j in picked))
+            ys = array('d', (ys[j] for j in picked))
+            a, b = 0, len(picked)
+        return [(int(xs[j]), ys[j]) for j in lttb(xs, ys, a, b, n)]
+
+
+class Plot(Image):
+    """
+    Braille chart of some of the series of a session.
+
+    Only as many points as there are columns of dots are drawn, however
+    many solves there are. Singles are picked with lttb and drawn as dots,
+    averages are split into buckets and drawn as a line through the
+    lowest and highest value of each one.
+    """
+
+    def __init__(self, canvas, x, y, width, height, series, shown=DEFAULT_SERIES):
+        self.width = width
+        self.height = height
+        self.series = series  # {name: Series}
+        self.shown = [name for name in SERIES if name in shown]
+        self.rows = []
+        self.reset()
+        Image.__init__(self, canvas, x, y, [])
+
+    @property
+    def length(self):
+        return len(self.series['single'])
+
+    def reset(self):
+        """
+        Shows all solves
+        """
+        self.start = 0
+        self.end = self.length
+
+    def show_last(self, n):
+        self.start = max(self.length - n, 0)
+        self.end = self.length
+
+    def zoom(self, factor):
+        """
+        Shows `factor` times as many solves (fewer if `factor` < 1),
+        keeping the middle of the chart where it is.
+        """
+        middle = (self.start + self.end) / 2
+        span = max(int((self.end - self.start) * factor), 2)
+        span = min(span, self.length)
+        self.start = max(int(middle - span / 2), 0)
+        self.end = min(self.start + span, self.length)
+        self.start = max(self.end - span, 0)
+
+    def pan(self, fraction):
+        """
+        Moves by `fraction` of the solves being shown (back if negative)
+        """
+        span = self.end - self.start
+        shift = int(span * fraction) or (1 if fraction > 0 else -1)
+        self.start = min(max(self.start + shift, 0), self.length - span)
+        self.end = self.start + span
+
+    def toggle(self, name):
+        if name in self.shown:
+            self.shown.remove(name)
+        else:
+            self.shown = [s for s in SERIES if s in self.shown or s == name]
+
+    def update(self):
+        """
+        Draws the chart into self.rows
+        """
+        chart_width = self.width - AXIS_WIDTH
+        chart_height = self.height - 1
+        dots_x = chart_width * 2
+        dots_y = chart_height * 4
+
+        span = self.end - self.start
+        points = {}
+        lowest, highest = INF, -INF
+        if span > 0 and chart_width > 0 and chart_height > 0:
+            for name in self.shown:
+                if name == 'single':
+                    # (dot column, value, value) like buckets
+                    points[name] = [((x - self.start) * dots_x // span, y, y)
+                                    for x, y in self.series[name].sample(self.start, self.end, dots_x)]
+                else:
+                    points[name] = self.series[name].buckets(self.start, self.end, dots_x)
+                for _, low, high in points[name]:
+                    lowest = min(lowest, low)
+                    highest = max(highest, high)
+
+        if lowest == INF:
+            self.rows = ['no times to plot']
+            return
+        if highest - lowest < 0.01:
+            lowest, highest = lowest - 1, highest + 1
+
+        def dot_row(value):
+            return round((highest - value) / (highest - lowest) * (dots_y - 1))
+
+        cells = [[0] * chart_width for _ in range(chart_height)]
+
+        def draw(dot_x, top, bottom):
+            column = DOTS[dot_x % 2]
+            for y in range(top, bottom + 1):
+                cells[y // 4][dot_x // 2] |= column[y % 4]
+
+        for name in self.shown:
+            previous = None
+            for i, low, high in points[name]:
+                top, bottom = dot_row(high), dot_row(low)
+                if name != 'single' and previous is not None:
+                    # join averages into a line
+                    previous_i, previous_top, previous_bottom = previous
+                    y = (previous_top + previous_bottom) // 2
+                    middle = (top + bottom) // 2
+                    for gap in range(previous_i + 1, i):
+                        next_y = y + (middle - y) * (gap - previous_i) // (i - previous_i)
+                        draw(gap, min(y, next_y), max(y, next_y))
+                        previous_top = previous_bottom = y = next_y
+                    draw(i, min(top, previous_bottom), max(bottom, previous_top))
+                else:
+                    draw(i, top, bottom)
+                previous = (i, top, bottom)
+
+        labels = {0: highest, chart_height // 2: (highest + lowest) / 2, chart_height - 1: lowest}
+        rows = []
+        for y, row in enumerate(cells):
+            label = f'{labels[y]:.2f}' if y in labels else ''
+            rows.append(f'{label:>{AXIS_WIDTH - 2}} │' + ''.join(chr(BRAILLE + c) for c in row))
+
+        first, last = str(self.start + 1), str(self.end)
+        rows.append(' ' * AXIS_WIDTH + first + last.rjust(chart_width - len(first)))
+        self.rows = rows
+
+    def render(self):
+        """
+        Writes rows straight into the canvas grid, a row at a time
+        """
+        grid = self.canvas.grid
+        width = len(grid[0])
+        for i in range(self.height):
+            row_index = (len(grid) - 1) - (self.y + i)
+            if not (0 <= row_index < len(grid)):
+                continue
+            row = self.rows[i] if i < len(self.rows) else ''
+            row = row[:min(self.width, width - self.x)]
+            row = row + ' ' * (min(self.width, width - self.x) - len(row))
+            grid[row_index][self.x:self.x + len(row)] = list(row)
+
+
+def load_series(times, ao5s, ao12s):
+    return {
+        'single': Series('single', times),
+        'ao5': Series('ao5', ao5s),
+        'ao12': Series('ao12', ao12s)
+    }
+
+
+def plot(stdscr, session_name, times, ao5s, ao12s, shown=DEFAULT_SERIES):
+    """
+    Interactive chart of the session's times and averages
+
+    left/right or h/l - move, up/down or k/j or +/- - zoom in/out
+    0 - show all, 1/5/2 - show or hide singles/ao5/ao12, q/escape - exit
+    """
+    lines, cols = stdscr.getmaxyx()
+    canvas = Canvas(lines - 1, cols - 1)
+    chart = Plot(canvas, 0, 1, cols - 1, lines - 3, load_series(times, ao5s, ao12s), shown)
+    title = Image(canvas, 0, 0, [])
+    status = Image(canvas, 0, lines - 2, [])
+    redraw = True
+
+    while True:
+        key = stdscr.getch()
+
+        if key in [27, ord('q')]:
+            return
+        elif key == 410:  # terminal was resized
+            # the chart covers every line but the title and status,
+            # and all three are drawn again below
+            lines, cols = stdscr.getmaxyx()
+            canvas.resize(lines - 1, cols - 1)
+            chart.width, chart.height = cols - 1, lines - 3
+            status.y = lines - 2
+        elif key in [260, ord('h')]:  # left arrow
+            chart.pan(-0.25)
+        elif key in [261, ord('l')]:  # right arrow
+            chart.pan(0.25)
+        elif key in [259, ord('k'), ord('+'), ord('=')]:  # up arrow
+            chart.zoom(0.5)
+        elif key in [258, ord('j'), ord('-')]:  # down arrow
+            chart.zoom(2)
+        elif key == ord('0'):
+            chart.reset()
+        elif key in SERIES_KEYS:
+            chart.toggle(SERIES_KEYS[key])
+
+        if key != -1:
+            redraw = True
+        if not redraw:
+            time.sleep(0.01)
+            continue
+        redraw = False
+
+        chart.update()
+        chart.render()
+        for image, text in [
+                (title, f'{session_name} - {", ".join(chart.shown) or "nothing"} - '
+                        f'solves {chart.start + 1}-{chart.end} of {chart.length}'),
+                (status, 'h/l: move  k/j: zoom  0: all  1/5/2: singles/ao5/ao12  q: exit')]:
+            image.displayed_chars = char(text[:cols - 1])
+            image.render()
+
+        stdscr.clear()
+        stdscr.addstr(canvas.display)
+        stdscr.refresh()
+
+
+def plot_text(times, ao5s, ao12s, width, height, shown=DEFAULT_SERIES, last=None):
+    """
+    Returns the chart as a string, for printing outside of curses
+    """
+    canvas = Canvas(height, width)
+    chart = Plot(canvas, 0, 0, width, height, load_series(times, ao5s, ao12s), shown)
+    if last is not None:
+        chart.show_last(last)
+    chart.update()
+    chart.render()
+    return '\n'.join(row.rstrip() for row in canvas.display.split('\n'))
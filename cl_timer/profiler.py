@@ -0,0 +1,110 @@
+import cProfile
+from os import mkdir
+from os.path import basename, dirname
+from pathlib import Path
+import pstats
+import sys
+import time
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+HOME = str(Path.home())
+
+PROFILES_DIR = f'{HOME}/.cl-timer/.profiles'
+
+# how many functions the summary shows
+TOP = 15
+
+
+class Profiler:
+    """
+    cProfile of the main thread of the running timer,
+    that can be started and stopped as many times as you like.
+
+    cProfile only hooks into the interpreter while it is running,
+    so when it is stopped it costs nothing.
+    Background threads (like sync) aren't profiled.
+    """
+
+    def __init__(self):
+        self.profile = None
+        self.running = False
+
+    def start(self):
+        if self.running:
+            return
+        if self.profile is None:
+            self.profile = cProfile.Profile()
+        self.profile.enable()
+        self.running = True
+
+    def stop(self):
+        if not self.running:
+            return
+        self.profile.disable()
+        self.running = False
+
+    def clear(self):
+        """
+        Forgets everything that was profiled so far
+        """
+        self.stop()
+        self.profile = None
+
+    def stats(self):
+        """
+        Returns pstats.Stats of what was profiled so far, or None
+        """
+        if self.profile is None:
+            return None
+        running = self.running
+        self.stop()
+        try:
+            stats = pstats.Stats(self.profile)
+        except TypeError:  # nothing was profiled
+            stats = None
+        if running:
+            self.start()
+        return stats
+
+    def dump(self):
+        """
+        Writes what was profiled so far to a pstats file in
+        ~/.cl-timer/.profiles and returns its path, or None if
+        nothing was profiled.
+
+        Read it with `python -m pstats <file>` or a viewer like snakeviz.
+        """
+        stats = self.stats()
+        if stats is None:
+            return None
+        try:
+            mkdir(PROFILES_DIR)
+        except FileExistsError:
+            pass
+        path = f'{PROFILES_DIR}/{time.strftime("%Y-%m-%d-%H%M%S")}.pstats'
+        stats.dump_stats(path)
+        return path
+
+    def summary(self, n=TOP):
+        """
+        Returns table of the `n` functions that took the most time
+        (not counting the functions they called)
+        """
+        stats = self.stats()
+        if stats is None:
+            return 'nothing was profiled'
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:n]
+        lines = [f"{'own ms':>10}{'total ms':>10}{'calls':>9}  function"]
+        for (filename, line, function), (_, calls, own, total, _) in rows:
+            if filename != '~':  # built-in functions have no file
+                function = f'{function} ({basename(filename)}:{line})'
+            lines.append(f'{own * 1000:>10.1f}{total * 1000:>10.1f}{calls:>9}  {function}')
+        lines.append(f'\n{stats.total_calls} calls in {stats.total_tt:.2f}s')
+        return '\n'.join(lines)
+
+
+# profiler of the running timer
+profiler = Profiler()
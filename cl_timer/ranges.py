@@ -0,0 +1,250 @@
+from collections import namedtuple
+from os.path import dirname
+import sys
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer.records import Records
+from cl_timer.stats import time_value
+
+# what a range of solves has, with the best and worst of it as solve numbers
+# (None when the range has no such solve) and the mean of the ones that
+# aren't DNFs (None if they all are)
+RangeStats = namedtuple('RangeStats', ['count', 'dnfs', 'mean', 'best', 'worst', 'best_ao5', 'best_ao12'])
+
+INFINITY = float('inf')
+
+# (value, leaf) of nothing, which every solve beats
+NO_LOW = (INFINITY, 0)
+NO_HIGH = (-INFINITY, 0)
+
+# A node of the tree is a tuple of what the solves under it add up to:
+#
+#     (solves, DNFs, total of the other times,
+#      best time, worst time, best ao5, best ao12)
+#
+# where the bests and worst are (value, leaf) so the solve can be found.
+EMPTY = (0, 0, 0, NO_LOW, NO_HIGH, NO_LOW, NO_LOW)
+
+MIN_CAPACITY = 16
+
+
+def combine(a, b):
+    return (a[0] + b[0], a[1] + b[1], a[2] + b[2], min(a[3], b[3]),
+            max(a[4], b[4]), min(a[5], b[5]), min(a[6], b[6]))
+
+
+def leaf_node(leaf, t, ao5, ao12):
+    value = time_value(t)
+    ao5 = time_value(ao5)
+    ao12 = time_value(ao12)
+    if value is None:
+        node = (1, 1, 0, NO_LOW, NO_HIGH)
+    else:
+        node = (1, 0, value, (value, leaf), (value, leaf))
+    return node + ((ao5, leaf) if ao5 is not None else NO_LOW,
+                   (ao12, leaf) if ao12 is not None else NO_LOW)
+
+
+class RangeIndex:
+    """
+    Segment tree over the solves of a session, so the stats of any
+    range of them (like solves 4000 to 9000) take O(log n) instead of
+    slicing out the range and going through all of it.
+
+    Each solve is a leaf, and every node keeps the count, DNFs, total,
+    best and worst time and best ao5 and ao12 of the leaves under it. An
+    added solve takes the next leaf, and the tree doubles when it runs out.
+    A deleted solve's leaf is emptied rather than removed, so the ones after
+    it don't move; solve numbers are turned into leaves by counting down the
+    tree. Adding, deleting and changing a solve only update the nodes above
+    its leaf.
+
+    The session's personal bests (`records`) are kept up to date with it.
+    """
+
+    def __init__(self, times=(), ao5s=(), ao12s=()):
+        self.records = Records(self)
+        self.reset(times, ao5s, ao12s)
+
+    def reset(self, times, ao5s, ao12s):
+        """
+        Builds the tree from the columns of a session
+        """
+        self.size = len(times)  # leaves used, deleted ones too
+        self.capacity = MIN_CAPACITY
+        while self.capacity < self.size:
+            self.capacity *= 2
+        self.nodes = [EMPTY] * (2 * self.capacity)
+        for i, line in enumerate(zip(times, ao5s, ao12s)):
+            self.nodes[self.capacity + i] = leaf_node(i, *line)
+        for node in range(self.capacity - 1, 0, -1):
+            self.nodes[node] = combine(self.nodes[2 * node], self.nodes[2 * node + 1])
+        self.records.rebuild()
+
+    def replace(self, other):
+        """
+        Takes the tree of `other`, which was built on another thread
+        """
+        self.size, self.capacity, self.nodes = other.size, other.capacity, other.nodes
+        self.records = other.records
+        self.records.index = self
+
+    def __len__(self):
+        return self.nodes[1][0]
+
+    def _grow(self):
+        """
+        Doubles the number of leaves. The old tree becomes the left half
+        of the new one, so its nodes are moved rather than worked out again.
+        """
+        nodes = [EMPTY] * (4 * self.capacity)
+        width = 1
+        while width <= self.capacity:
+            nodes[2 * width:3 * width] = self.nodes[width:2 * width]
+            width *= 2
+        nodes[1] = nodes[2]
+        self.nodes = nodes
+        self.capacity *= 2
+
+    def _set_leaf(self, leaf, node):
+        i = self.capacity + leaf
+        nodes = self.nodes
+        nodes[i] = node
+        i //= 2
+        while i:
+            nodes[i] = combine(nodes[2 * i], nodes[2 * i + 1])
+            i //= 2
+
+    def _leaf(self, solve):
+        """
+        Returns leaf of solve number `solve` (starting at 1)
+        """
+        if not 1 <= solve <= len(self):
+            raise IndexError(f'no solve {solve} in a session of {len(self)} solves')
+        nodes = self.nodes
+        i = 1
+        while i < self.capacity:
+            i *= 2
+            if nodes[i][0] < solve:
+                solve -= nodes[i][0]
+                i += 1
+        return i - self.capacity
+
+    def _solve(self, leaf):
+        """
+        Returns solve number of (not deleted) `leaf`
+        """
+        nodes = self.nodes
+        i = self.capacity + leaf
+        solve = 1
+        while i > 1:
+            if i % 2:  # right child: count the solves to the left of it
+                solve += nodes[i - 1][0]
+            i //= 2
+        return solve
+
+    def append(self, t, ao5, ao12):
+        """
+        Adds a solve. Returns kinds of personal best it set ('single', 'ao5', 'ao12').
+        """
+        if self.size == self.capacity:
+            self._grow()
+        node = leaf_node(self.size, t, ao5, ao12)
+        self._set_leaf(self.size, node)
+        self.size += 1
+        return self.records.append(len(self), node)
+
+    def insert(self, solve, t, ao5, ao12):
+        """
+        Puts a solve back in as solve number `solve`, after it was deleted.
+        It takes the leaf it was deleted from, or if there isn't an empty one
+        there anymore, the leaves are laid out again.
+        """
+        if solve == len(self) + 1:
+            self.append(t, ao5, ao12)
+            return
+        before = self._leaf(solve - 1) if solve > 1 else -1
+        after = self._leaf(solve)
+        if after - before > 1:
+            leaf = after - 1
+            self._set_leaf(leaf, leaf_node(leaf, t, ao5, ao12))
+            self.records.inserted(solve)
+            return
+
+        leaves = [node for node in self.nodes[self.capacity:self.capacity + self.size] if node[0]]
+        leaves.insert(solve - 1, leaf_node(0, t, ao5, ao12))
+        self.size = len(leaves)
+        while self.capacity < self.size:
+            self.capacity *= 2
+        self.nodes = [EMPTY] * (2 * self.capacity)
+        for i, node in enumerate(leaves):
+            # the leaf is part of each best
+            self.nodes[self.capacity + i] = node[:3] + tuple((best[0], i) for best in node[3:])
+        for node in range(self.capacity - 1, 0, -1):
+            self.nodes[node] = combine(self.nodes[2 * node], self.nodes[2 * node + 1])
+        self.records.rebuild()
+
+    def set(self, solve, t, ao5, ao12):
+        """
+        Changes solve number `solve`, after a penalty or its averages changed
+        """
+        leaf = self._leaf(solve)
+        self._set_leaf(leaf, leaf_node(leaf, t, ao5, ao12))
+        self.records.changed(solve)
+
+    def delete(self, solve):
+        """
+        Removes solve number `solve`. Its averages and the ones after it
+        have to be `set` again.
+        """
+        self._set_leaf(self._leaf(solve), EMPTY)
+        self.records.deleted(solve)
+
+    def first_below(self, field, solve, value):
+        """
+        Returns (solve number, value) of the first solve from number `solve`
+        on whose `field` (like 3, the time) is under `value`, or None
+        """
+        if solve > len(self):
+            return None
+        nodes = self.nodes
+        i = self._leaf(solve) + self.capacity
+        # up until a node to the right has one, then down to the first of them
+        while nodes[i][field][0] >= value:
+            while i % 2:
+                i //= 2
+            if not i:
+                return None
+            i += 1
+        while i < self.capacity:
+            i *= 2
+            if nodes[i][field][0] >= value:
+                i += 1
+        return self._solve(i - self.capacity), nodes[i][field][0]
+
+    def query(self, first, last):
+        """
+        Returns RangeStats of solves `first` to `last` (both included).
+        The best averages are of the ones that end in the range.
+        """
+        low = self._leaf(first) + self.capacity
+        high = self._leaf(last) + self.capacity + 1
+        nodes = self.nodes
+        total = EMPTY
+        while low < high:
+            if low % 2:
+                total = combine(total, nodes[low])
+                low += 1
+            if high % 2:
+                high -= 1
+                total = combine(total, nodes[high])
+            low //= 2
+            high //= 2
+
+        count, dnfs, added = total[:3]
+        found = lambda best: None if best[0] in (INFINITY, -INFINITY) else self._solve(best[1])
+        return RangeStats(count, dnfs, added / (count - dnfs) if count > dnfs else None,
+                          *(found(best) for best in total[3:]))
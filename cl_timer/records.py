@@ -0,0 +1,145 @@
+from bisect import bisect_left
+from os.path import dirname
+import sys
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer.utils import add_zero
+
+INFINITY = float('inf')
+
+
+class Records:
+    """
+    Personal bests of a session in the order they were set: every solve
+    whose single, ao5 or ao12 beat all of the ones before it.
+
+    An added solve only has to be compared with the latest record of
+    each. When solves change or are deleted, the records before them stay
+    as they are, and the ones after them are found again with the range
+    index (which finds the next solve under a time in O(log n)) until one
+    of the old records comes up, after which nothing is different.
+    """
+
+    # field of the range index's nodes each kind of record is the best of
+    KINDS = {'single': 3, 'ao5': 5, 'ao12': 6}
+
+    def __init__(self, index):
+        self.index = index
+        self.solves = {kind: [] for kind in self.KINDS}
+        self.values = {kind: [] for kind in self.KINDS}
+
+    def rebuild(self):
+        for kind in self.KINDS:
+            self.solves[kind].clear()
+            self.values[kind].clear()
+            self._repair(kind, 1, 0)
+
+    def best(self, kind):
+        """
+        Returns (solve number, value) of the best `kind`, or None
+        """
+        if not self.solves[kind]:
+            return None
+        return self.solves[kind][-1], self.values[kind][-1]
+
+    def history(self, kind):
+        """
+        Returns (solve number, value) of each record of `kind`, oldest first
+        """
+        return list(zip(self.solves[kind], self.values[kind]))
+
+    def append(self, solve, node):
+        """
+        Takes solve number `solve` that was just added, as its leaf `node`.
+        Returns kinds of record it set.
+        """
+        new = []
+        for kind, field in self.KINDS.items():
+            value = node[field][0]
+            values = self.values[kind]
+            if value < (values[-1] if values else INFINITY):
+                self.solves[kind].append(solve)
+                values.append(value)
+                new.append(kind)
+        return new
+
+    def changed(self, solve):
+        """
+        Repairs records after solve number `solve` changed
+        """
+        for kind in self.KINDS:
+            self._repair(kind, solve, solve)
+
+    def deleted(self, solve):
+        """
+        Repairs records after solve number `solve` was deleted
+        """
+        for kind in self.KINDS:
+            solves = self.solves[kind]
+            i = bisect_left(solves, solve)
+            if i < len(solves) and solves[i] == solve:
+                del solves[i]
+                del self.values[kind][i]
+            for j in range(i, len(solves)):
+                solves[j] -= 1
+            # the solves from `solve` on are the same ones, but the
+            # deleted one might have been keeping them from being records
+            self._repair(kind, solve, solve - 1)
+
+    def inserted(self, solve):
+        """
+        Repairs records after solve number `solve` was put back in
+        """
+        for kind in self.KINDS:
+            solves = self.solves[kind]
+            for j in range(bisect_left(solves, solve), len(solves)):
+                solves[j] += 1
+            self._repair(kind, solve, solve)
+
+    def _repair(self, kind, first, last):
+        """
+        Finds records of `kind` from solve number `first` on again,
+        after solves `first` to `last` changed
+        """
+        solves, values = self.solves[kind], self.values[kind]
+        i = bisect_left(solves, first)
+        old_solves, old_values = solves[i:], values[i:]
+        del solves[i:], values[i:]
+
+        best = values[-1] if values else INFINITY
+        solve = first
+        while True:
+            found = self.index.first_below(self.KINDS[kind], solve, best)
+            if found is None:
+                return
+            solve, best = found
+            if solve > last:
+                # the same record as before, and so are the ones after it
+                j = bisect_left(old_solves, solve)
+                if j < len(old_solves) and old_solves[j] == solve:
+                    solves.extend(old_solves[j:])
+                    values.extend(old_values[j:])
+                    return
+            solves.append(solve)
+            values.append(best)
+            solve += 1
+
+
+def history_text(records, width=80, rows=20):
+    """
+    Returns text of the records of each kind side by side,
+    the latest `rows` of them if there are more
+    """
+    column = max(width // len(Records.KINDS), 20)
+    lines = ['PERSONAL BESTS', '', ''.join(f'{kind.upper():<{column}}' for kind in Records.KINDS).rstrip()]
+    histories = [records.history(kind)[-rows:] for kind in Records.KINDS]
+    for i in range(max(len(history) for history in histories)):
+        row = ''
+        for history in histories:
+            cell = f'{add_zero(history[i][1]):>8}  solve {history[i][0]}' if i < len(history) else ''
+            row += f'{cell:<{column}}'
+        lines.append(row.rstrip())
+    return '\n'.join(lines)
@@ -0,0 +1,155 @@
+from concurrent.futures import ProcessPoolExecutor
+import json
+from os import cpu_count, listdir
+from os.path import dirname, isfile
+from pathlib import Path
+import sys
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer import archive, catalog
+from cl_timer.distribution import format_value, Histogram
+from cl_timer.stats import time_value
+
+HOME = str(Path.home())
+
+# sessions given to a worker at a time. Small sessions cost less
+# to read than to send to a worker one by one.
+CHUNK_SIZE = 4
+
+
+class Totals:
+    """
+    What the report needs of a group of solves. Totals of two groups
+    can be merged, so each session is added up in a worker process
+    and the parent only merges what they send back.
+    """
+
+    def __init__(self):
+        self.sessions = 0
+        self.count = 0
+        self.dnfs = 0
+        self.total = 0  # of the times that aren't DNFs
+        # best (value, session) of each
+        self.best = {'single': None, 'ao5': None, 'ao12': None}
+        self.histogram = Histogram()
+
+    def add(self, line, session):
+        self.count += 1
+        value = time_value(line[0])
+        if value is None:
+            self.dnfs += 1
+        else:
+            self.total += value
+            self.histogram.add(value)
+        for name, column in zip(self.best, line[:3]):
+            self.record(name, time_value(column), session)
+
+    def record(self, name, value, session):
+        if value is not None and (self.best[name] is None or value < self.best[name][0]):
+            self.best[name] = (value, session)
+
+    def merge(self, other):
+        self.sessions += other.sessions
+        self.count += other.count
+        self.dnfs += other.dnfs
+        self.total += other.total
+        for name, best in other.best.items():
+            if best is not None:
+                self.record(name, *best)
+        self.histogram.merge(other.histogram)
+
+    @property
+    def mean(self):
+        successes = self.count - self.dnfs
+        return self.total / successes if successes else None
+
+
+def session_names():
+    """
+    Names of every session, archived ones too
+    """
+    names = [name for name in listdir(f'{HOME}/.cl-timer') if catalog.is_session_file(name)]
+    return sorted(names + catalog.archived_sessions())
+
+
+def summarize(name):
+    """
+    Reads session `name` and returns (puzzle, Totals of its solves).
+    Runs in a worker process.
+    """
+    session_file = f'{HOME}/.cl-timer/{name}'
+    totals = Totals()
+    totals.sessions = 1
+    if isfile(session_file):
+        with open(session_file, 'r') as f:
+            for line in f:
+                line = line.rstrip('\n').split('\t')
+                if len(line) >= 4:
+                    totals.add(line, name)
+    else:
+        for line in archive.Archive(archive.archive_file(name)).lines():
+            totals.add(line, name)
+
+    puzzle = '3'
+    try:
+        with open(f'{session_file}-settings.json', 'r') as f:
+            puzzle = json.load(f).get('puzzle', puzzle)
+    except (FileNotFoundError, ValueError):
+        pass
+    return puzzle, totals
+
+
+def collect(names, workers=None):
+    """
+    Returns {puzzle: Totals} of sessions `names`, read by `workers`
+    processes (default: one per core), or in this one if `workers` is 1
+    """
+    workers = workers or cpu_count() or 1
+    if workers == 1:
+        return merge(map(summarize, names))
+    with ProcessPoolExecutor(workers) as executor:
+        return merge(executor.map(summarize, names, chunksize=CHUNK_SIZE))
+
+
+def merge(results):
+    """
+    Returns {puzzle: Totals} of (puzzle, Totals) of sessions in `results`
+    """
+    by_puzzle = {}
+    for puzzle, totals in results:
+        by_puzzle.setdefault(puzzle, Totals()).merge(totals)
+    return by_puzzle
+
+
+def report_text(by_puzzle, width=80, rows=8):
+    """
+    Returns text of the report of `by_puzzle` (from collect)
+    """
+    everything = Totals()
+    for totals in by_puzzle.values():
+        everything.merge(totals)
+    lines = ['LIFETIME REPORT', '',
+             f'{everything.sessions} sessions, {everything.count} solves, {everything.dnfs} DNFs']
+
+    for puzzle in sorted(by_puzzle, key=int):
+        totals = by_puzzle[puzzle]
+        dnf_rate = totals.dnfs / totals.count * 100 if totals.count else 0
+        lines += ['', f'{puzzle}x{puzzle}',
+                  f'  {totals.sessions} sessions   {totals.count} solves   '
+                  f'{totals.dnfs} DNFs ({dnf_rate:.1f}%)   mean {format_value(totals.mean)}']
+        for name, best in totals.best.items():
+            if best is not None:
+                lines.append(f'  best {name:<7}{format_value(best[0]):>8}  ({best[1]})')
+
+        histogram = totals.histogram.rows(rows)
+        if histogram:
+            most = max(count for _, _, count in histogram)
+            label_width = len(f'{histogram[-1][1]:.2f}') * 2 + 3
+            bar_width = max(width - label_width - 14, 1)
+            for low, high, count in histogram:
+                label = f'{low:.2f}-{high:.2f}'
+                lines.append(f"  {label:>{label_width}} {'█' * round(count / most * bar_width)} {count}")
+    return '\n'.join(lines)
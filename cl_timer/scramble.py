@@ -1,3 +1,5 @@
+from functools import lru_cache
+from hashlib import blake2b
 import random
 
 
@@ -48,7 +50,7 @@ SIDE_LENTHS = [
 SIDES = [groups(lst, side_lengths) for side_lengths, lst in zip(SIDE_LENTHS, MOVES)]
 
 
-def choose_move(scramble_moves, size):
+def choose_move(scramble_moves, size, rng=random):
     """
     Looks for a move that won't be redundant.
 
@@ -62,9 +64,11 @@ def choose_move(scramble_moves, size):
 
     If that is the case, it calls itself again
     until it finds a move that isn't redundant.
+
+    Moves are chosen with `rng`'s choice method.
     """
 
-    move = random.choice(MOVES[size - 2])
+    move = rng.choice(MOVES[size - 2])
     axis = [axis for axis in AXES[size - 2] if move in axis][0]
     side = [side for side in SIDES[size - 2] if move in side][0]
 
@@ -77,16 +81,148 @@ def choose_move(scramble_moves, size):
 
     moves_since_then = scramble_moves[last_move_of_different_axis + 1:]
     if [move for move in moves_since_then if move in side] != []:
-        return choose_move(scramble_moves, size)
+        return choose_move(scramble_moves, size, rng)
     return move
 
 
-def generate_scramble(size, length):
+def generate_scramble(size, length, rng=random):
     """
     Returns a list of random moves 
     to scramble a rubik's cube in WCA notation
     """
     scramble_moves = []
     for i in range(length):
-        scramble_moves.append(choose_move(scramble_moves, size))
-    return ' '.join(scramble_moves)
\ No newline at end of file
+        scramble_moves.append(choose_move(scramble_moves, size, rng))
+    return ' '.join(scramble_moves)
+
+
+# Scramble streams
+#
+# A session has a seed, and scramble number `index` of it is made by a
+# counter-based generator keyed by (seed, puzzle, length, index): its nth
+# random number is a hash of the key and n, so any scramble can be made
+# again on its own, without the ones before it. Solves store a token for
+# it instead of the moves:
+#
+#     #seed:puzzle:length:index
+#
+# and cl-timers given the same seed show the same scrambles, which is
+# all a race needs.
+
+TOKEN_PREFIX = '#'
+
+MASK = (1 << 64) - 1
+GOLDEN = 0x9e3779b97f4a7c15
+
+
+class ScrambleStream:
+    """
+    Random numbers of scramble `index` of `seed` (for a puzzle of `size`
+    and scramble `length`), for generate_scramble
+    """
+
+    def __init__(self, seed, size, length, index):
+        key = f'{seed}:{size}:{length}:{index}'.encode()
+        self.key = int.from_bytes(blake2b(key, digest_size=8).digest(), 'big')
+        self.counter = 0
+
+    def next(self):
+        """
+        Returns the next 64 bit number (splitmix64 of the key and counter)
+        """
+        self.counter += 1
+        x = (self.key + self.counter * GOLDEN) & MASK
+        x = ((x ^ (x >> 30)) * 0xbf58476d1ce4e5b9) & MASK
+        x = ((x ^ (x >> 27)) * 0x94d049bb133111eb) & MASK
+        return x ^ (x >> 31)
+
+    def choice(self, seq):
+        return seq[(self.next() * len(seq)) >> 64]
+
+
+def new_seed():
+    return f'{random.getrandbits(32):08x}'
+
+
+def stream_scramble(seed, size, length, index):
+    """
+    Returns scramble number `index` of `seed`
+    """
+    return generate_scramble(size, length, ScrambleStream(seed, size, length, index))
+
+
+def scramble_token(seed, size, length, index):
+    return f'{TOKEN_PREFIX}{seed}:{size}:{length}:{index}'
+
+
+def parse_token(scramble):
+    """
+    Returns (seed, puzzle, length, index) of a scramble token, or None if `scramble` is moves
+    """
+    if not scramble.startswith(TOKEN_PREFIX):
+        return None
+    try:
+        seed, size, length, index = scramble[len(TOKEN_PREFIX):].rsplit(':', 3)
+        size, length, index = int(size), int(length), int(index)
+    except ValueError:
+        return None
+    if not 2 <= size <= 7 or length < 0 or index < 0:
+        return None
+    return seed, size, length, index
+
+
+def next_index(scrambles, seed, start=0, index=0):
+    """
+    Returns the index after the highest of the tokens of `seed` in
+    `scrambles` from `start` on, or `index` if that is higher
+    """
+    prefix = f'{TOKEN_PREFIX}{seed}:'
+    for i in range(start, len(scrambles)):
+        if scrambles[i].startswith(prefix):
+            token = parse_token(scrambles[i])
+            if token is not None and token[0] == seed:
+                index = max(index, token[3] + 1)
+    return index
+
+
+# A solve of a trainer (see trainer.py) stores which case its scramble
+# was a setup of, so its time can be taken back off the case's stats
+# when the solve is deleted or given a penalty:
+#
+#     @trainer:case:moves
+
+CASE_PREFIX = '@'
+
+
+def case_token(trainer, case, moves):
+    return f'{CASE_PREFIX}{trainer}:{case}:{moves}'
+
+
+def parse_case_token(scramble):
+    """
+    Returns (trainer, case, moves) of a case token, or None if `scramble` isn't one
+    """
+    if not scramble.startswith(CASE_PREFIX):
+        return None
+    try:
+        trainer, case, moves = scramble[len(CASE_PREFIX):].split(':', 2)
+        case = int(case)
+    except ValueError:
+        return None
+    if case < 0:
+        return None
+    return trainer, case, moves
+
+
+@lru_cache(maxsize=256)
+def expand(scramble):
+    """
+    Returns moves of `scramble`, which can be a token or moves already
+    """
+    case = parse_case_token(scramble)
+    if case is not None:
+        return case[2]
+    token = parse_token(scramble)
+    if token is None:
+        return scramble
+    return stream_scramble(*token)
\ No newline at end of file
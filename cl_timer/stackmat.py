@@ -0,0 +1,285 @@
+from abc import ABC, abstractmethod
+import argparse
+from collections import deque, namedtuple
+import os
+from os.path import dirname
+import random
+import sys
+import threading
+import time
+
+try:
+    import termios
+    import tty
+except ImportError:  # windows
+    termios = None
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+# Stackmat timers send a packet about 10 times a second at 1200 baud:
+# a status byte, the time as digits (minutes, two of seconds, hundredths,
+# and thousandths on newer timers), a checksum of 64 + the sum of the
+# digits, then '\n\r'.
+BAUD = 1200
+PACKET_END = b'\n\r'
+
+READY = b'A'  # both hands on the pads, timer will start when they come off
+RUNNING = b' '
+STOPPED = b'S'
+IDLE = b'I'  # reset to 0
+# hands on the pads: left, right, both
+HANDS = [b'L', b'R', b'C']
+
+STATUSES = [READY, RUNNING, STOPPED, IDLE] + HANDS
+
+# what the simulator sends, in seconds between packets
+PACKET_INTERVAL = 0.1
+
+# A packet read from the timer, with when it was read (time.perf_counter)
+Packet = namedtuple('Packet', ['status', 'time', 'at'])
+
+# start, stop or reset of the timer, with its time in seconds
+# and when the packet was read (time.perf_counter)
+Event = namedtuple('Event', ['kind', 'time', 'at'])
+
+
+def checksum(digits):
+    return 64 + sum(int(d) for d in digits)
+
+
+def decode_packet(data):
+    """
+    Returns (status, time in seconds) of a packet without its '\\n\\r',
+    or None if it is garbled. Thousandths are cut off, like the WCA does.
+    """
+    if len(data) not in [7, 8]:
+        return None
+    status, digits, check = data[:1], data[1:-1].decode('ascii', 'replace'), data[-1]
+    if status not in STATUSES or not digits.isdigit() or check != checksum(digits):
+        return None
+    return status, round(int(digits[0]) * 60 + int(digits[1:3]) + int(digits[3:5]) / 100, 2)
+
+
+def encode_packet(status, seconds, thousandths=False):
+    """
+    Returns packet a timer would send with `status` (like RUNNING) and time `seconds`
+    """
+    milliseconds = int(seconds * 1000)
+    digits = f'{milliseconds // 60000}{milliseconds // 1000 % 60:02d}{milliseconds % 1000:03d}'
+    if not thousandths:
+        digits = digits[:-1]
+    return status + digits.encode() + bytes([checksum(digits)]) + PACKET_END
+
+
+class Decoder:
+    """
+    Turns bytes from a timer into packets, and packets into events.
+
+    Bytes can come in any pieces. Garbled packets (from a cable being
+    plugged in halfway through one, say) are skipped.
+    """
+
+    def __init__(self):
+        self.buffer = b''
+        self.running = False
+        self.last_time = 0
+
+    def feed(self, data, at=None):
+        """
+        Returns packets completed by `data`
+        """
+        at = time.perf_counter() if at is None else at
+        self.buffer += data
+        *packets, self.buffer = self.buffer.split(PACKET_END)
+        decoded = []
+        for packet in packets:
+            packet = decode_packet(packet)
+            if packet is not None:
+                decoded.append(Packet(*packet, at))
+        return decoded
+
+    def events(self, packet):
+        """
+        Returns events that `packet` means, going by the ones before it
+        """
+        events = []
+        if packet.time == 0:
+            if self.last_time != 0 or self.running:
+                events.append(Event('reset', 0, packet.at))
+            self.running = False
+        elif packet.status == STOPPED:
+            if self.running:
+                events.append(Event('stop', packet.time, packet.at))
+            self.running = False
+        elif not self.running and packet.time > self.last_time:
+            events.append(Event('start', packet.time, packet.at))
+            self.running = True
+        self.last_time = packet.time
+        return events
+
+
+class InputSource(ABC):
+    """
+    Something other than the keyboard that times solves.
+
+    Reads on its own thread and puts events on a deque, which threads
+    can append to and pop from without a lock, so the main loop never
+    waits for it: each frame it takes whatever events came in.
+    """
+
+    def __init__(self):
+        self.queue = deque()
+        self.thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self.error = None
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        try:
+            self.run()
+        except OSError as e:  # unplugged
+            self.error = e
+
+    @abstractmethod
+    def run(self):
+        """
+        Reads until the source is closed, putting its events on the queue
+        """
+
+    def poll(self):
+        """
+        Returns events that came in since the last call
+        """
+        events = []
+        while self.queue:
+            events.append(self.queue.popleft())
+        return events
+
+    def close(self):
+        pass
+
+
+class StackmatSource(InputSource):
+    """
+    Stackmat timer plugged in at `device`, a serial port
+    (like /dev/ttyUSB0) or a pty from the simulator.
+    """
+
+    def __init__(self, device):
+        super().__init__()
+        self.device = device
+        self.fd = os.open(device, os.O_RDONLY | os.O_NOCTTY)
+        if termios is not None and os.isatty(self.fd):
+            tty.setraw(self.fd)
+            attributes = termios.tcgetattr(self.fd)
+            attributes[4] = attributes[5] = termios.B1200  # input and output speed
+            termios.tcsetattr(self.fd, termios.TCSANOW, attributes)
+        self.decoder = Decoder()
+        self.closed = False
+
+    def run(self):
+        while not self.closed:
+            data = os.read(self.fd, 64)  # blocks this thread only
+            if not data:
+                break
+            for packet in self.decoder.feed(data):
+                self.queue.extend(self.decoder.events(packet))
+
+    def close(self):
+        self.closed = True
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class Simulator:
+    """
+    Pretend Stackmat timer on a pty, for trying cl-timer out without one.
+    Its device is `path`.
+    """
+
+    def __init__(self, thousandths=False):
+        self.master, self.slave = os.openpty()
+        self.path = os.ttyname(self.slave)
+        self.thousandths = thousandths
+        self.status = IDLE
+        self.time = 0
+        self.started = None
+        self.lock = threading.Lock()
+        self.closed = False
+        self.thread = threading.Thread(target=self._send, name='Simulator', daemon=True)
+        self.thread.start()
+
+    def _send(self):
+        while not self.closed:
+            with self.lock:
+                if self.started is not None:
+                    self.time = time.perf_counter() - self.started
+                packet = encode_packet(self.status, self.time, self.thousandths)
+            try:
+                os.write(self.master, packet)
+            except OSError:
+                return
+            time.sleep(PACKET_INTERVAL)
+
+    def start(self):
+        with self.lock:
+            self.status = RUNNING
+            self.time = 0
+            self.started = time.perf_counter()
+
+    def stop(self):
+        with self.lock:
+            self.time = time.perf_counter() - self.started
+            self.started = None
+            self.status = STOPPED
+
+    def reset(self):
+        with self.lock:
+            self.status = IDLE
+            self.time = 0
+            self.started = None
+
+    def solve(self, seconds):
+        self.reset()
+        time.sleep(PACKET_INTERVAL * 3)
+        self.start()
+        time.sleep(seconds)
+        self.stop()
+
+    def close(self):
+        self.closed = True
+        os.close(self.master)
+        os.close(self.slave)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m cl_timer.stackmat',
+                                     description='Pretend Stackmat timer on a pty, for cl-timer --stackmat')
+    parser.add_argument('--solves', type=int, help='stop after this many solves (default: never)')
+    parser.add_argument('--gap', type=float, default=3, help='seconds between solves (default: 3)')
+    args = parser.parse_args()
+
+    simulator = Simulator()
+    print(f'simulated stackmat on {simulator.path}, run: cl-timer --stackmat {simulator.path}')
+    solves = 0
+    try:
+        while args.solves is None or solves < args.solves:
+            time.sleep(args.gap)
+            seconds = random.uniform(8, 15)
+            print(f'solve {solves + 1}: {seconds:.2f}')
+            simulator.solve(seconds)
+            solves += 1
+        time.sleep(args.gap)
+    except KeyboardInterrupt:
+        pass
+    simulator.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,154 @@
+from collections import deque
+from os.path import dirname
+import sys
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer.utils import add_zero
+
+
+def convert_to_float(lst, purpose):
+    """
+    Returns list of all float-convertable values of `lst`,
+    along with length of new list
+    """
+    float_times = []
+    len_times = 0
+    for t in lst:
+        if (str(t)[:3] != 'DNF') and (t != '') and (str(t)[-1] != '+'):
+            float_times.append(float(t))
+            len_times += 1
+        elif str(t)[-1] == '+':
+            if purpose == 'average':
+                float_times.append(float(t[:-1]))
+                len_times += 1
+            elif purpose == 'single':
+                float_times.append(t)
+                len_times += 1
+    return float_times, len_times
+
+
+def time_value(t):
+    """
+    Float value of a time or average, or None if it is a DNF or empty
+    """
+    t = str(t)
+    if t == '' or t[:3] == 'DNF':
+        return None
+    if t[-1] == '+':
+        t = t[:-1]
+    return float(t)
+
+
+def average(window):
+    """
+    Returns average of the times in `window`
+
+    Excludes best and worst times, and returns average of the rest.
+    A DNF counts as the worst time, so two of them make the average a DNF.
+    """
+    length = len(window)
+    float_times, _ = convert_to_float(window, 'average')
+    if len(float_times) < (length - 1):
+        return 'DNF'
+    if len(float_times) == length:
+        float_times.remove(max(float_times))
+    float_times.remove(min(float_times))
+
+    # calculate average and add zero if it doesn't go to 100ths place.
+    return add_zero(round(sum(float_times) / len(float_times), 2))
+
+
+def solve_average(times, solve, length):
+    """
+    Returns average of `length` during `solve`
+
+    Looks through `times` and finds last `length` solves before `solve`
+    """
+    if len(times[:solve]) < length:
+        # `length` solves haven't been done yet.
+        return ''
+    else:
+        return average(times[solve - length:solve])  # list of last `length` solves
+
+
+def get_session_mean(times):
+    """
+    Returns mean of all solves in `times`
+    """
+    try:
+        float_times, len_times = convert_to_float(times, 'average')
+        return add_zero(round(sum(float_times) / len_times, 2))
+    except ZeroDivisionError:
+        return ""
+
+
+def get_best_average(averages):
+    """
+    Returns best of `averages` (a column of averages of the session)
+    """
+    # by value: as strings, '9.50' would come after '10.00'
+    values = [i for i in averages if time_value(i) is not None]
+    if not values:
+        return ""
+    return add_zero(min(values, key=time_value))
+
+
+def get_best_time(times):
+    try:
+        converted_times, _ = convert_to_float(times, 'single')
+        float_times = [float(t[:-1]) if isinstance(t, str) else t for t in converted_times]
+        best = converted_times[float_times.index(min(float_times))]
+        if isinstance(best, float):
+            return add_zero(best)
+    except ValueError as e:
+        return ""
+    return best
+
+
+def get_worst_time(times):
+    try:
+        converted_times, _ = convert_to_float(times, 'single')
+        float_times = [float(t[:-1]) if isinstance(t, str) else t for t in converted_times]
+        worst = converted_times[float_times.index(max(float_times))]
+        if isinstance(worst, float):
+            return add_zero(worst)
+    except ValueError as e:
+        return ""
+    return worst
+
+
+def count_successes(times):
+    """
+    Returns number of solves in `times` that aren't DNFs
+    """
+    len_successes = 0
+    for t in times:
+        if not ((isinstance(t, str)) and (t[:3] == 'DNF')):
+            len_successes += 1
+    return len_successes
+
+
+class RollingAverage:
+    """
+    Average of the latest `length` times, kept up to date as times are added
+
+    Lets a whole list of times get its averages in one pass
+    instead of slicing out every window.
+    """
+
+    def __init__(self, length, previous=()):
+        # `previous` is the times that came before in the session
+        self.length = length
+        self.window = deque(previous, maxlen=length)
+
+    def add(self, t):
+        """
+        Adds `t` as the latest time and returns the new average
+        """
+        self.window.append(t)
+        if len(self.window) < self.length:
+            return ''
+        return average(self.window)
@@ -0,0 +1,315 @@
+from contextlib import contextmanager
+import ctypes
+import ctypes.util
+from os import close, fstat, mkdir, read, replace, stat
+from os.path import basename, dirname
+from pathlib import Path
+import struct
+import sys
+import threading
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+HOME = str(Path.home())
+
+LOCKS_DIR = f'{HOME}/.cl-timer/.locks'
+
+# how much of each session file has been read into memory,
+# as {path: (inode, size)}
+_known = {}
+
+# locks each thread holds, as {path: (lock file, depth)}
+_local = threading.local()
+
+# functions called with the path of a session file after it is written to
+listeners = []
+
+CHUNK_SIZE = 1 << 20  # characters read at a time when loading with progress
+BATCH_SIZE = 10000  # lines written at a time when rewriting
+
+
+def _held():
+    if not hasattr(_local, 'held'):
+        _local.held = {}
+    return _local.held
+
+
+@contextmanager
+def locked(session_file):
+    """
+    Holds an advisory lock on `session_file` while the with block runs,
+    so that other cl-timers don't write to it at the same time.
+
+    Can be nested. The lock is on a separate file in ~/.cl-timer/.locks
+    because rewrites replace the session file.
+    """
+    held = _held()
+    if session_file in held:
+        f, depth = held[session_file]
+        held[session_file] = (f, depth + 1)
+        try:
+            yield
+        finally:
+            f, depth = held[session_file]
+            held[session_file] = (f, depth - 1)
+        return
+
+    try:
+        mkdir(LOCKS_DIR)
+    except FileExistsError:
+        pass
+    f = open(f'{LOCKS_DIR}/{basename(session_file)}', 'a')
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX)
+    held[session_file] = (f, 1)
+    try:
+        yield
+    finally:
+        if held[session_file][1] == 1:
+            del held[session_file]
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+
+
+def notify(session_file):
+    """
+    Tells listeners that session file was written to.
+    Listeners must return right away, this runs on every solve.
+    """
+    for listener in listeners:
+        listener(session_file)
+
+
+def parse_lines(text):
+    """
+    Returns list of the columns (time, ao5, ao12, scramble) of each line in `text`
+    """
+    return [line.split('\t') for line in text.split('\n') if line != '']
+
+
+def load(session_file, progress=None):
+    """
+    Returns lines of session file, creating it if it doesn't exist yet
+
+    `progress` is called with the fraction of the file read so far
+    after each chunk, if it is given.
+    """
+    with locked(session_file):
+        with open(session_file, 'a+') as f:
+            f.seek(0)
+            s = fstat(f.fileno())
+            if progress is None:
+                text = f.read()
+            else:
+                chunks = []
+                read = 0
+                while True:
+                    chunk = f.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    chunks.append(chunk)
+                    read += len(chunk)
+                    progress(min(read / max(s.st_size, 1), 1))
+                text = ''.join(chunks)
+        _known[session_file] = (s.st_ino, s.st_size)
+    return parse_lines(text)
+
+
+def changed(session_file):
+    """
+    Whether anything was written to session file since it was last read.
+    Only costs a stat.
+    """
+    try:
+        s = stat(session_file)
+    except FileNotFoundError:
+        return False
+    return _known.get(session_file) != (s.st_ino, s.st_size)
+
+
+def read_new(session_file):
+    """
+    Returns (reloaded, lines).
+
+    If other cl-timers only appended to the session file since it was
+    last read, `lines` is just the lines they added. If the file was
+    rewritten, `reloaded` is True and `lines` is all of it.
+    """
+    if not changed(session_file):
+        return False, []
+    with locked(session_file):
+        ino, size = _known.get(session_file, (None, 0))
+        with open(session_file, 'rb') as f:
+            s = fstat(f.fileno())
+            if s.st_ino != ino or s.st_size < size:
+                return True, load(session_file)
+            f.seek(size)
+            new = f.read()
+        _known[session_file] = (ino, size + len(new))
+    return False, parse_lines(new.decode())
+
+
+def append(session_file, lines):
+    """
+    Adds `lines` (lists of columns) to the end of session file.
+
+    Call this while holding the lock, after reading what others added,
+    or their lines will be read again as if they were new.
+    """
+    text = '\n'.join('\t'.join(str(thing) for thing in line) for line in lines)
+    with locked(session_file):
+        with open(session_file, 'a') as f:
+            s = fstat(f.fileno())
+            if s.st_size > 0:
+                text = '\n' + text
+            f.write(text)
+            f.flush()
+            s = fstat(f.fileno())
+        _known[session_file] = (s.st_ino, s.st_size)
+    notify(session_file)
+
+
+def remove_last(session_file):
+    """
+    Removes the last line of session file. Only the end of the file is
+    searched for it.
+
+    The rest is copied to a new file that replaces the session file,
+    rather than the file being cut short in place: then the inode changes,
+    so other cl-timers (and sync) read all of it again. A file cut short
+    and then appended to would look to them like a file that was only
+    appended to, and they would read the new lines from the wrong place.
+    """
+    tmp = f'{dirname(session_file)}/.{basename(session_file)}.tmp'
+    with locked(session_file):
+        with open(session_file, 'rb') as f:
+            end = f.seek(0, 2)
+            cut = 0
+            while end > 0:
+                start = max(end - 4096, 0)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b'\n')
+                if newline != -1:
+                    cut = start + newline
+                    break
+                end = start
+            f.seek(0)
+            with open(tmp, 'wb') as out:
+                left = cut
+                while left:
+                    chunk = f.read(min(left, CHUNK_SIZE))
+                    out.write(chunk)
+                    left -= len(chunk)
+        replace_with(session_file, tmp)
+
+
+def write_tmp(session_file, lines, tmp=None, progress=None):
+    """
+    Writes `lines` (lists of columns) to a temporary file next to
+    session file, to replace it with later. Returns path of the file.
+
+    `progress` is called with the fraction of lines written so far
+    after each batch, if it is given.
+    """
+    if tmp is None:
+        tmp = f'{dirname(session_file)}/.{basename(session_file)}.tmp'
+    lines = list(lines)
+    with open(tmp, 'w') as f:
+        for start in range(0, len(lines), BATCH_SIZE):
+            text = '\n'.join('\t'.join(str(thing) for thing in line)
+                             for line in lines[start:start + BATCH_SIZE])
+            f.write(('\n' if start else '') + text)
+            if progress is not None:
+                progress(min((start + BATCH_SIZE) / len(lines), 1))
+    return tmp
+
+
+def replace_with(session_file, tmp):
+    """
+    Replaces session file with file at `tmp`, written by write_tmp
+    """
+    with locked(session_file):
+        replace(tmp, session_file)
+        s = stat(session_file)
+        _known[session_file] = (s.st_ino, s.st_size)
+    notify(session_file)
+
+
+def rewrite(session_file, lines):
+    """
+    Replaces contents of session file with `lines` (lists of columns).
+
+    The new contents are written to another file that then replaces
+    the session file, so a reader sees either all of the old file
+    or all of the new one.
+    """
+    with locked(session_file):
+        replace_with(session_file, write_tmp(session_file, lines))
+
+
+class Watcher:
+    """
+    Tells when a session file in `directory` might have been changed
+    by another cl-timer.
+
+    Uses inotify on linux, where checking is a single non-blocking read,
+    and otherwise stats the file every `interval` checks.
+    """
+
+    IN_MODIFY = 0x2
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_NONBLOCK = 0o4000
+
+    def __init__(self, directory, interval=25):
+        self.interval = interval
+        self.checks = 0
+        self.fd = None
+
+        if sys.platform.startswith('linux'):
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+                fd = libc.inotify_init1(self.IN_NONBLOCK)
+                if fd >= 0:
+                    if libc.inotify_add_watch(fd, directory.encode(),
+                                              self.IN_MODIFY | self.IN_MOVED_TO | self.IN_CREATE) >= 0:
+                        self.fd = fd
+                    else:
+                        close(fd)
+            except (OSError, AttributeError):
+                pass
+
+    def check(self, session_file):
+        """
+        Returns whether `session_file` was changed since it was last read
+        """
+        if self.fd is None:
+            self.checks += 1
+            if self.checks % self.interval != 0:
+                return False
+            return changed(session_file)
+
+        try:
+            events = read(self.fd, 4096)
+        except BlockingIOError:
+            return False
+
+        # struct inotify_event: int wd, uint32 mask, cookie, len, char name[len]
+        name = basename(session_file)
+        i = 0
+        while i < len(events):
+            _, _, _, length = struct.unpack_from('iIII', events, i)
+            event_name = events[i + 16:i + 16 + length].rstrip(b'\0').decode(errors='replace')
+            if event_name == name:
+                return changed(session_file)
+            i += 16 + length
+        return False
+
+    def close(self):
+        if self.fd is not None:
+            close(self.fd)
+            self.fd = None
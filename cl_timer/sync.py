@@ -0,0 +1,443 @@
+import json
+from os import listdir, mkdir, replace, stat
+from os.path import basename, dirname, isfile
+from pathlib import Path
+import queue
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+import uuid
+import zlib
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer import catalog, storage
+
+HOME = str(Path.home())
+
+SYNC_DIR = f'{HOME}/.cl-timer/.sync'
+CONFIG_FILE = f'{SYNC_DIR}/config.json'
+STATE_FILE = f'{SYNC_DIR}/state.json'
+
+DEFAULT_PORT = 7418
+
+# seconds to wait for more changes before uploading
+BATCH_DELAY = 2
+# seconds to wait after the server couldn't be reached (doubles up to MAX_RETRY_DELAY)
+RETRY_DELAY = 30
+MAX_RETRY_DELAY = 600
+TIMEOUT = 10
+
+
+# Protocol
+#
+# Messages are JSON objects, compressed with zlib and prefixed with their
+# length as a 4 byte big-endian integer. The client sends
+#
+#     {"type": "splices", "client": id, "splices": [
+#         {"session": name, "base": version, "start": i, "delete": n, "lines": [...]}, ...]}
+#
+# where each splice replaces `delete` lines from line `start` with `lines`,
+# and `base` is the version of the session the server last acknowledged.
+# The server answers with one ack per splice, {"session": name, "version": v}
+# or {"session": name, "conflict": true} if its copy isn't at `base` anymore.
+# The client then sends its whole copy,
+#
+#     {"type": "put", "client": id, "session": name, "lines": [...]}
+#
+# which replaces the server's copy. The copy it replaced is kept beside it,
+# so when two devices change the same session the last one to upload wins
+# and nothing is lost.
+
+
+def send_message(sock, message):
+    data = zlib.compress(json.dumps(message, separators=(',', ':')).encode())
+    sock.sendall(struct.pack('>I', len(data)) + data)
+
+
+def _recv_exactly(sock, n):
+    data = b''
+    while len(data) < n:
+        chunk = sock.recv(n - len(data))
+        if not chunk:
+            raise ConnectionError('connection closed')
+        data += chunk
+    return data
+
+
+def recv_message(sock):
+    length, = struct.unpack('>I', _recv_exactly(sock, 4))
+    return json.loads(zlib.decompress(_recv_exactly(sock, length)))
+
+
+def diff(old, new):
+    """
+    Returns (start, delete, lines), the one splice that turns list `old`
+    into list `new`, or None if they are the same.
+
+    Sessions only change by solves being added, removed or given penalties
+    (which changes the averages after them), so the part that differs is
+    always one run of lines.
+    """
+    if old == new:
+        return None
+    start = 0
+    end = min(len(old), len(new))
+    while start < end and old[start] == new[start]:
+        start += 1
+    suffix = 0
+    while suffix < end - start and old[-1 - suffix] == new[-1 - suffix]:
+        suffix += 1
+    return start, len(old) - suffix - start, new[start:len(new) - suffix]
+
+
+def parse_address(address):
+    """
+    Takes "host:port" (or just "host") and returns (host, port)
+    """
+    host, _, port = address.rpartition(':')
+    if not host:
+        return port, DEFAULT_PORT
+    return host, int(port)
+
+
+def load_config():
+    """
+    Returns sync settings, or None if sync isn't set up
+    """
+    try:
+        with open(CONFIG_FILE, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def save_config(server):
+    """
+    Sets the server to sync with, or turns sync off if `server` is None
+    """
+    try:
+        mkdir(SYNC_DIR)
+    except FileExistsError:
+        pass
+    config = load_config() or {'client': uuid.uuid4().hex}
+    config['server'] = server
+    with open(CONFIG_FILE, 'w') as f:
+        json.dump(config, f)
+
+
+def _write(path, data):
+    with open(f'{path}.tmp', 'wb') as f:
+        f.write(data)
+    replace(f'{path}.tmp', path)
+
+
+class SyncClient:
+    """
+    Uploads changes to sessions to a sync server.
+
+    For every session, ~/.cl-timer/.sync keeps a copy of what the server
+    has acknowledged. Only the difference between that and the session file
+    is sent: the new end of the file when solves were added, or the lines
+    that differ when it was rewritten. Changes made while offline are
+    found the same way, so catching up sends no more than they add up to.
+
+    Uploads run on a thread of their own. `notify` only puts the name of
+    the session on a queue, so nothing is added to the time of a solve.
+    """
+
+    def __init__(self, server, client_id):
+        self.address = parse_address(server)
+        self.client_id = client_id
+        self.queue = queue.Queue()
+        self.thread = None
+        self.error = None
+        self.last_sync = None
+
+        try:
+            mkdir(SYNC_DIR)
+        except FileExistsError:
+            pass
+
+    def notify(self, session_file):
+        self.queue.put_nowait(basename(session_file))
+
+    def start(self):
+        """
+        Starts uploading in the background, beginning with any changes
+        made since the last time cl-timer synced.
+        """
+        storage.listeners.append(self.notify)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.notify in storage.listeners:
+            storage.listeners.remove(self.notify)
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join(TIMEOUT)
+            self.thread = None
+
+    def _run(self):
+        pending = set(self.changed_sessions())
+        deadline = time.time() if pending else None  # when to upload pending
+        retry_delay = RETRY_DELAY
+        while True:
+            try:
+                timeout = None if deadline is None else max(deadline - time.time(), 0)
+                name = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                try:
+                    self.flush(pending)
+                    pending.clear()
+                    deadline = None
+                    retry_delay = RETRY_DELAY
+                except (OSError, ValueError) as e:
+                    self.error = str(e)
+                    deadline = time.time() + retry_delay
+                    retry_delay = min(retry_delay * 2, MAX_RETRY_DELAY)
+                continue
+
+            if name is None:
+                return
+            pending.add(name)
+            if deadline is None:
+                # collect everything that changes in the next BATCH_DELAY secs
+                deadline = time.time() + BATCH_DELAY
+
+    def changed_sessions(self):
+        """
+        Names of sessions that changed since they were last uploaded.
+        Only costs a stat per session.
+        """
+        state = self.load_state()
+        names = []
+        for name in listdir(f'{HOME}/.cl-timer'):
+            if not catalog.is_session_file(name):
+                continue
+            s = stat(f'{HOME}/.cl-timer/{name}')
+            entry = state.get(name)
+            if entry is None or [entry['ino'], entry['size']] != [s.st_ino, s.st_size]:
+                names.append(name)
+        return names
+
+    def load_state(self):
+        """
+        Returns {session name: {version, ino, size, count}}
+        of what the server has acknowledged
+        """
+        try:
+            with open(STATE_FILE, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def read_changes(self, name, entry):
+        """
+        Returns (splice, data, appended, inode) for session `name`.
+
+        `data` is what was read of the session file: only its new end
+        if `appended`, otherwise all of it.
+        """
+        session_file = f'{HOME}/.cl-timer/{name}'
+        with storage.locked(session_file):
+            with open(session_file, 'rb') as f:
+                s = stat(session_file)
+                if entry is not None and s.st_ino == entry['ino'] and s.st_size >= entry['size']:
+                    # solves were only added, just read the end
+                    f.seek(entry['size'])
+                    data = f.read()
+                    lines = storage.parse_lines(data.decode())
+                    splice = (entry['count'], 0, lines) if lines else None
+                    return splice, data, True, s.st_ino
+                data = f.read()
+
+        old = []
+        if entry is not None and isfile(f'{SYNC_DIR}/{name}'):
+            with open(f'{SYNC_DIR}/{name}', 'rb') as f:
+                old = storage.parse_lines(f.read().decode())
+        new = storage.parse_lines(data.decode())
+        return diff(old, new), data, False, s.st_ino
+
+    def flush(self, names):
+        """
+        Uploads changes to sessions `names` in one batch.
+        Raises OSError if the server can't be reached.
+        """
+        with storage.locked(f'{SYNC_DIR}/.sync'):
+            state = self.load_state()
+            changes = {}
+            for name in names:
+                if not catalog.is_session_file(name):
+                    continue
+                entry = state.get(name)
+                splice, data, appended, ino = self.read_changes(name, entry)
+                changes[name] = (entry, splice, data, appended, ino)
+            if not changes:
+                return
+
+            splices = []
+            for name, (entry, splice, data, appended, ino) in changes.items():
+                if splice is not None:
+                    start, delete, lines = splice
+                    splices.append({'session': name, 'base': entry['version'] if entry else 0,
+                                    'start': start, 'delete': delete, 'lines': lines})
+
+            versions = {}
+            if splices:
+                with socket.create_connection(self.address, TIMEOUT) as sock:
+                    send_message(sock, {'type': 'splices', 'client': self.client_id, 'splices': splices})
+                    for ack in recv_message(sock)['acks']:
+                        if not ack.get('conflict'):
+                            versions[ack['session']] = ack['version']
+                            continue
+                        # send the whole session instead
+                        name = ack['session']
+                        entry, splice, data, appended, ino = changes[name]
+                        if appended:
+                            with open(f'{SYNC_DIR}/{name}', 'rb') as f:
+                                data = f.read() + data
+                            changes[name] = (entry, splice, data, False, ino)
+                        send_message(sock, {'type': 'put', 'client': self.client_id, 'session': name,
+                                            'lines': storage.parse_lines(data.decode())})
+                        versions[name] = recv_message(sock)['version']
+
+            for name, (entry, splice, data, appended, ino) in changes.items():
+                version = versions.get(name, entry['version'] if entry else 0)
+                if appended:
+                    with open(f'{SYNC_DIR}/{name}', 'ab') as f:
+                        f.write(data)
+                    size = entry['size'] + len(data)
+                    count = entry['count'] + (len(splice[2]) if splice else 0)
+                else:
+                    _write(f'{SYNC_DIR}/{name}', data)
+                    size = len(data)
+                    count = len(storage.parse_lines(data.decode()))
+                state[name] = {'version': version, 'ino': ino, 'size': size, 'count': count}
+
+            _write(STATE_FILE, json.dumps(state).encode())
+        self.error = None
+        self.last_sync = time.time()
+
+
+def start():
+    """
+    Starts uploading changes in the background if sync is set up.
+    Returns the SyncClient or None.
+    """
+    config = load_config()
+    if config is None or not config.get('server'):
+        return None
+    client = SyncClient(config['server'], config['client'])
+    client.start()
+    return client
+
+
+class SyncServer(socketserver.ThreadingTCPServer):
+    """
+    Stand-in for the cloud storage server. Keeps sessions uploaded
+    by clients in `directory`, in the same format as ~/.cl-timer.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, directory):
+        super().__init__(address, SyncHandler)
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.sessions = {}  # name -> lines, read when first needed
+        try:
+            mkdir(directory)
+        except FileExistsError:
+            pass
+        try:
+            with open(f'{directory}/.versions.json', 'r') as f:
+                self.versions = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.versions = {}
+
+    def lines(self, name):
+        if name not in self.sessions:
+            try:
+                with open(f'{self.directory}/{name}', 'r') as f:
+                    self.sessions[name] = storage.parse_lines(f.read())
+            except FileNotFoundError:
+                self.sessions[name] = []
+        return self.sessions[name]
+
+    def save(self, names):
+        for name in names:
+            text = '\n'.join('\t'.join(line) for line in self.sessions[name])
+            _write(f'{self.directory}/{name}', text.encode())
+        _write(f'{self.directory}/.versions.json', json.dumps(self.versions).encode())
+
+    def apply(self, splices):
+        """
+        Returns an ack for each splice
+        """
+        acks = []
+        with self.lock:
+            changed = set()
+            for splice in splices:
+                name = splice['session']
+                lines = self.lines(name)
+                version = self.versions.get(name, 0)
+                if splice['base'] != version or splice['start'] + splice['delete'] > len(lines):
+                    acks.append({'session': name, 'conflict': True})
+                    continue
+                lines[splice['start']:splice['start'] + splice['delete']] = splice['lines']
+                self.versions[name] = version + 1
+                changed.add(name)
+                acks.append({'session': name, 'version': version + 1})
+            self.save(changed)
+        return acks
+
+    def put(self, name, lines):
+        """
+        Replaces server's copy of a session, keeping the old one
+        as .<session>.conflict-<version>. Returns the new version.
+        """
+        with self.lock:
+            version = self.versions.get(name, 0)
+            old = self.lines(name)
+            if old:
+                text = '\n'.join('\t'.join(line) for line in old)
+                _write(f'{self.directory}/.{name}.conflict-{version}', text.encode())
+            self.sessions[name] = lines
+            self.versions[name] = version + 1
+            self.save([name])
+        return version + 1
+
+
+class SyncHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        while True:
+            try:
+                message = recv_message(self.request)
+            except (ConnectionError, struct.error, zlib.error, ValueError):
+                return
+
+            if message.get('type') == 'splices':
+                splices = [s for s in message['splices'] if self.valid(s['session'])]
+                send_message(self.request, {'acks': self.server.apply(splices)})
+            elif message.get('type') == 'put' and self.valid(message['session']):
+                version = self.server.put(message['session'], message['lines'])
+                send_message(self.request, {'version': version})
+            else:
+                return
+
+    def valid(self, name):
+        return '/' not in name and not catalog.is_reserved(name)
+
+
+def serve(host, port, directory):
+    with SyncServer((host, port), directory) as server:
+        server.serve_forever()
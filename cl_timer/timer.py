@@ -1,8 +1,11 @@
+import argparse
 import curses
+import getpass
 import json
 from os import mkdir
 from os.path import isfile, dirname
 from pathlib import Path
+import shutil
 import signal
 import subprocess
 import sys
@@ -17,17 +20,29 @@ from cl_timer.art import (
     TIMER_BACKGROUND,
     TITLE_ART,
 )
+from cl_timer import archive, catalog, competition, distribution, jobs, overlay, report, storage, sync, trainer
+from cl_timer.formats import export_session, FORMATS, import_session, session_puzzle
 from cl_timer.graphics import (
     Canvas, Char, Cursor, CoverUpImage,
-    Image, InputLine, Scramble,
-    CommandInput, NumberDisplay
+    fit_to_screen, Image, InputLine, Layout,
+    Panels, Scramble, NumberDisplay
 )
 from cl_timer.interpreter import command_line
-from cl_timer.scramble import generate_scramble
+from cl_timer.jobs import Job
+from cl_timer.journal import Journal, journal_file
+from cl_timer.plot import DEFAULT_SERIES, plot_text, SERIES
+from cl_timer.profiler import profiler
+from cl_timer.ranges import RangeIndex
+from cl_timer.trace import tracer
+from cl_timer.scramble import case_token, expand, new_seed, next_index, scramble_token
+from cl_timer.stackmat import StackmatSource
+from cl_timer.stats import (
+    count_successes, get_session_mean,
+    get_worst_time, solve_average, time_value
+)
 from cl_timer.utils import (
     add_zero, ask_for_input,
-    CommandSyntaxError, display_stats,
-    display_text, ExitCommandLine,
+    CommandSyntaxError, display_text,
     ExitException, MutableString
 )
 
@@ -45,33 +60,20 @@ settings = {
 
 aliases = {}
 
+# stats go right of the timer when there is room for this many columns there,
+# and under it when there isn't
+STATS_X = 51
+STATS_WIDTH = 28
+
 char = lambda string: Char.fromstring(string)
 
 
-def convert_to_float(lst, purpose):
-    """
-    Returns list of all float-convertable values of `lst`,
-    along with length of new list
-    """
-    float_times = []
-    len_times = 0
-    for t in lst:
-        if (str(t)[:3] != 'DNF') and (t != '') and (str(t)[-1] != '+'):
-            float_times.append(float(t))
-            len_times += 1
-        elif str(t)[-1] == '+':
-            if purpose == 'average':
-                float_times.append(float(t[:-1]))
-                len_times += 1
-            elif purpose == 'single':
-                float_times.append(t)
-                len_times += 1
-    return float_times, len_times
-
-
-def mainloops(stdscr):
+def mainloops(stdscr, source=None):
     """
     Includes all mainloops for the app.
+
+    `source` is an InputSource (like a Stackmat timer) whose starts
+    and stops are taken as well as the spacebar's.
     """
     def signal_handler(sig, frame):
         """
@@ -108,22 +110,22 @@ def mainloops(stdscr):
     session_file = ""
 
     session_file = MutableString(f'{HOME}/.cl-timer/{session.string}')
-    if not isfile(session_file.string):
-        with open(session_file.string, 'w+') as f:
-            pass
-    
-    with open(session_file.string, 'r') as f:
-        time_lines = [line.split('\t') for line in f.read().split('\n')]
 
-    if [''] in time_lines:
-        time_lines.remove([''])
+    if archive.is_archived(session.string):
+        archive.restore(session.string)
 
-    for line in time_lines:
+    for line in storage.load(session_file.string):
         times.append(line[0])
         ao5s.append(line[1])
         ao12s.append(line[2])
         scrambles.append(line[3])
 
+    # stats of any range of solves, kept up to date as they change
+    range_index = RangeIndex(times, ao5s, ao12s)
+
+    # changes to the session that can be undone
+    journal = Journal(journal_file(session.string))
+
     settings_file = MutableString(f'{session_file.string}-settings.json')
     if not isfile(settings_file.string):
         with open(settings_file.string, 'w+') as f:
@@ -133,34 +135,121 @@ def mainloops(stdscr):
         for key, value in json.load(f).items():
             settings[key] = value
 
+    if 'scramble-seed' not in settings:
+        # scrambles of the session are made from it
+        settings['scramble-seed'] = new_seed()
+        with open(settings_file.string, 'w') as f:
+            json.dump(settings, f)
+
     display_text(stdscr, DISCLAIMER)
 
+    # uploads changes to the sync server in the background, if there is one
+    sync.start()
+
+    def follow_session():
+        """
+        Reads solves that other cl-timers added to the session file,
+        or all of it again if one of them rewrote it.
+        """
+        reloaded, lines = storage.read_new(session_file.string)
+        if not (reloaded or lines):
+            return
+        if reloaded:
+            for lst in [times, ao5s, ao12s, scrambles]:
+                lst.clear()
+        for line in lines:
+            times.append(line[0])
+            ao5s.append(line[1])
+            ao12s.append(line[2])
+            scrambles.append(line[3])
+        if reloaded:
+            range_index.reset(times, ao5s, ao12s)
+            # another cl-timer changed solves the journal's changes are about
+            journal.clear()
+        else:
+            for line in lines:
+                range_index.append(*line[:3])
+        update_stats()
+
     def add_time(t):
         """
         Add new solve with time of `t`
         """
+        if tracer.current is None:  # typed with `a`
+            tracer.begin('add time')
 
-        times.append(t)
+        with storage.locked(session_file.string):
+            # averages have to include solves other cl-timers added
+            with tracer.span('follow session'):
+                follow_session()
+            times.append(t)
 
-        # update number display to show real time
-        number_display.time = t
-        number_display.update()
+            # update number display to show real time
+            number_display.time = t
+            number_display.update()
 
-        # generate new scramble and update scramble_image
-        new_scramble = generate_scramble(int(settings['puzzle']),
-                                    int(settings['scramble-length']))
-        scrambles.append(new_scramble)
-        scramble_image.clear()
-        scramble_image.chars = char(new_scramble)
+            # the solve was of the scramble that was shown
+            scrambles.append(current_scramble.string)
+            trainer.record(session.string, current_scramble.string, None, time_value(t))
+            with tracer.span('generate scramble'):
+                new_scramble()
+
+            with tracer.span('averages'):
+                ao5 = calculate_average(len(times), 5)
+                ao5s.append(ao5)
+                ao12 = calculate_average(len(times), 12)
+                ao12s.append(ao12)
+                new_records = range_index.append(t, ao5, ao12)
+
+            with tracer.span('append'):
+                line = [add_zero(t), ao5, ao12, scrambles[-1]]
+                storage.append(session_file.string, [line])
+                journal.record({'op': 'add', 'solve': len(times), 'line': line})
+
+        # drills of a trainer aren't results of its puzzle
+        if competition.client is not None and not settings.get('trainer'):
+            competition.client.submit(add_zero(t), settings['puzzle'], len(times))
+        if overlay.server is not None:
+            overlay.server.publish('solve', {'solve': len(times), 'time': add_zero(t), 'ao5': ao5, 'ao12': ao12})
+
+        with tracer.span('update stats'):
+            update_stats()
+
+        if new_records:
+            values = {'single': add_zero(t), 'ao5': ao5, 'ao12': ao12}
+            pb_image.chars = char('New PB! ' + '  '.join(f'{kind} {values[kind]}' for kind in new_records))
+        
+    # (session, seed) -> (solves looked at, index after the highest of the seed)
+    token_indices = {}
 
-        ao5, ao12 = update_stats()
+    def new_scramble():
+        """
+        Shows the next scramble of the session's seed, the one after the
+        highest of it in the session so none are repeated, or of the next
+        case to drill if the puzzle is a trainer
+        """
+        # until a trainer's cases have been found, the scrambles are the seed's
+        if settings.get('trainer') and trainer.ready(settings['trainer']):
+            case, moves = trainer.get(settings['trainer'], session.string).draw()
+            current_scramble.string = case_token(settings['trainer'], case, moves)
+            scramble_image.clear()
+            scramble_image.chars = char(moves)
+            return
+
+        # only the solves added since the last scramble are looked at. If
+        # solves were removed, all of them are, but the index never goes
+        # back, so a removed solve's scramble isn't shown again.
+        seed = settings['scramble-seed']
+        looked_at, index = token_indices.get((session.string, seed), (0, 0))
+        if looked_at > len(scrambles):
+            looked_at = 0
+        index = next_index(scrambles, seed, looked_at, index)
+        token_indices[(session.string, seed)] = (len(scrambles), index)
+        current_scramble.string = scramble_token(settings['scramble-seed'], int(settings['puzzle']),
+                                                 int(settings['scramble-length']), index)
+        scramble_image.clear()
+        scramble_image.chars = char(expand(current_scramble.string))
 
-        with open(session_file.string, 'a') as f:
-            if len(times) == 1:
-                f.write(f'{add_zero(t)}\t{ao5}\t{ao12}\t{new_scramble}')
-            else:
-                f.write(f'\n{add_zero(t)}\t{ao5}\t{ao12}\t{new_scramble}')
-        
     def calculate_average(solve, length):
         """
         Returns average of `length` during `solve`
@@ -168,117 +257,119 @@ def mainloops(stdscr):
         Looks through times list and finds last `length` solves before `solve`
         Excludes best and worst times, and returns average of the rest.
         """
-        if len(times[:solve]) < length:
-            # `length` solves haven't been done yet.
-            return ''
-        else:
-            latest_average = times[solve - length:]  # list of last `length` solves
-            latest_average, _ = convert_to_float(latest_average, "average")
-            if len(latest_average) < (length - 1):
-                return 'DNF'
-            if len(latest_average) == length:
-                latest_average.remove(max(latest_average))
-            latest_average.remove(min(latest_average))
-
-            # calculate average and add zero if it doesn't go to 100ths place.
-            
-            return add_zero(round(sum(latest_average) / len(latest_average), 2))
-
-    def get_session_mean():
-        """
-        Returns mean of all solves in session
-        """
-        try:
-            float_times, len_times = convert_to_float(times, 'average')
-            return add_zero(round(sum(float_times) / len_times, 2))
-        except ZeroDivisionError:
-            return ""
+        return solve_average(times, solve, length)
 
-    def get_best_average(length):
+    def best(column, kind):
         """
-        Returns best average of `length` in session
+        Best of `column` of the session, which is its latest personal best of `kind`
         """
-        try:
-            if length == 5:
-                best = add_zero(min([i for i in ao5s if i != '']))
-            elif length == 12:
-                best = add_zero(min([i for i in ao12s if i != '']))
-        except ValueError:
-            return ""
-        return best
-
-    def get_best_time():
-        try:
-            converted_times, _ = convert_to_float(times, 'single')
-            float_times = [float(t[:-1]) if isinstance(t, str) else t for t in converted_times]
-            best = converted_times[float_times.index(min(float_times))]
-            if isinstance(best, float):
-                return add_zero(best)
-        except ValueError as e:
-            return ""
-        return best
-
-    def get_worst_time():
-        try:
-            converted_times, _ = convert_to_float(times, 'single')
-            float_times = [float(t[:-1]) if isinstance(t, str) else t for t in converted_times]
-            worst = converted_times[float_times.index(max(float_times))]
-            if isinstance(worst, float):
-                return add_zero(worst)
-        except ValueError as e:
-            return ""
-        return worst
+        record = range_index.records.best(kind)
+        return add_zero(column[record[0] - 1]) if record is not None else ''
 
     def update_stats():
-        ao5 = calculate_average(len(times), 5)
-        ao5s.append(ao5)
+        """
+        Shows stats of the session after its times have changed,
+        and records them in the session catalog.
+        """
+        ao5 = ao5s[-1] if ao5s else ''
         ao5_image.chars = char(f'AO5: {ao5}')
-        ao12 = calculate_average(len(times), 12)
-        ao12s.append(ao12)
+        ao12 = ao12s[-1] if ao12s else ''
         ao12_image.chars = char(f'AO12: {ao12}')
-        best_ao5 = get_best_average(5)
+        best_ao5 = best(ao5s, 'ao5')
         best_ao5_image.chars = char(f'Best AO5: {best_ao5}')
-        best_ao12 = get_best_average(12)
+        best_ao12 = best(ao12s, 'ao12')
         best_ao12_image.chars = char(f'Best AO12: {best_ao12}')
-        best_time = get_best_time()
+        best_time = best(times, 'single')
         best_time_image.chars = char(f'Best time: {best_time}')
-        worst_time = get_worst_time()
+        worst_time = get_worst_time(times)
         worst_time_image.chars = char(f'Worst time: {worst_time}')
 
-        len_successes = 0
-        for t in times:
-            if not ((isinstance(t, str)) and (t[:3] == 'DNF')):
-                len_successes += 1
-
+        len_successes = count_successes(times)
         number_of_times_image.chars = char(f'Number of Times: {len_successes}/{len(times)}')
-        session_mean = get_session_mean()
+        session_mean = get_session_mean(times)
         session_mean_image.chars = char(f'Session Mean: {session_mean}')
-
-        return ao5, ao12
+        # only the solves added since the last update are added to the sketch
+        median = distribution.update(session_file.string, times).percentiles()['median']
+        median_image.chars = char(f'Median: {distribution.format_value(median)}')
+
+        catalog.update_entry(session.string, len(times), len_successes, settings['puzzle'],
+                             best_time, best_ao5, best_ao12, session_mean)
+
+        if overlay.server is not None:
+            overlay.server.publish('stats', {
+                'session': session.string, 'puzzle': settings['puzzle'], 'solves': len(times),
+                'ao5': ao5, 'ao12': ao12, 'best': best_time, 'best_ao5': best_ao5,
+                'best_ao12': best_ao12, 'mean': session_mean
+            })
                 
-    session_name_image = Image(canvas, 0, 0, char(session.string))
-    scramble_image = Scramble(canvas, 0, 2, char(
-        generate_scramble(int(settings['puzzle']),
-        int(settings['scramble-length']))))
+    layout = Layout(canvas)
+
+    def stats_place(i):
+        """
+        Place of the `i`th line of stats
+        """
+        def place(width, height):
+            if width >= STATS_X + STATS_WIDTH:
+                return STATS_X, 6 + i
+            return 0, 14 + i
+        return place
+
+    session_name_image = layout.add(Image(canvas, 0, 0, char(session.string)), lambda width, height: (0, 0))
+    # token of the scramble that is shown, which is stored with the next solve
+    current_scramble = MutableString('')
+    scramble_image = layout.add(Scramble(canvas, 0, 0, char('')), lambda width, height: (0, 2))
+    new_scramble()
     scramble_image.render()
 
-    number_display = NumberDisplay(canvas, 15, 7)
-    timer_background = Image(canvas, 0, 5, char(TIMER_BACKGROUND))
-
-    ao5_image = CoverUpImage(canvas, 51, 6, char(f'AO5: {calculate_average(len(times), 5)}'))
-    ao12_image = CoverUpImage(canvas, 51, 7, char(f'AO12: {calculate_average(len(times), 12)}'))
-    best_ao5_image = CoverUpImage(canvas, 51, 8, char(f'Best AO5: {get_best_average(5)}'))
-    best_ao12_image = CoverUpImage(canvas, 51, 9, char(f'Best AO12: {get_best_average(12)}'))
-    best_time_image = CoverUpImage(canvas, 51, 10, char(f'Best time: {get_best_time()}'))
-    worst_time_image = CoverUpImage(canvas, 51, 11, char(f'Worst time: {get_worst_time()}'))
-
-    len_successes = 0
-    for t in times:
-        if not ((isinstance(t, str)) and (t[:3] == 'DNF')):
-            len_successes += 1
-    number_of_times_image = CoverUpImage(canvas, 51, 12, char(f'Number of Times: {len_successes}/{len(times)}'))
-    
-    session_mean_image = CoverUpImage(canvas, 51, 13, char(f'Session Mean: {get_session_mean()}'))
+    number_display = layout.add(NumberDisplay(canvas, 0, 0), lambda width, height: (15, 7))
+    timer_background = layout.add(Image(canvas, 0, 0, char(TIMER_BACKGROUND)), lambda width, height: (0, 5))
+
+    ao5_image = layout.add(CoverUpImage(canvas, 0, 0, char(f'AO5: {calculate_average(len(times), 5)}')),
+                           stats_place(0))
+    ao12_image = layout.add(CoverUpImage(canvas, 0, 0, char(f'AO12: {calculate_average(len(times), 12)}')),
+                            stats_place(1))
+    best_ao5_image = layout.add(CoverUpImage(canvas, 0, 0, char(f'Best AO5: {best(ao5s, "ao5")}')),
+                                stats_place(2))
+    best_ao12_image = layout.add(CoverUpImage(canvas, 0, 0, char(f'Best AO12: {best(ao12s, "ao12")}')),
+                                 stats_place(3))
+    best_time_image = layout.add(CoverUpImage(canvas, 0, 0, char(f'Best time: {best(times, "single")}')),
+                                 stats_place(4))
+    worst_time_image = layout.add(CoverUpImage(canvas, 0, 0, char(f'Worst time: {get_worst_time(times)}')),
+                                  stats_place(5))
+
+    len_successes = count_successes(times)
+    number_of_times_image = layout.add(
+        CoverUpImage(canvas, 0, 0, char(f'Number of Times: {len_successes}/{len(times)}')), stats_place(6))
+
+    session_mean_image = layout.add(CoverUpImage(canvas, 0, 0, char(f'Session Mean: {get_session_mean(times)}')),
+                                    stats_place(7))
+    median = distribution.update(session_file.string, times).percentiles()['median']
+    median_image = layout.add(CoverUpImage(canvas, 0, 0, char(f'Median: {distribution.format_value(median)}')),
+                              stats_place(8))
+
+    # says so when a solve was a personal best, until the next one starts
+    pb_image = layout.add(CoverUpImage(canvas, 0, 0, char('')), lambda width, height: (0, 13))
+
+    # progress of the background job, or how it went
+    status_image = layout.add(CoverUpImage(canvas, 0, 0, char('')), lambda width, height: (0, height - 1))
+
+    def stats_panel(width, height):
+        if width >= STATS_X + STATS_WIDTH:
+            return STATS_X, 5, width - STATS_X, height - 6
+        return 0, 14, width, height - 15
+
+    def timer_panel(width, height):
+        if width >= STATS_X + STATS_WIDTH:
+            return 0, 5, STATS_X, height - 6
+        return 0, 5, width, 9
+
+    # parts of the screen that are only written when they change
+    panels = Panels(stdscr, canvas)
+    panels.add('session name', lambda width, height: (0, 0, width, 2))
+    panels.add('scramble', lambda width, height: (0, 2, width, 3))
+    panels.add('timer', timer_panel)
+    panels.add('stats', stats_panel)
+    panels.add('command line', lambda width, height: (0, height - 1, width, 1))
 
     if isfile(f'{HOME}/.cl-timer_rc'):
         with open(f'{HOME}/.cl-timer_rc', 'r') as f:
@@ -288,13 +379,20 @@ def mainloops(stdscr):
         for command in rc_commands:
             try:
                 command_line(canvas, stdscr, settings, scramble_image, settings_file, session_file, times, ao5s, ao12s,
-                            scrambles, session, session_name_image, update_stats, add_time, calculate_average, aliases,
-                            True, command)
+                            scrambles, session, session_name_image, update_stats, add_time, calculate_average,
+                            follow_session, new_scramble, range_index, journal, aliases, True, command)
             except CommandSyntaxError:
                 pass
     else:
         with open(f'{HOME}/.cl-timer_rc', 'w+') as f:
             pass
+
+    if settings.get('trainer') and not trainer.ready(settings['trainer']):
+        # finding the cases of the session's trainer takes a while, so
+        # it is done in the background, and new_scramble drills them once they are found
+        name = settings['trainer']
+        jobs.start(Job(f'finding {name} cases', lambda job: trainer.case_table(name, job.progress),
+                       lambda table: new_scramble()))
     
     ao5_image.render()
     ao12_image.render()
@@ -304,13 +402,21 @@ def mainloops(stdscr):
     worst_time_image.render()
     number_of_times_image.render()
     session_mean_image.render()
+    median_image.render()
 
     timer_running = False
     delay = 0  # how far behind the program is
     spacebar_pressed = False
     last_25_keys = [-1 for _ in range(25)]
 
+    # notices when another cl-timer writes to the session
+    watcher = storage.Watcher(f'{HOME}/.cl-timer')
+
+    status_shown = False  # whether status line is showing something
+    status_finished = False  # whether it says how a job went, until the next key
+
     solve_start_time = 0
+    space_seen = None  # when the spacebar was last seen, for the trace
     frame = 0
     while True:
 
@@ -319,19 +425,62 @@ def mainloops(stdscr):
 
         key = stdscr.getch()
 
+        if key == 410:  # terminal was resized
+            # only the images that moved or were cut off are drawn again
+            fit_to_screen(stdscr, canvas)
+
+        if key == 27:  # escape
+            jobs.cancel()
+
+        status, finished = jobs.poll()
+        if status is not None:
+            status_image.chars = char(status)
+            status_shown = True
+            status_finished = finished
+        elif status_shown and key != -1 and status_finished:
+            status_image.chars = char('')
+            status_shown = status_finished = False
+
         if key == 58:  # :
             try:
                 command_line(canvas, stdscr, settings, scramble_image,
                              settings_file, session_file, times, ao5s,
                              ao12s, scrambles, session, session_name_image,
-                             update_stats, add_time, calculate_average, aliases)
+                             update_stats, add_time, calculate_average,
+                             follow_session, new_scramble, range_index, journal, aliases)
             except CommandSyntaxError:
                 pass
+            # commands can show things over the panels
+            panels.invalidate()
             continue
 
+        if source is not None:
+            # at most a frame after the thread read it
+            for event in source.poll():
+                if event.kind == 'start' and not timer_running:
+                    timer_running = True
+                    spacebar_pressed = False
+                    solve_start_time = time.time() - event.time
+                    number_display.reset()
+                    if pb_image.chars:
+                        pb_image.chars = char('')
+                    tracer.begin('stackmat started', event.at)
+                elif event.kind == 'stop' and timer_running:
+                    tracer.mark('stackmat stopped', event.at)
+                    frame = 0
+                    timer_running = False
+                    add_time(event.time)
+            if source.error is not None:  # unplugged
+                status_image.chars = char(f'stackmat stopped working: {source.error.strerror}')
+                status_shown = status_finished = True
+                source = None
+
         if not timer_running:
             if key == 32:
                 solve_start_time = time.time()
+                space_seen = tracer.now()
+            elif watcher.check(session_file.string):
+                follow_session()
         last_25_keys.append(key)
         last_25_keys.pop(0)
 
@@ -346,6 +495,10 @@ def mainloops(stdscr):
 
                     timer_running = True
                     number_display.reset()
+                    if pb_image.chars:
+                        pb_image.chars = char('')
+                    tracer.begin('space released', space_seen)
+                    tracer.mark('timer started')
 
             else:
                 if key == 32:  # spacebar
@@ -353,6 +506,7 @@ def mainloops(stdscr):
 
         else:
             if key == 32:
+                tracer.mark('stop key')
                 frame = 0
                 timer_running = False
 
@@ -366,9 +520,10 @@ def mainloops(stdscr):
         timer_background.render()
         number_display.render()
 
-        stdscr.clear()
-        stdscr.addstr(canvas.display)
-        stdscr.refresh()
+        panels.refresh()
+
+        if tracer.current is not None and not timer_running:
+            tracer.end('frame shown')
 
         if timer_running:
             number_display.time = time.time() - solve_start_time
@@ -385,11 +540,240 @@ def mainloops(stdscr):
         
         frame += 1
 
+def show_leaderboard(stdscr, server, event):
+    """
+    Shows rankings of `event` at a competition as they change, until interrupted
+    """
+    for board in competition.watch(server, event):
+        lines, cols = stdscr.getmaxyx()
+        text = competition.format_leaderboard(board, cols - 1).split('\n')[:lines - 1]
+        stdscr.clear()
+        stdscr.addstr('\n'.join(line[:cols - 1] for line in text))
+        stdscr.refresh()
+
+
 def main():
+    parser = argparse.ArgumentParser(prog='cl-timer', description='A Cubing Timer for the Terminal')
+    parser.add_argument('--profile', action='store_true',
+                        help='profile the timer and write the profile to ~/.cl-timer/.profiles when it quits')
+    parser.add_argument('--stackmat', metavar='DEVICE',
+                        help='also time solves with a Stackmat timer plugged in at DEVICE (like /dev/ttyUSB0)')
+    parser.add_argument('--compete', metavar='SERVER',
+                        help=f'send solves to the competition server at HOST[:PORT] (default port: {competition.DEFAULT_PORT})')
+    parser.add_argument('--competitor', default=getpass.getuser(),
+                        help='name to compete under (default: your user name)')
+    parser.add_argument('--overlay', nargs='?', type=int, const=overlay.DEFAULT_PORT, metavar='PORT',
+                        help='serve the latest solve and stats on http://localhost:PORT for stream overlays '
+                             f'(default port: {overlay.DEFAULT_PORT})')
+    subparsers = parser.add_subparsers(dest='command')
+
+    import_parser = subparsers.add_parser('import', help='add solves from another timer to a session')
+    import_parser.add_argument('format', choices=FORMATS)
+    import_parser.add_argument('file')
+    import_parser.add_argument('session')
+    import_parser.add_argument('--cstimer-session', default='1',
+                               help='number of the csTimer session to import (default: 1)')
+
+    export_parser = subparsers.add_parser('export', help='write the solves of a session for another timer')
+    export_parser.add_argument('format', choices=FORMATS)
+    export_parser.add_argument('session')
+    export_parser.add_argument('file')
+
+    plot_parser = subparsers.add_parser('plot', help='print a chart of the times of a session')
+    plot_parser.add_argument('session')
+    plot_parser.add_argument('series', nargs='*',
+                             help=f'what to plot, out of {", ".join(SERIES)} (default: {" ".join(DEFAULT_SERIES)})')
+    plot_parser.add_argument('--last', type=int, help='only plot the last LAST solves')
+
+    dist_parser = subparsers.add_parser('dist', help='print percentiles and a histogram of the times of sessions')
+    dist_parser.add_argument('sessions', nargs='*', help='sessions whose times to put together')
+    dist_parser.add_argument('--all', action='store_true', help='use every session')
+
+    report_parser = subparsers.add_parser('report', help='print stats of every session put together, by puzzle')
+    report_parser.add_argument('--jobs', type=int, help='number of processes to read sessions with (default: one per core)')
+
+    archive_parser = subparsers.add_parser(
+        'archive', help='pack sessions into compressed archives, or read solves from an archived session')
+    archive_parser.add_argument('sessions', nargs='+')
+    archive_parser.add_argument('--solve', type=int, help='print solve number SOLVE of an archived session')
+    archive_parser.add_argument('--between', nargs=2, type=float, metavar=('LOW', 'HIGH'),
+                                help='print the solves of an archived session with times from LOW to HIGH')
+
+    sync_parser = subparsers.add_parser('sync', help='upload changes to all sessions to the sync server')
+    sync_parser.add_argument('server', nargs='?',
+                             help=f'HOST[:PORT] of the server to sync with from now on (default port: {sync.DEFAULT_PORT})')
+    sync_parser.add_argument('--off', action='store_true', help='stop syncing')
+
+    competition_parser = subparsers.add_parser('competition-server',
+                                               help='collect the solves of the cl-timers at a competition')
+    competition_parser.add_argument('--host', default='0.0.0.0')
+    competition_parser.add_argument('--port', type=int, default=competition.DEFAULT_PORT)
+
+    leaderboard_parser = subparsers.add_parser('leaderboard', help="show a competition's live rankings")
+    leaderboard_parser.add_argument('server', help='HOST[:PORT] of the competition server')
+    leaderboard_parser.add_argument('--event', default='3', help='puzzle whose rankings to show (default: 3)')
+
+    server_parser = subparsers.add_parser('sync-server', help='run a local sync server')
+    server_parser.add_argument('--host', default='127.0.0.1')
+    server_parser.add_argument('--port', type=int, default=sync.DEFAULT_PORT)
+    server_parser.add_argument('--dir', default=f'{HOME}/.cl-timer-server',
+                               help='where to keep uploaded sessions (default: ~/.cl-timer-server)')
+
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        if catalog.is_reserved(args.session):
+            parser.error(f'invalid session name: {args.session}')
+        if archive.is_archived(args.session):
+            # so the averages of the imported solves include the archived ones
+            archive.restore(args.session)
+        count, invalid = import_session(args.format, args.file, args.session, args.cstimer_session)
+        print(f'imported {count} solves into {args.session}')
+        if invalid:
+            puzzle = session_puzzle(args.session)
+            print(f'scrambles of {invalid} of them are not for a {puzzle}x{puzzle}')
+        return
+    elif args.command == 'export':
+        if not catalog.is_session_file(args.session):
+            parser.error(f'no such session: {args.session}')
+        count = export_session(args.format, args.session, args.file)
+        print(f'exported {count} solves to {args.file}')
+        return
+    elif args.command == 'plot':
+        if not catalog.is_session_file(args.session):
+            parser.error(f'no such session: {args.session}')
+        for name in args.series:
+            if name not in SERIES:
+                parser.error(f'invalid series: {name} (use {", ".join(SERIES)})')
+        lines = storage.load(f'{HOME}/.cl-timer/{args.session}')
+        columns = [[line[i] for line in lines] for i in range(3)]
+        cols, rows = shutil.get_terminal_size()
+        print(plot_text(*columns, cols - 1, rows - 2, args.series or DEFAULT_SERIES, args.last))
+        return
+    elif args.command == 'dist':
+        if args.all:
+            names = list(catalog.refresh().keys())
+        elif args.sessions:
+            names = args.sessions
+        else:
+            parser.error('give the sessions to use, or --all')
+        for name in names:
+            if not (catalog.is_session_file(name) or archive.is_archived(name)):
+                parser.error(f'no such session: {name}')
+        cols, rows = shutil.get_terminal_size()
+        title = 'all sessions' if args.all else ', '.join(names)
+        print(distribution.panel(distribution.combined_distribution(names), title, cols - 1, rows - 8))
+        return
+    elif args.command == 'report':
+        cols, rows = shutil.get_terminal_size()
+        print(report.report_text(report.collect(report.session_names(), args.jobs), cols - 1))
+        return
+    elif args.command == 'archive':
+        if args.solve is not None or args.between is not None:
+            if len(args.sessions) != 1:
+                parser.error('give one session to read from')
+            name = args.sessions[0]
+            if not archive.is_archived(name):
+                parser.error(f'{name} is not archived')
+            session_archive = archive.Archive(archive.archive_file(name))
+            if args.solve is not None:
+                try:
+                    solves = [(args.solve, session_archive.solve(args.solve))]
+                except IndexError as e:
+                    parser.error(str(e))
+            else:
+                solves = session_archive.between(*args.between)
+            for number, line in solves:
+                print('\t'.join([str(number)] + line))
+            return
+        for name in args.sessions:
+            if not catalog.is_session_file(name):
+                parser.error(f'no such session: {name}')
+        for name in args.sessions:
+            size, archive_size = archive.archive_session(name, catalog.scan_session(name))
+            print(f'archived {name}: {size / 1e3:.0f} KB -> {archive_size / 1e3:.0f} KB')
+        return
+    elif args.command == 'sync':
+        if args.off:
+            sync.save_config(None)
+            print('sync is off')
+            return
+        if args.server:
+            sync.save_config(args.server)
+        config = sync.load_config()
+        if config is None or not config.get('server'):
+            parser.error('no sync server set up, give one as an argument')
+        client = sync.SyncClient(config['server'], config['client'])
+        names = client.changed_sessions()
+        try:
+            client.flush(names)
+        except (OSError, ValueError) as e:
+            parser.exit(1, f'could not sync with {config["server"]}: {e}\n')
+        print(f'synced {len(names)} sessions with {config["server"]}')
+        return
+    elif args.command == 'sync-server':
+        print(f'serving on {args.host}:{args.port}, keeping sessions in {args.dir}')
+        try:
+            sync.serve(args.host, args.port, args.dir)
+        except KeyboardInterrupt:
+            pass
+        return
+
+    elif args.command == 'competition-server':
+        print(f'competition server on {args.host}:{args.port}')
+        try:
+            competition.serve(args.host, args.port)
+        except KeyboardInterrupt:
+            pass
+        return
+    elif args.command == 'leaderboard':
+        try:
+            curses.wrapper(show_leaderboard, args.server, args.event)
+        except KeyboardInterrupt:
+            pass
+        except OSError as e:
+            parser.error(f'could not reach {args.server}: {e}')
+        return
+
+    if args.compete:
+        competition.client = competition.CompetitionClient(args.compete, args.competitor)
+
+    if args.overlay is not None:
+        try:
+            overlay.server = overlay.OverlayServer(port=args.overlay)
+        except OSError as e:
+            parser.error(f'could not serve the overlay on port {args.overlay}: {e}')
+
+    source = None
+    if args.stackmat:
+        try:
+            source = StackmatSource(args.stackmat).start()
+        except OSError as e:
+            parser.error(f'could not open {args.stackmat}: {e.strerror}')
+
+    if args.profile:
+        profiler.start()
+
     try:
-        curses.wrapper(mainloops)
+        curses.wrapper(mainloops, source)
     except ExitException:
         subprocess.call(['clear'])
+    finally:
+        # don't leave half-written files behind
+        jobs.cancel()
+        jobs.wait(1)
+        if source is not None:
+            source.close()
+        if competition.client is not None:
+            competition.client.stop()
+        if overlay.server is not None:
+            overlay.server.stop()
+
+    if args.profile:
+        path = profiler.dump()
+        if path is not None:
+            print(profiler.summary())
+            print(f'profile written to {path}')
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,129 @@
+from collections import deque
+from contextlib import contextmanager
+import json
+from statistics import median
+import time
+
+# how many solves are kept
+MAX_SOLVES = 200
+
+# stages where the timer was stopped, by the keyboard or a Stackmat
+STOP_STAGES = ['stop key', 'stackmat stopped']
+
+
+class Tracer:
+    """
+    Records when each stage of a solve happened, from the spacebar being let go
+    to the frame that shows the time, for the last MAX_SOLVES solves.
+
+    A solve is a list of (stage, start, end) with times from time.perf_counter,
+    which is monotonic. Stages that are a single moment have start == end.
+    Nothing is recorded between solves, so frames don't pay for it.
+    """
+
+    def __init__(self, size=MAX_SOLVES):
+        self.solves = deque(maxlen=size)
+        self.current = None
+
+    def now(self):
+        return time.perf_counter()
+
+    def begin(self, stage, at=None):
+        """
+        Starts the trace of a new solve with `stage`,
+        which happened at `at` (default now)
+        """
+        if self.current:
+            self.solves.append(self.current)
+        self.current = []
+        self.mark(stage, at)
+
+    def mark(self, stage, at=None):
+        if self.current is not None:
+            at = self.now() if at is None else at
+            self.current.append((stage, at, at))
+
+    @contextmanager
+    def span(self, stage):
+        """
+        Records how long the with block takes as `stage`
+        """
+        if self.current is None:
+            yield
+            return
+        start = self.now()
+        try:
+            yield
+        finally:
+            self.current.append((stage, start, self.now()))
+
+    def end(self, stage):
+        """
+        Marks `stage` and finishes the trace of the solve
+        """
+        if self.current is None:
+            return
+        self.mark(stage)
+        self.solves.append(self.current)
+        self.current = None
+
+    def summary(self):
+        """
+        Returns table of how long each stage took over the traced solves.
+
+        For spans it is how long they took, for single moments it is
+        the time since the stage before it ended.
+        """
+        if not self.solves:
+            return 'no solves were traced'
+        durations = {}  # stage -> list of seconds, in order of first appearance
+        totals = []
+        for solve in self.solves:
+            previous_end = None
+            stopped = None
+            for stage, start, end in solve:
+                if start == end:
+                    if previous_end is not None:
+                        durations.setdefault(stage, []).append(start - previous_end)
+                else:
+                    durations.setdefault(stage, []).append(end - start)
+                if stage in STOP_STAGES:
+                    stopped = start
+                previous_end = end
+            if stopped is not None and solve[-1][0] == 'frame shown':
+                totals.append(solve[-1][2] - stopped)
+
+        lines = [f"{'stage':<20}{'median ms':>11}{'max ms':>11}"]
+        for stage, seconds in durations.items():
+            lines.append(f'{stage:<20}{median(seconds) * 1000:>11.2f}{max(seconds) * 1000:>11.2f}')
+        if totals:
+            lines.append(f"\n{'stop to frame':<20}{median(totals) * 1000:>11.2f}{max(totals) * 1000:>11.2f}")
+        lines.append(f'\n{len(self.solves)} solves')
+        return '\n'.join(lines)
+
+    def chrome_trace(self):
+        """
+        Returns traced solves in the Chrome trace-event format,
+        which chrome://tracing and Perfetto can show
+        """
+        events = []
+        for i, solve in enumerate(self.solves):
+            first, last = solve[0][1], solve[-1][2]
+            events.append({'name': f'solve {i + 1}', 'ph': 'X', 'pid': 1, 'tid': 1,
+                           'ts': first * 1e6, 'dur': (last - first) * 1e6})
+            for stage, start, end in solve:
+                event = {'name': stage, 'pid': 1, 'tid': 1, 'ts': start * 1e6}
+                if start == end:
+                    event.update({'ph': 'i', 's': 't'})
+                else:
+                    event.update({'ph': 'X', 'dur': (end - start) * 1e6})
+                events.append(event)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def export(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome_trace(), f)
+
+
+# trace of the solves of the running timer
+tracer = Tracer()
@@ -0,0 +1,343 @@
+import json
+from os import makedirs, remove, replace
+from os.path import basename, dirname, isfile
+from pathlib import Path
+import random
+import sys
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.append(OUTER_PACKAGE_DIR)
+
+from cl_timer.cube import _move, AMOUNTS, Cube
+from cl_timer.scramble import parse_case_token
+from cl_timer.utils import add_zero
+
+HOME = str(Path.home())
+
+SUFFIX = '-cases.json'
+
+TABLE_DIR = f'{HOME}/.cl-timer/.trainer'
+
+# setups kept of each case, out of all the states it can be seen in
+MAX_SETUPS = 64
+
+# a case that took twice as long as the average comes up 2 ** SLOW_BIAS times as often
+SLOW_BIAS = 2
+
+# how much more often a case that hasn't been solved yet comes up
+UNSEEN_WEIGHT = 2
+
+# algorithms that keep the first two layers solved. Every state of the
+# last layer is some of them (and their inverses) one after another.
+ALGORITHMS = [
+    'U',
+    "R U R' U R U2 R'",  # Sune
+    "R U R' U' R' F R2 U' R' U' R U R' F'",  # T perm
+    "F R U R' U' F'",
+    "F R' F' R U R U' R'",
+]
+
+
+class Cases:
+    """
+    How to find the cases of a trainer: the puzzle, and what is left of
+    a state when only what tells its case apart is kept
+    """
+
+    def __init__(self, size, recognize, include=lambda colors: True):
+        self.size = size
+        # colors of a state -> what its case is recognized by
+        self.recognize = recognize
+        # whether a state (by its colors) is one of the trainer's
+        self.include = include
+
+
+# whether each color is the color of U
+ORIENTATION = bytes([1] + [0] * 255)
+
+TRAINERS = {
+    'oll': Cases(3, lambda colors: colors.translate(ORIENTATION)),
+    'pll': Cases(3, lambda colors: colors, lambda colors: colors[:9] == bytes(9)),
+    '2x2-cll': Cases(2, lambda colors: colors),
+}
+
+IDENTITY = bytes(range(256))
+
+
+def inverse(alg):
+    moves = []
+    for move in reversed(alg.split()):
+        if move.endswith("'"):
+            moves.append(move[:-1])
+        elif move.endswith('2'):
+            moves.append(move)
+        else:
+            moves.append(move + "'")
+    return ' '.join(moves)
+
+
+def simplify(moves):
+    """
+    Returns `moves` with turns of the same face next to each other put together
+    """
+    stack = []  # [face, quarter turns]
+    for move in moves:
+        face, turns = move.rstrip("'2"), AMOUNTS[move[len(move.rstrip("'2")):]]
+        if stack and stack[-1][0] == face:
+            stack[-1][1] = (stack[-1][1] + turns) % 4
+            if not stack[-1][1]:
+                stack.pop()
+        else:
+            stack.append([face, turns])
+    return ' '.join(face + ['', '', '2', "'"][turns] for face, turns in stack)
+
+
+def permutation(alg, n):
+    """
+    Returns which facelet each facelet of an `n`x`n` cube comes from after `alg`,
+    as a translation table like the ones of cube.move_permutation
+    """
+    table = IDENTITY
+    for move in alg.split():
+        table = _move(move, n)(table)
+    return table
+
+
+def generate_cases(name, progress=None):
+    """
+    Returns the setups of each case of trainer `name`, as lists of scrambles.
+    `progress` is called every now and then with the fraction of the states
+    put into cases so far (0 while they are still being found).
+
+    Every state of the last layer is found with a breadth first search
+    from the solved cube, whose steps are ALGORITHMS, so the scramble of a
+    state is the shortest list of them that makes it. The states are then
+    put together into cases: two states are the same case when one is the
+    other with U turns before and after it, and look the same once
+    `recognize` is done to their colors.
+    """
+    cases = TRAINERS[name]
+    n = cases.size
+    steps = [(alg, permutation(alg, n)) for alg in ALGORITHMS + [inverse(alg) for alg in ALGORITHMS]]
+    solved = Cube(n).facelets.ljust(256, b'\0')
+    size = 6 * n * n
+
+    # "a then b" of two permutations is b.translate(a)
+    words = {IDENTITY: ()}
+    frontier = [IDENTITY]
+    while frontier:
+        if progress is not None:
+            progress(0)
+        new = []
+        for state in frontier:
+            for alg, step in steps:
+                next_state = step.translate(state)
+                if next_state not in words:
+                    words[next_state] = words[state] + (alg,)
+                    new.append(next_state)
+        frontier = new
+
+    turns = [permutation('U ' * i, n) for i in range(4)]
+    by_key = {}
+    for i, (state, word) in enumerate(words.items()):
+        if progress is not None and i % 4096 == 0:
+            progress(i / len(words))
+        if not cases.include(state.translate(solved)[:size]):
+            continue
+        key = min(cases.recognize(after.translate(state.translate(before)).translate(solved)[:size])
+                  for before in turns for after in turns)
+        by_key.setdefault(key, []).append(word)
+
+    # the case the solved cube is in has nothing to drill
+    solved_key = cases.recognize(solved[:size])
+    rng = random.Random(0)
+    table = []
+    for key, setups in by_key.items():
+        if key == solved_key:
+            continue
+        if len(setups) > MAX_SETUPS:
+            setups = rng.sample(setups, MAX_SETUPS)
+        table.append([simplify(' '.join(word).split()) for word in setups])
+    return table
+
+
+def table_file(name):
+    return f'{TABLE_DIR}/{name}.json'
+
+
+def ready(name):
+    """
+    Whether the cases of trainer `name` have been found, so that
+    using it doesn't have to wait for generate_cases
+    """
+    return isfile(table_file(name))
+
+
+def case_table(name, progress=None):
+    """
+    Returns the setups of each case of trainer `name`, which are
+    generated the first time and read from ~/.cl-timer/.trainer after that.
+    `progress` is passed on to generate_cases.
+    """
+    path = table_file(name)
+    if isfile(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except ValueError:
+            pass  # cut off while it was written
+    table = generate_cases(name, progress)
+    makedirs(TABLE_DIR, exist_ok=True)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(table, f, separators=(',', ':'))
+    replace(f'{path}.tmp', path)
+    return table
+
+
+def stats_file(session_name):
+    return f'{HOME}/.cl-timer/{session_name}{SUFFIX}'
+
+
+class Trainer:
+    """
+    Drills the cases of trainer `name` in a session.
+
+    Each case has the number and total time of its solves, which only
+    change by the solve that was added, deleted or given a penalty. The cases that take longer
+    than the others come up more often: after each solve the weights are
+    made into an alias table (O(cases)), so drawing a case is a random
+    number and a look-up however many there are.
+    """
+
+    def __init__(self, name, session_name):
+        self.name = name
+        self.cases = case_table(name)
+        self.path = stats_file(session_name)
+        self.stats = [[0, 0] for _ in self.cases]  # [solves, total] of each case
+        try:
+            with open(self.path, 'r') as f:
+                for case, stats in json.load(f).get(name, {}).items():
+                    if int(case) < len(self.stats):
+                        self.stats[int(case)] = stats
+        except (FileNotFoundError, ValueError):
+            pass
+        self._reweigh()
+
+    def mean(self, case):
+        count, total = self.stats[case]
+        return total / count if count else None
+
+    def weights(self):
+        means = [self.mean(case) for case in range(len(self.cases))]
+        seen = [mean for mean in means if mean is not None]
+        if not seen:
+            return [1 for _ in means]
+        average = sum(seen) / len(seen)
+        return [UNSEEN_WEIGHT if mean is None else (mean / average) ** SLOW_BIAS for mean in means]
+
+    def _reweigh(self):
+        """
+        Makes the alias table of the weights of the cases (Vose's method)
+        """
+        weights = self.weights()
+        n = len(weights)
+        total = sum(weights)
+        scaled = [weight * n / total for weight in weights]
+        self.chance = [1] * n
+        self.alias = list(range(n))
+        small = [i for i, weight in enumerate(scaled) if weight < 1]
+        large = [i for i, weight in enumerate(scaled) if weight >= 1]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.chance[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1 - scaled[less]
+            (small if scaled[more] < 1 else large).append(more)
+
+    def draw(self, rng=random):
+        """
+        Returns (case, scramble) of the next case to drill
+        """
+        case = int(rng.random() * len(self.cases))
+        if rng.random() >= self.chance[case]:
+            case = self.alias[case]
+        return case, rng.choice(self.cases[case])
+
+    def change(self, case, old, new):
+        """
+        Records that a solve of `case` went from taking `old` seconds to
+        `new`. Either is None for a DNF or for no solve, which aren't counted.
+        """
+        if case >= len(self.cases) or (old is None and new is None):
+            return
+        for value, sign in [(old, -1), (new, 1)]:
+            if value is not None:
+                self.stats[case][0] += sign
+                self.stats[case][1] += sign * value
+        if self.stats[case][0] <= 0:
+            self.stats[case] = [0, 0]
+        self._reweigh()
+
+        try:
+            with open(self.path, 'r') as f:
+                everything = json.load(f)
+        except (FileNotFoundError, ValueError):
+            everything = {}
+        everything[self.name] = {str(case): stats for case, stats in enumerate(self.stats) if stats[0]}
+        # so that a cl-timer reading it never sees it half written
+        # (starting with a dot, so a tmp file left behind isn't taken for a session)
+        tmp = f'{dirname(self.path)}/.{basename(self.path)}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(everything, f)
+        replace(tmp, self.path)
+
+
+_trainers = {}  # (trainer, session) -> Trainer
+
+
+def get(name, session_name):
+    """
+    Returns Trainer of `name` for session `session_name`
+    """
+    if (name, session_name) not in _trainers:
+        _trainers[(name, session_name)] = Trainer(name, session_name)
+    return _trainers[(name, session_name)]
+
+
+def record(session_name, scramble, old, new):
+    """
+    Records that a solve of `scramble` in session `session_name` went from
+    taking `old` seconds to `new` (see Trainer.change), if it was a setup
+    of a case
+    """
+    token = parse_case_token(str(scramble))
+    if token is None or token[0] not in TRAINERS:
+        return
+    get(token[0], session_name).change(token[1], old, new)
+
+
+def forget(session_name):
+    """
+    Removes the stats of the cases of session `session_name`
+    """
+    for key in [key for key in _trainers if key[1] == session_name]:
+        del _trainers[key]
+    if isfile(stats_file(session_name)):
+        remove(stats_file(session_name))
+
+
+def cases_text(trainer, width=80, rows=20):
+    """
+    Returns text of the stats of the cases of `trainer`, slowest first
+    """
+    weights = trainer.weights()
+    total = sum(weights)
+    order = sorted(range(len(trainer.cases)), key=lambda case: -(trainer.mean(case) or 0))
+    lines = [f'{trainer.name.upper()} CASES', '', f"{'case':<8}{'solves':<10}{'mean':<10}chance"]
+    for case in order[:rows]:
+        mean = trainer.mean(case)
+        line = (f'{case + 1:<8}{trainer.stats[case][0]:<10}{add_zero(round(mean, 2)) if mean is not None else "":<10}'
+                f'{weights[case] / total * 100:.1f}%')
+        lines.append(line[:width])
+    return '\n'.join(lines)
@@ -7,6 +7,8 @@ if OUTER_PACKAGE_DIR not in sys.path:
     sys.path.append(OUTER_PACKAGE_DIR)
 
 from cl_timer.art import STATS
+from cl_timer.graphics import fit_to_screen
+from cl_timer.scramble import expand
 
 class MutableString:
     def __init__(self, string):
@@ -48,10 +50,39 @@ def add_zero(number):
         return ''.join(list_number)
 
 
+def remove_penalty(t):
+    """
+    Returns time `t` without it's DNF or plus-two
+    """
+    t = str(t)
+    if t[:3] == 'DNF':
+        t = t[4:-1]
+    if t[-1] == '+':
+        t = add_zero(round(float(t[:-1]) - 2, 2))
+    return t
+
+
+def add_penalty(t, penalty):
+    """
+    Returns time `t` with a penalty of `penalty`.
+
+    `penalty` is 'DNF', '+2' or '' (no penalty)
+    """
+    t = remove_penalty(t)
+    if penalty == 'DNF':
+        return f'DNF({t})'
+    elif penalty == '+2':
+        return add_zero(round(float(t) + 2, 2)) + '+'
+    return t
+
+
 def ask_for_input(stdscr, canvas, input_line, cursor, command_line=False):
     """
     Uses graphics.InputLine object to get input from user.
     """
+    if canvas.panels is not None:
+        # what was shown before (like a command's output) is drawn over
+        canvas.panels.invalidate()
     frame = 0
     while True:
 
@@ -61,6 +92,13 @@ def ask_for_input(stdscr, canvas, input_line, cursor, command_line=False):
             if key == 27:  # escape
                 raise ExitCommandLine()
 
+        if key == 410:  # terminal was resized
+            # the input line (and cursor, which is on it) moves to the new bottom line
+            input_line.hide()
+            fit_to_screen(stdscr, canvas)
+            input_line.y = len(canvas.grid) - 1
+            key = -1
+
         if not input_line.submitted:
 
             input_line.type_char(key)
@@ -75,9 +113,12 @@ def ask_for_input(stdscr, canvas, input_line, cursor, command_line=False):
             cursor.hide()
             break
 
-        stdscr.clear()
-        stdscr.addstr(canvas.display)
-        stdscr.refresh()
+        if canvas.panels is not None:
+            canvas.panels.refresh()
+        else:
+            stdscr.clear()
+            stdscr.addstr(canvas.display)
+            stdscr.refresh()
 
         frame += 1
         time.sleep(0.01)
@@ -94,7 +135,7 @@ def display_text(stdscr, string):
 
         key = stdscr.getch()
 
-        if key != -1:
+        if key not in [-1, 410]:  # 410 - terminal was resized
             break
 
         stdscr.clear()
@@ -109,5 +150,5 @@ def display_stats(stdscr, solve, times, ao5s, ao12s, scrambles):
     Displays to screen stats about the solve with index `solve` - 1
     """
     i = solve - 1
-    string = STATS % (solve, times[i], ao5s[i], ao12s[i], scrambles[i])
+    string = STATS % (solve, times[i], ao5s[i], ao12s[i], expand(scrambles[i]))
     display_text(stdscr, string)
\ No newline at end of file
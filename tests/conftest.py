@@ -0,0 +1,14 @@
+import os
+from os.path import dirname
+import sys
+import tempfile
+
+# cl_timer keeps its files in ~/.cl-timer, and modules read HOME when they
+# are imported, so point it somewhere else before any of them are
+HOME = tempfile.mkdtemp(prefix='cl-timer-tests-')
+os.environ['HOME'] = HOME
+os.makedirs(f'{HOME}/.cl-timer')
+
+OUTER_PACKAGE_DIR = dirname(dirname(__file__))
+if OUTER_PACKAGE_DIR not in sys.path:
+    sys.path.insert(0, OUTER_PACKAGE_DIR)
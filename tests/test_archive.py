@@ -0,0 +1,91 @@
+from os.path import isfile
+import random
+
+import pytest
+
+from cl_timer import archive, storage
+from conftest import HOME
+
+
+def make_lines(count, seed=0):
+    rng = random.Random(seed)
+    moves = ['R', "U'", 'F2', 'Lw', 'x', '3Rw2']
+    lines = []
+    for i in range(count):
+        t = f'{rng.uniform(5, 30):.2f}'
+        if i % 97 == 0:
+            t = f'DNF({t})'
+        scramble = ' '.join(rng.choice(moves) for _ in range(rng.randint(0, 25)))
+        lines.append([t, f'{i}.50' if i % 5 else '', '', scramble])
+    return lines
+
+
+@pytest.fixture
+def lines():
+    return make_lines(archive.BLOCK_SOLVES * 2 + 100)
+
+
+@pytest.mark.parametrize('codec', list(archive.CODECS))
+def test_round_trip(tmp_path, lines, codec):
+    path = str(tmp_path / 'a')
+    fractions = []
+    archive.write(path, lines, entry={'puzzle': 3}, codec=codec, progress=fractions.append)
+    assert fractions == [archive.BLOCK_SOLVES / len(lines), 2 * archive.BLOCK_SOLVES / len(lines), 1]
+
+    a = archive.Archive(path)
+    assert a.count == len(lines)
+    assert len(a.blocks) == 3
+    assert a.entry == {'puzzle': 3}
+    assert list(a.lines()) == lines
+    for n in [1, archive.BLOCK_SOLVES, archive.BLOCK_SOLVES + 1, len(lines)]:
+        assert a.solve(n) == lines[n - 1]
+    with pytest.raises(IndexError):
+        a.solve(len(lines) + 1)
+
+
+def test_between(tmp_path, lines):
+    path = str(tmp_path / 'a')
+    archive.write(path, lines)
+    found = list(archive.Archive(path).between(10, 11))
+    assert found
+    assert found == [(n, line) for n, line in enumerate(lines, 1)
+                     if not line[0].startswith('DNF') and 10 <= float(line[0]) <= 11]
+    assert list(archive.Archive(path).between(40, 50)) == []
+
+
+def test_raw_scrambles(tmp_path):
+    lines = [
+        ['10.00', '', '', "R U R'"],
+        ['11.00', '', '', '@pll:Aa:x R\' U R\' D2 R U\' R\' D2 R2 x\''],
+        ['12.00', '', '', '#seed:3:20:4'],
+        ['13.00', '', '', 'R  U'],
+        ['14.00', '', '', ''],
+        ['15.00', '', '', 'scrambled by hand'],
+    ]
+    path = str(tmp_path / 'a')
+    archive.write(path, lines)
+    assert list(archive.Archive(path).lines()) == lines
+
+
+def test_not_an_archive(tmp_path):
+    path = tmp_path / 'a'
+    path.write_bytes(b'10.00\t\t\tR U\n')
+    with pytest.raises(ValueError):
+        archive.Archive(str(path))
+
+
+def test_archive_and_restore(lines):
+    name = 'test_archive_and_restore'
+    session_file = f'{HOME}/.cl-timer/{name}'
+    storage.rewrite(session_file, lines)
+
+    archive.archive_session(name, entry={'puzzle': 3})
+    assert not isfile(session_file)
+    assert archive.is_archived(name)
+    assert archive.Archive(archive.archive_file(name)).entry == {'puzzle': 3}
+
+    # solves added after archiving go after the archived ones
+    storage.rewrite(session_file, make_lines(3, seed=1))
+    archive.restore(name)
+    assert not archive.is_archived(name)
+    assert storage.load(session_file) == lines + make_lines(3, seed=1)
@@ -0,0 +1,44 @@
+import multiprocessing
+
+from cl_timer import catalog
+from conftest import HOME
+
+
+def update(name, times):
+    for i in range(times):
+        catalog.update_entry(name, i, i, '3', '', '', '', '')
+
+
+def test_update_entry():
+    update('updated', 3)
+    entry = catalog.load_catalog()['updated']
+    assert entry['count'] == 2
+    assert entry['signature'] == [0, 0]  # there is no session file
+
+
+def test_cl_timers_dont_lose_each_others_entries():
+    # each one reads the catalog, changes its entry and writes all of it
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=update, args=(f'station-{i}', 200)) for i in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    entries = catalog.load_catalog()
+    assert all(entries[f'station-{i}']['count'] == 199 for i in range(4))
+
+
+def test_is_reserved():
+    assert catalog.is_reserved('.catalog.json')
+    assert catalog.is_reserved('session-settings.json')
+    assert catalog.is_reserved('session-cases.json')
+    assert not catalog.is_reserved('session')
+
+
+def test_refresh():
+    with open(f'{HOME}/.cl-timer/refreshed', 'w') as f:
+        f.write('10.00\t\t\tR U\n12.00\t\t\tU R')
+    update('gone', 1)
+    entries = catalog.refresh()
+    assert entries['refreshed']['count'] == 2
+    assert 'gone' not in entries
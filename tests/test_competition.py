@@ -0,0 +1,51 @@
+from cl_timer.competition import Event, Ranking
+
+
+def test_ranking_keeps_best():
+    ranking = Ranking()
+    assert ranking.submit('a', 12.0)
+    assert ranking.submit('b', 10.0)
+    assert not ranking.submit('a', 13.0)
+    assert ranking.top(5) == [['b', '10.00'], ['a', '12.00']]
+    assert ranking.rank('a') == 2
+    ranking.replace('b', 14.0)
+    assert ranking.top(5) == [['a', '12.00'], ['b', '14.00']]
+    ranking.replace('b', None)
+    assert ranking.rank('b') is None
+
+
+def test_event_results():
+    event = Event()
+    for solve, t in enumerate(['10.00', '12.00', '11.00', '13.00', '9.00'], 1):
+        event.submit('a', solve, t)
+    assert event.rankings['single'].best['a'] == 9
+    assert event.rankings['mo3'].best['a'] == 11
+    assert event.rankings['ao5'].best['a'] == 11
+    assert event.solves == 5
+
+
+def test_penalty_after_submitting():
+    event = Event()
+    event.submit('a', 1, '9.00')
+    event.submit('b', 1, '10.00')
+    for solve, t in enumerate(['12.00', '11.00'], 2):
+        event.submit('a', solve, t)
+    assert event.rankings['single'].top(1) == [['a', '9.00']]
+    assert event.rankings['mo3'].best['a'] == 10.67
+
+    event.submit('a', 1, 'DNF(9.00)')
+    assert event.rankings['single'].top(2) == [['b', '10.00'], ['a', '11.00']]
+    assert 'a' not in event.rankings['mo3'].best
+    assert event.solves == 4
+
+    # and taken off again
+    event.submit('a', 1, '9.00')
+    assert event.rankings['single'].top(1) == [['a', '9.00']]
+    assert event.rankings['mo3'].best['a'] == 10.67
+
+
+def test_solves_without_numbers_come_after():
+    event = Event()
+    event.submit('a', None, '10.00')
+    event.submit('a', None, '11.00')
+    assert event.competitors['a'].numbers == [1, 2]
@@ -0,0 +1,55 @@
+import pytest
+
+from cl_timer.cube import AMOUNTS, Cube, is_valid_scramble, parse_move, valid_moves
+
+
+@pytest.mark.parametrize('n', [2, 3, 4, 7])
+def test_four_quarter_turns_are_the_identity(n):
+    for move in valid_moves(n):
+        if move[-1] in "'2":
+            continue
+        cube = Cube(n).apply(move)
+        assert cube.is_solved() == (move in 'xyz')
+        assert cube.apply(' '.join([move] * 3)).is_solved(), move
+
+
+@pytest.mark.parametrize('n', [2, 3, 5])
+def test_inverse_undoes_the_move(n):
+    for move in valid_moves(n):
+        body = move.rstrip("'2")
+        inverse = body + {1: "'", 2: '2', 3: ''}[AMOUNTS[move[len(body):]]]
+        assert Cube(n).apply(f'{move} {inverse}').is_solved(), move
+
+
+def test_sexy_move_has_order_six():
+    cube = Cube(3)
+    for i in range(6):
+        assert not i or not cube.is_solved()
+        cube.apply("R U R' U'")
+    assert cube.is_solved()
+
+
+def test_colors_follow_the_moves():
+    cube = Cube(3).apply('R')
+    assert cube.face('U') == ['WWG'] * 3
+    assert cube.face('F') == ['GGY'] * 3
+    assert Cube(2).apply('x').face('F') == ['YY'] * 2
+    assert Cube(3).net().split('\n')[0] == ' ' * 7 + 'W W W'
+
+
+def test_parse_move():
+    assert parse_move("R'", 3) == ('R', 1, 3)
+    assert parse_move('Uw2', 4) == ('U', 2, 2)
+    assert parse_move('3Fw', 6) == ('F', 3, 1)
+    for move in ['Q', "R''", '4Rw', 'w', 'RFw']:
+        with pytest.raises(ValueError):
+            parse_move(move, 4)
+
+
+def test_valid_scrambles():
+    assert is_valid_scramble("R U2 F' x", 2)
+    assert not is_valid_scramble('Rw U', 2)
+    assert is_valid_scramble('Rw 3Uw2', 4)
+    assert not is_valid_scramble('5Rw', 4)
+    with pytest.raises(ValueError):
+        Cube(3).apply('R Q')
@@ -0,0 +1,103 @@
+import io
+
+import pytest
+
+from cl_timer import formats, storage
+from conftest import HOME
+
+SOLVES = [
+    ('12.34', "R U R' U'"),
+    ('DNF(9.87)', "F2 L' B"),
+    ('14.00+', 'D R2 U'),
+    ('63.20', "Rw R' U2"),
+]
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # makes the readers stop in the middle of values
+    monkeypatch.setattr(formats, 'CHUNK_SIZE', 7)
+
+
+@pytest.mark.parametrize('string, t', [
+    ('12.3', '12.30'),
+    (' 9.999\n', '10.00'),
+    ('1:02.34', '62.34'),
+    ('14.00+', '14.00+'),
+    ('DNF(9.87)', 'DNF(9.87)'),
+    ('dnf', 'DNF(0.00)'),
+    ('DNF(1:00.5)', 'DNF(60.50)'),
+])
+def test_parse_time(string, t):
+    assert formats.parse_time(string) == t
+
+
+def test_cstimer_round_trip(small_chunks):
+    f = io.StringIO()
+    formats.write_cstimer(f, SOLVES, 'test')
+    assert list(formats.read_cstimer(io.StringIO(f.getvalue()))) == SOLVES
+    assert list(formats.read_cstimer(io.StringIO(f.getvalue()), session='2')) == []
+
+
+def test_cstimer_picks_the_session(small_chunks):
+    export = ('{"session1": [[[0, 5000], "R", "", 0]],\n'
+              ' "session2": [[[2000, 10000], "U", "", 0], [[-1, 7250], "F", "", 0]],'
+              ' "properties": {"sessionData": "{}"}}')
+    assert list(formats.read_cstimer(io.StringIO(export), '2')) == [('12.00+', 'U'), ('DNF(7.25)', 'F')]
+
+
+def test_qqtimer_round_trip(small_chunks):
+    f = io.StringIO()
+    formats.write_qqtimer(f, SOLVES)
+    assert list(formats.read_qqtimer(io.StringIO(f.getvalue()))) == [(t, '') for t, _ in SOLVES]
+    assert list(formats.read_qqtimer(io.StringIO('1.5\n2.25,\n\n3'))) == [('1.50', ''), ('2.25', ''), ('3.00', '')]
+
+
+def test_csv_round_trip():
+    lines = [[t, '', '', scramble] for t, scramble in SOLVES]
+    f = io.StringIO(newline='')
+    formats.write_csv(f, lines)
+    assert list(formats.read_csv(io.StringIO(f.getvalue(), newline=''))) == SOLVES
+
+
+def test_csv_columns():
+    cstimer = 'No.;Time;Comment;Scramble;Date\n1;12.34;;R U;2020\n2;DNF(3.00);;F;2020\n'
+    assert list(formats.read_csv(io.StringIO(cstimer))) == [('12.34', 'R U'), ('DNF(3.00)', 'F')]
+    assert list(formats.read_csv(io.StringIO('12.34,R U\n5\n'))) == [('12.34', 'R U'), ('5.00', '')]
+
+
+@pytest.mark.parametrize('fmt', formats.FORMATS)
+def test_export_and_import(tmp_path, fmt):
+    lines = [[t, '', '', scramble] for t, scramble in SOLVES * 3]
+    source = f'source-{fmt}'
+    path = str(tmp_path / 'export')
+    with open(path, 'w', newline='') as f:
+        formats.write_csv(f, lines)
+    assert formats.import_session('csv', path, source) == (len(lines), 0)
+
+    imported = storage.load(f'{HOME}/.cl-timer/{source}')
+    assert [(line[0], line[3]) for line in imported] == [tuple(line) for line in SOLVES * 3]
+    assert imported[4][1] and not imported[3][1]
+    assert imported[11][2] and not imported[10][2]
+
+    assert formats.export_session(fmt, source, path) == len(lines)
+    copy = f'copy-{fmt}'
+    with open(f'{HOME}/.cl-timer/{copy}-settings.json', 'w') as f:
+        f.write('{"puzzle": 2}')
+    count, invalid = formats.import_session(fmt, path, copy)
+    assert count == len(lines)
+    copied = storage.load(f'{HOME}/.cl-timer/{copy}')
+    if fmt == 'qqtimer':
+        assert invalid == 0
+        assert [line[:3] for line in copied] == [line[:3] for line in imported]
+    else:
+        # 2x2 has no wide moves
+        assert invalid == 3
+        assert copied == imported
+
+    # a second import goes after the first, and its first solves
+    # get averages with the ones before them
+    formats.import_session(fmt, path, copy)
+    copied = storage.load(f'{HOME}/.cl-timer/{copy}')
+    assert len(copied) == 2 * len(lines)
+    assert copied[len(lines)][1] and copied[len(lines)][2]
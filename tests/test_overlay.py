@@ -0,0 +1,69 @@
+import gc
+import json
+import socket
+import time
+
+import pytest
+
+from cl_timer import overlay
+
+
+def get(port, path):
+    with socket.create_connection(('127.0.0.1', port), 5) as sock:
+        sock.sendall(f'GET {path} HTTP/1.1\r\n\r\n'.encode())
+        data = b''
+        while True:
+            chunk = sock.recv(4096)
+            if not chunk:
+                return data
+            data += chunk
+
+
+def read_until(sock, text):
+    data = b''
+    while text not in data:
+        data += sock.recv(4096)
+    return data
+
+
+@pytest.fixture
+def server():
+    server = overlay.OverlayServer(port=0)
+    yield server
+    server.stop()
+
+
+def test_snapshot(server):
+    server.publish('solve', {'solve': 1, 'time': '10.00'})
+    server.publish('solve', {'solve': 2, 'time': '11.00'})
+    time.sleep(0.1)
+    head, body = get(server.port, '/snapshot.json').split(b'\r\n\r\n', 1)
+    assert head.startswith(b'HTTP/1.1 200')
+    assert json.loads(body) == {'solve': {'solve': 2, 'time': '11.00'}}
+    assert get(server.port, '/nothing').startswith(b'HTTP/1.1 404')
+
+
+def test_events(server):
+    with socket.create_connection(('127.0.0.1', server.port), 5) as sock:
+        sock.sendall(b'GET /events HTTP/1.1\r\n\r\n')
+        read_until(sock, b'text/event-stream')
+        server.publish('stats', {'solves': 3})
+        assert b'event: stats\ndata: {"solves":3}\n\n' in read_until(sock, b'\n\n')
+
+
+def test_stop_ends_open_connections(caplog):
+    server = overlay.OverlayServer(port=0)
+    stream = socket.create_connection(('127.0.0.1', server.port), 5)
+    stream.sendall(b'GET /events HTTP/1.1\r\n\r\n')
+    read_until(stream, b'text/event-stream')
+    idle = socket.create_connection(('127.0.0.1', server.port), 5)  # never sends its request
+    time.sleep(0.1)
+    server.stop()
+    assert not server.thread.is_alive()
+    assert server.connections == {}
+    assert stream.recv(4096) == b''
+    assert idle.recv(4096) == b''
+    stream.close()
+    idle.close()
+    gc.collect()
+    assert not [record for record in caplog.records if record.name == 'asyncio']
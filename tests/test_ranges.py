@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from cl_timer.ranges import RangeIndex
+from cl_timer.stats import time_value
+
+
+def brute_force(times, ao5s, ao12s, first, last):
+    """
+    (count, dnfs, mean, best, worst, best_ao5, best_ao12) of solves `first` to `last`
+    """
+    solves = range(first, last + 1)
+    values = {solve: time_value(times[solve - 1]) for solve in solves}
+    done = {solve: value for solve, value in values.items() if value is not None}
+
+    def best(column):
+        column_values = {solve: time_value(column[solve - 1]) for solve in solves}
+        column_values = {solve: value for solve, value in column_values.items() if value is not None}
+        return min(column_values, key=lambda solve: (column_values[solve], solve)) if column_values else None
+
+    return (len(values), len(values) - len(done),
+            sum(done.values()) / len(done) if done else None,
+            min(done, key=lambda solve: (done[solve], solve)) if done else None,
+            max(done, key=lambda solve: (done[solve], -solve)) if done else None,
+            best(ao5s), best(ao12s))
+
+
+def random_time(rng):
+    return rng.choice(['DNF', f'{rng.randint(800, 2000) / 100:.2f}', f'{rng.randint(800, 2000) / 100:.2f}+'])
+
+
+def check(index, times, ao5s, ao12s, rng):
+    assert len(index) == len(times)
+    for _ in range(20):
+        first = rng.randint(1, len(times))
+        last = rng.randint(first, len(times))
+        stats = tuple(index.query(first, last))
+        expected = brute_force(times, ao5s, ao12s, first, last)
+        assert stats[:2] == expected[:2]
+        assert stats[2] == pytest.approx(expected[2])
+        # on a tie, either solve will do
+        for column, found, wanted in zip([times, times, ao5s, ao12s], stats[3:], expected[3:]):
+            assert (found is None) == (wanted is None)
+            if found is not None:
+                assert first <= found <= last
+                assert time_value(column[found - 1]) == time_value(column[wanted - 1])
+
+
+def test_queries_follow_changes():
+    rng = random.Random(4)
+    times = [random_time(rng) for _ in range(50)]
+    ao5s = [random_time(rng) if i >= 4 else '' for i in range(50)]
+    ao12s = ['' for _ in range(50)]
+    index = RangeIndex(times, ao5s, ao12s)
+    check(index, times, ao5s, ao12s, rng)
+
+    for _ in range(300):
+        operation = rng.choice(['append', 'delete', 'insert', 'set'])
+        solve = rng.randint(1, len(times))
+        line = [random_time(rng), random_time(rng), '']
+        if operation == 'append':
+            index.append(*line)
+            for column, thing in zip([times, ao5s, ao12s], line):
+                column.append(thing)
+        elif operation == 'delete' and len(times) > 1:
+            index.delete(solve)
+            for column in [times, ao5s, ao12s]:
+                column.pop(solve - 1)
+        elif operation == 'insert':
+            index.insert(solve, *line)
+            for column, thing in zip([times, ao5s, ao12s], line):
+                column.insert(solve - 1, thing)
+        elif operation == 'set':
+            index.set(solve, *line)
+            for column, thing in zip([times, ao5s, ao12s], line):
+                column[solve - 1] = thing
+        check(index, times, ao5s, ao12s, rng)
+
+
+def test_first_below():
+    index = RangeIndex(['12.00', '10.00', 'DNF', '9.00', '11.00'], [''] * 5, [''] * 5)
+    assert index.first_below(3, 1, 11) == (2, 10)
+    assert index.first_below(3, 3, 10) == (4, 9)
+    assert index.first_below(3, 5, 10) is None
+    assert index.first_below(3, 6, 10) is None
@@ -0,0 +1,70 @@
+import random
+
+from cl_timer.ranges import RangeIndex
+from cl_timer.records import history_text
+from cl_timer.stats import time_value
+
+
+def records(column):
+    """
+    (solve, value) of every value of `column` that beat all the ones before it
+    """
+    found, best = [], float('inf')
+    for solve, t in enumerate(column, 1):
+        value = time_value(t)
+        if value is not None and value < best:
+            found.append((solve, value))
+            best = value
+    return found
+
+
+def test_personal_bests():
+    index = RangeIndex()
+    assert index.append('12.00', '', '') == ['single']
+    assert index.append('13.00', '', '') == []
+    assert index.append('11.00', '11.50', '') == ['single', 'ao5']
+    assert index.records.best('single') == (3, 11)
+    index.set(3, 'DNF', '11.50', '')
+    assert index.records.best('single') == (1, 12)
+    index.delete(1)
+    assert index.records.history('single') == [(1, 13)]
+    index.insert(1, '12.00', '', '')
+    assert index.records.history('single') == [(1, 12)]
+    assert index.records.best('ao12') is None
+
+
+def test_records_follow_changes():
+    rng = random.Random(7)
+    times = [f'{rng.randint(800, 2000) / 100:.2f}' for _ in range(100)]
+    ao5s = [f'{rng.randint(800, 2000) / 100:.2f}' for _ in range(100)]
+    index = RangeIndex(times, ao5s, [''] * 100)
+    for _ in range(300):
+        solve = rng.randint(1, len(times))
+        line = [rng.choice(['DNF', f'{rng.randint(800, 2000) / 100:.2f}']), f'{rng.randint(800, 2000) / 100:.2f}']
+        operation = rng.choice(['append', 'delete', 'insert', 'set'])
+        if operation == 'append':
+            index.append(*line, '')
+            times.append(line[0])
+            ao5s.append(line[1])
+        elif operation == 'delete' and len(times) > 1:
+            index.delete(solve)
+            times.pop(solve - 1)
+            ao5s.pop(solve - 1)
+        elif operation == 'insert':
+            index.insert(solve, *line, '')
+            times.insert(solve - 1, line[0])
+            ao5s.insert(solve - 1, line[1])
+        elif operation == 'set':
+            index.set(solve, *line, '')
+            times[solve - 1], ao5s[solve - 1] = line
+        assert index.records.history('single') == records(times)
+        assert index.records.history('ao5') == records(ao5s)
+
+
+def test_history_text():
+    index = RangeIndex(['12.00', '11.5', '13.00'], ['', '', ''], ['', '', ''])
+    lines = history_text(index.records, 60).split('\n')
+    assert lines[0] == 'PERSONAL BESTS'
+    assert lines[2].split() == ['SINGLE', 'AO5', 'AO12']
+    assert lines[3].split() == ['12.00', 'solve', '1']
+    assert lines[4].split() == ['11.50', 'solve', '2']
@@ -0,0 +1,47 @@
+from cl_timer.scramble import expand, generate_scramble, next_index, parse_token, scramble_token, stream_scramble
+
+
+def test_token_round_trip():
+    token = scramble_token('1a2b3c4d', 3, 20, 7)
+    assert token == '#1a2b3c4d:3:20:7'
+    assert parse_token(token) == ('1a2b3c4d', 3, 20, 7)
+
+
+def test_seed_can_have_colons():
+    assert parse_token(scramble_token('a:b', 4, 40, 0)) == ('a:b', 4, 40, 0)
+
+
+def test_parse_token_rejects_moves_and_bad_tokens():
+    assert parse_token("R U R' U'") is None
+    assert parse_token('#seed:3:20') is None
+    assert parse_token('#seed:8:20:0') is None
+    assert parse_token('#seed:3:-1:0') is None
+    assert parse_token('#seed:3:20:-1') is None
+
+
+def test_same_token_same_scramble():
+    assert stream_scramble('seed', 3, 20, 5) == stream_scramble('seed', 3, 20, 5)
+    assert stream_scramble('seed', 3, 20, 5) != stream_scramble('seed', 3, 20, 6)
+    assert stream_scramble('seed', 3, 20, 5) != stream_scramble('other', 3, 20, 5)
+
+
+def test_scramble_length():
+    assert len(stream_scramble('seed', 3, 25, 0).split()) == 25
+    assert len(generate_scramble(5, 60).split()) == 60
+
+
+def test_expand():
+    assert expand("R U R' U'") == "R U R' U'"
+    assert expand('#seed:2:9:3') == stream_scramble('seed', 2, 9, 3)
+
+
+def test_next_index():
+    scrambles = ['#s:3:20:0', '#s:3:20:4', "R U R'", '#t:3:20:9', '#s:t:3:20:8', '#s:3:20:1']
+    # the highest of the seed, wherever it is
+    assert next_index(scrambles, 's') == 5
+    assert next_index(scrambles, 't') == 10
+    assert next_index(scrambles, 's:t') == 9
+    assert next_index(scrambles, 'u') == 0
+    # only from `start` on, but never lower than `index`
+    assert next_index(scrambles, 's', 2) == 2
+    assert next_index(scrambles, 's', 2, 5) == 5
@@ -0,0 +1,53 @@
+import pytest
+
+from cl_timer import stackmat
+from cl_timer.stackmat import Decoder, decode_packet, encode_packet, IDLE, InputSource, RUNNING, STOPPED
+
+
+def test_packets():
+    assert encode_packet(RUNNING, 12.345) == b' 01234' + bytes([64 + 10]) + b'\n\r'
+    assert decode_packet(encode_packet(RUNNING, 72.34)[:-2]) == (RUNNING, 72.34)
+    assert decode_packet(encode_packet(STOPPED, 9.876, thousandths=True)[:-2]) == (STOPPED, 9.87)
+    assert decode_packet(b' 01234X') is None  # bad checksum
+    assert decode_packet(b'?01234' + bytes([74])) is None
+
+
+def test_decoder_events():
+    decoder = Decoder()
+    data = b''.join([encode_packet(IDLE, 0), encode_packet(RUNNING, 0.5),
+                     encode_packet(RUNNING, 1.5), encode_packet(STOPPED, 2.25), encode_packet(IDLE, 0)])
+    events = []
+    # in pieces, starting halfway through a packet
+    data = data[3:]
+    for start in range(0, len(data), 5):
+        for packet in decoder.feed(data[start:start + 5], at=0):
+            events += decoder.events(packet)
+    assert [(event.kind, event.time) for event in events] == [('start', 0.5), ('stop', 2.25), ('reset', 0)]
+
+
+def test_input_source_needs_run():
+    with pytest.raises(TypeError):
+        InputSource()
+
+    class Source(InputSource):
+        def run(self):
+            self.queue.append('event')
+
+    source = Source().start()
+    source.thread.join(1)
+    assert source.poll() == ['event']
+    assert source.poll() == []
+
+
+@pytest.mark.skipif(not hasattr(stackmat.os, 'openpty'), reason='needs a pty')
+def test_simulator():
+    simulator = stackmat.Simulator()
+    source = stackmat.StackmatSource(simulator.path).start()
+    try:
+        simulator.solve(0.3)
+        stackmat.time.sleep(stackmat.PACKET_INTERVAL * 3)
+        kinds = [event.kind for event in source.poll()]
+        assert kinds[-2:] == ['start', 'stop']
+    finally:
+        source.close()
+        simulator.close()
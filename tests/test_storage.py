@@ -0,0 +1,61 @@
+import pytest
+
+from cl_timer import storage
+from conftest import HOME
+
+A = ['10.00', '', '', "R U R' U'"]
+B = ['11.00', '', '', "F R U R' U' F'"]
+C = ['12.00', '', '', "R U2 R'"]
+D = ['13.00', '', '', "L' U' L"]
+
+
+@pytest.fixture
+def session_file(request):
+    path = f'{HOME}/.cl-timer/{request.node.name}'
+    storage.rewrite(path, [A, B])
+    return path
+
+
+class Follower:
+    """
+    Another cl-timer following the session file, with what it has read of it
+    """
+
+    def __init__(self, session_file):
+        self.session_file = session_file
+        self.known = {}
+        self.lines = []
+        self.follow()
+
+    def follow(self):
+        mine, storage._known = storage._known, self.known
+        try:
+            reloaded, lines = storage.read_new(self.session_file)
+        finally:
+            storage._known = mine
+        if reloaded:
+            self.lines = []
+        self.lines += lines
+
+
+def test_read_new_sees_appends(session_file):
+    follower = Follower(session_file)
+    storage.append(session_file, [C])
+    follower.follow()
+    assert follower.lines == [A, B, C]
+
+
+def test_remove_last(session_file):
+    storage.remove_last(session_file)
+    assert storage.load(session_file) == [A]
+    storage.remove_last(session_file)
+    assert storage.load(session_file) == []
+
+
+def test_follower_sees_removed_solve_then_appends(session_file):
+    follower = Follower(session_file)
+    storage.remove_last(session_file)
+    storage.append(session_file, [C])
+    storage.append(session_file, [D])
+    follower.follow()
+    assert follower.lines == [A, C, D]
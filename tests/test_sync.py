@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+from cl_timer import storage, sync
+from conftest import HOME
+from test_storage import A, B, C, D
+
+
+@pytest.fixture
+def server(tmp_path):
+    server = sync.SyncServer(('127.0.0.1', 0), str(tmp_path / 'server'))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(server):
+    return sync.SyncClient(f'127.0.0.1:{server.server_address[1]}', 'test')
+
+
+def test_diff():
+    assert sync.diff([A, B], [A, B]) is None
+    assert sync.diff([A, B], [A, B, C]) == (2, 0, [C])
+    assert sync.diff([A, B, C], [A, C]) == (1, 1, [])
+
+
+def test_flush_sends_appends(server, client):
+    session_file = f'{HOME}/.cl-timer/appended'
+    storage.rewrite(session_file, [A, B])
+    client.flush(['appended'])
+    storage.append(session_file, [C])
+    client.flush(['appended'])
+    assert server.lines('appended') == [A, B, C]
+
+
+def test_flush_after_removing_last_solve(server, client):
+    session_file = f'{HOME}/.cl-timer/removed'
+    storage.rewrite(session_file, [A, B])
+    client.flush(['removed'])
+    storage.remove_last(session_file)
+    storage.append(session_file, [C])
+    storage.append(session_file, [D])
+    client.flush(['removed'])
+    assert server.lines('removed') == [A, C, D]
@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from cl_timer import trainer
+from cl_timer.cube import COLORS, Cube, FACES
+from cl_timer.scramble import case_token, expand, parse_case_token
+
+
+@pytest.mark.parametrize('name, count', [('oll', 57), ('pll', 21), ('2x2-cll', 42)])
+def test_generate_cases(name, count):
+    table = trainer.generate_cases(name)
+    assert len(table) == count
+    size = trainer.TRAINERS[name].size
+    for setups in table:
+        assert 1 <= len(setups) <= trainer.MAX_SETUPS
+        for setup in setups[:3]:
+            # only the last layer is changed, so the first two stay solved
+            cube = Cube(size).apply(setup)
+            assert not cube.is_solved()
+            assert set(''.join(cube.face('D'))) == {COLORS[FACES.index('D')]}
+            for face in 'RFLB':
+                assert set(''.join(cube.face(face)[1:])) == {COLORS[FACES.index(face)]}
+
+
+def test_inverse_and_simplify():
+    assert trainer.inverse("R U R' U2") == "U2 R U' R'"
+    assert trainer.inverse("R U2 R'") == "R U2 R'"
+    assert trainer.simplify("R U U' R'".split()) == ''
+    assert trainer.simplify("U U U2 R".split()) == 'R'
+    assert trainer.simplify("R R R".split()) == "R'"
+
+
+def test_case_token():
+    token = case_token('2x2-cll', 12, "R U R'")
+    assert parse_case_token(token) == ('2x2-cll', 12, "R U R'")
+    assert expand(token) == "R U R'"
+    assert parse_case_token("R U R'") is None
+    assert parse_case_token('@oll:x:R') is None
+
+
+@pytest.fixture
+def pll(request):
+    return trainer.Trainer('pll', request.node.name)
+
+
+def test_draw_follows_weights(pll):
+    # the only case that was slow comes up (2x slower) ** SLOW_BIAS times
+    # as often as each of the others
+    for case in range(len(pll.cases)):
+        pll.change(case, None, 10)
+    pll.change(0, None, 30)  # mean of case 0 is 20
+    rng = random.Random(1)
+    counts = [0] * len(pll.cases)
+    for _ in range(100000):
+        case, setup = pll.draw(rng)
+        assert setup in pll.cases[case]
+        counts[case] += 1
+    ratio = counts[0] / (sum(counts[1:]) / (len(counts) - 1))
+    assert ratio == pytest.approx(2 ** trainer.SLOW_BIAS, rel=0.1)
+
+
+def test_change_takes_solves_back_off(pll):
+    pll.change(3, None, 12)
+    pll.change(3, None, 14)
+    assert pll.mean(3) == 13
+    pll.change(3, 14, None)  # DNF or deleted
+    assert pll.mean(3) == 12
+    pll.change(3, 12, 16)  # +2 of a 14
+    assert pll.mean(3) == 16
+    pll.change(3, 16, None)
+    assert pll.stats[3] == [0, 0]
+    assert pll.mean(3) is None
+
+
+def test_record_and_forget():
+    trainer.record('recorded', case_token('pll', 5, "R U R'"), None, 9)
+    trainer.record('recorded', "R U R' U'", None, 9)  # not a case
+    assert trainer.get('pll', 'recorded').stats[5] == [1, 9]
+    # read back from the stats file
+    assert trainer.Trainer('pll', 'recorded').stats[5] == [1, 9]
+    trainer.forget('recorded')
+    assert trainer.get('pll', 'recorded').stats[5] == [0, 0]